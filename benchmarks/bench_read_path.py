@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+"""Requests per second of ``GET /videos/{video_id}``: DTO path vs. raw ``_source`` path.
+
+The "dto" route reproduces the previous implementation (``_source`` ->
+``VideoMetadataDTO`` -> domain -> DTO -> ``response_model`` validation); the
+"raw" route is the current one, which serializes the stored document with
+orjson. Both read from the same in-memory store of JSON documents, so the
+difference is purely conversion and validation cost.
+
+    python -m benchmarks.bench_read_path --frames 3 5000 --requests 500
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import httpx
+from fastapi import Depends, FastAPI, HTTPException
+
+from libs.models.video_metadata import VideoMetadata, VideoMetadataDTO
+from libs.storage.memory import AsyncInMemoryStorage, AsyncInMemoryVideoStorage
+from services.video_metadata_service.controller import router
+from services.video_metadata_service.service import (
+    AsyncVideoMetadataService,
+    get_async_service,
+    set_async_service,
+)
+
+ACTIONS = ["walking", "running", "jumping", "waving"]
+
+
+class SourceStorage(AsyncInMemoryVideoStorage[Dict[str, Any]]):
+    """Holds JSON documents the way Elasticsearch returns them."""
+
+    async def get(self, obj_id: str) -> Optional[VideoMetadata]:  # type: ignore[override]
+        source = self._items.get(obj_id)
+        return None if source is None else VideoMetadataDTO(**source).to_domain()
+
+    async def get_source(self, obj_id: str) -> Optional[Dict[str, Any]]:
+        return self._items.get(obj_id)
+
+
+def make_document(video_id: str, frames: int) -> Dict[str, Any]:
+    return {
+        "video_id": video_id,
+        "timestamp": datetime.utcnow().isoformat(),
+        "algorithms": [
+            {
+                "type": "actionRecognition",
+                "results": [
+                    {
+                        "frame_num": i,
+                        "timestamp": f"00:{i // 600 % 60:02d}:{i // 10 % 60:02d}.{i % 10}",
+                        "action": ACTIONS[i % len(ACTIONS)],
+                        "confidence": 0.5 + (i % 50) / 100,
+                        "clip_length": 16,
+                    }
+                    for i in range(frames)
+                ],
+            }
+        ],
+        "extra": {"source": "bench"},
+    }
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/dto/videos/{video_id}", response_model=VideoMetadataDTO)
+    async def read_video_dto(
+        video_id: str, service: AsyncVideoMetadataService = Depends(get_async_service)
+    ) -> VideoMetadataDTO:
+        data = await service.get(video_id)
+        if not data:
+            raise HTTPException(status_code=404)
+        return data
+
+    app.include_router(router)
+    return app
+
+
+async def measure(client: httpx.AsyncClient, path: str, requests: int) -> float:
+    await client.get(path)
+    start = time.perf_counter()
+    for _ in range(requests):
+        response = await client.get(path)
+        response.raise_for_status()
+    return requests / (time.perf_counter() - start)
+
+
+async def run(frame_counts: List[int], requests: int) -> List[Dict[str, float]]:
+    storage = SourceStorage(key=lambda doc: doc["video_id"])
+    set_async_service(
+        AsyncVideoMetadataService(storage, AsyncInMemoryStorage(), logging.getLogger("bench"))
+    )
+    transport = httpx.ASGITransport(app=build_app())
+    rows = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for frames in frame_counts:
+            video_id = f"video-{frames}"
+            await storage.create(make_document(video_id, frames))
+            dto_rps = await measure(client, f"/dto/videos/{video_id}", requests)
+            raw_rps = await measure(client, f"/videos/{video_id}", requests)
+            rows.append({"frames": frames, "dto_rps": dto_rps, "raw_rps": raw_rps})
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, nargs="+", default=[3, 5000])
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    rows = asyncio.run(run(args.frames, args.requests))
+    print(f"{'frames':>7} {'dto path (req/s)':>17} {'raw path (req/s)':>17} {'speedup':>9}")
+    for row in rows:
+        print(
+            f"{row['frames']:>7} {row['dto_rps']:>17.0f} {row['raw_rps']:>17.0f} "
+            f"{row['raw_rps'] / row['dto_rps']:>8.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
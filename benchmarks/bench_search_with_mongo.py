@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+"""Latency of ``search_with_mongo`` enrichment against the number of hits.
+
+Compares the previous per-hit ``MongoStorage.get`` loop with the batched
+``get_many`` lookup. MongoDB is replaced by an in-memory fake that sleeps for
+``--rtt-ms`` per round trip, so the numbers isolate the round-trip count.
+
+    python -m benchmarks.bench_search_with_mongo --rtt-ms 1 --hits 1 10 50 100 200
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from libs.models.video_metadata import (
+    EnrichedVideoMetadataDTO,
+    VideoMetadata,
+    VideoMetadataDTO,
+)
+from libs.storage.memory import AsyncInMemoryStorage, AsyncInMemoryVideoStorage
+from services.video_metadata_service.service import AsyncVideoMetadataService
+
+
+class LatencyMongo(AsyncInMemoryStorage[Dict[str, Any]]):
+    """In-memory Mongo stand-in that charges one RTT per round trip."""
+
+    def __init__(self, rtt: float) -> None:
+        super().__init__(key=lambda doc: doc["_id"])
+        self.rtt = rtt
+
+    async def get(self, obj_id: str) -> Optional[Dict[str, Any]]:
+        await asyncio.sleep(self.rtt)
+        return await super().get(obj_id)
+
+    async def get_many(
+        self, obj_ids: List[str], fields: Optional[List[str]] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        await asyncio.sleep(self.rtt)
+        return {i: self._items[i] for i in obj_ids if i in self._items}
+
+
+async def per_hit_enrichment(
+    storage: AsyncInMemoryVideoStorage[VideoMetadata], mongo: LatencyMongo, query: dict
+) -> List[EnrichedVideoMetadataDTO]:
+    """The pre-batching implementation: one Mongo round trip per hit."""
+    enriched = []
+    for meta in await storage.search(query):
+        enriched.append(
+            EnrichedVideoMetadataDTO(
+                metadata=VideoMetadataDTO.from_domain(meta),
+                mongo=await mongo.get(meta.video_id),
+            )
+        )
+    return enriched
+
+
+async def _time(coro_factory, repeat: int) -> float:  # type: ignore[no-untyped-def]
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await coro_factory()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return samples[len(samples) // 2] * 1000
+
+
+async def run(hit_counts: List[int], rtt_ms: float, repeat: int) -> List[Dict[str, float]]:
+    rows = []
+    for hits in hit_counts:
+        storage: AsyncInMemoryVideoStorage[VideoMetadata] = AsyncInMemoryVideoStorage()
+        mongo = LatencyMongo(rtt_ms / 1000)
+        for i in range(hits):
+            video_id = f"video-{i}"
+            await storage.create(
+                VideoMetadata(video_id=video_id, timestamp=datetime.utcnow(), algorithms=[], extra={})
+            )
+            await mongo.create({"_id": video_id, "title": f"Video {i}", "tags": ["a", "b"]})
+        service = AsyncVideoMetadataService(storage, mongo, logging.getLogger("bench"))
+        query = {"query": {"match_all": {}}}
+
+        before = await _time(lambda: per_hit_enrichment(storage, mongo, query), repeat)
+        after = await _time(lambda: service.search_with_mongo(query), repeat)
+        rows.append({"hits": hits, "before_ms": before, "after_ms": after})
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hits", type=int, nargs="+", default=[1, 10, 50, 100, 200])
+    parser.add_argument("--rtt-ms", type=float, default=1.0, help="Simulated Mongo round trip")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = asyncio.run(run(args.hits, args.rtt_ms, args.repeat))
+    print(f"{'hits':>6} {'per-hit get (ms)':>18} {'get_many (ms)':>15} {'speedup':>9}")
+    for row in rows:
+        print(
+            f"{row['hits']:>6} {row['before_ms']:>18.2f} {row['after_ms']:>15.2f} "
+            f"{row['before_ms'] / row['after_ms']:>8.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+"""Cold-start time of the API: module import, OpenAPI generation and lifespan startup.
+
+Every sample runs in a fresh interpreter so import caches do not carry over.
+The ``startup`` phase builds the app and runs its lifespan up to the point
+where requests are served; it needs the usual environment variables and
+measures against whatever backends they point to (unreachable backends count
+as failed warm-up checks, bounded by ``STARTUP_WARMUP_TIMEOUT``).
+
+    python -m benchmarks.bench_startup --repeat 5
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+PHASES: Dict[str, str] = {
+    "import": "import services.video_metadata_service.app",
+    "openapi": (
+        "from services.video_metadata_service.app import create_app\n"
+        "create_app(import_only=True).openapi()"
+    ),
+    # Stops the clock once the app would accept requests; shutdown is skipped.
+    "startup": (
+        "import asyncio, os\n"
+        "from services.video_metadata_service.app import create_app\n"
+        "async def main():\n"
+        "    app = create_app()\n"
+        "    async with app.router.lifespan_context(app):\n"
+        "        print(time.perf_counter() - _started, flush=True)\n"
+        "        os._exit(0)\n"
+        "asyncio.run(main())"
+    ),
+}
+
+TIMER = (
+    "import time\n"
+    "_started = time.perf_counter()\n"
+    "{body}\n"
+    "print(time.perf_counter() - _started)\n"
+)
+
+
+def sample(phase: str) -> float:
+    out = subprocess.run(
+        [sys.executable, "-c", TIMER.format(body=PHASES[phase])],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return float(out.strip().splitlines()[-1]) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--phases", nargs="+", choices=list(PHASES), default=list(PHASES))
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'phase':>8} {'median (ms)':>12} {'min (ms)':>10}")
+    for phase in args.phases:
+        try:
+            samples: List[float] = [sample(phase) for _ in range(args.repeat)]
+        except subprocess.CalledProcessError as exc:
+            print(f"{phase:>8} failed: {exc.stderr.strip().splitlines()[-1]}")
+            continue
+        print(f"{phase:>8} {statistics.median(samples):>12.0f} {min(samples):>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,422 @@
+#!/usr/bin/env python
+"""Benchmark suite with machine-readable results and baseline comparison.
+
+Measures consumer ingest throughput, p50/p99 latency of every API route, DTO
+conversion cost across payload sizes and ``search_with_mongo`` fan-out. By
+default everything runs offline against the in-memory storage and broker;
+``--backend live`` uses the Elasticsearch, MongoDB and RabbitMQ configured in
+the environment instead (point it at disposable local containers: it writes
+``bench-*`` documents and publishes to the configured queue).
+
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --baseline results.json --tolerance 0.15
+    python -m benchmarks.run --backend live --only consumer routes
+    python -m benchmarks.run --only consumer --payloads payloads.ndjson
+
+Results are a JSON object ``{"meta": {...}, "metrics": {name: {"value",
+"unit", "better"}}}``. With ``--baseline`` every metric present in both runs
+is compared and the process exits with status 1 if any regressed by more than
+``--tolerance``.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+import orjson
+from pydantic import ValidationError
+from libs.messaging.base import MessageBroker
+from libs.messaging.memory import InMemoryBroker
+from libs.models.video_metadata import VideoMetadataDTO
+from libs.storage.memory import (
+    AsyncInMemoryStorage,
+    AsyncInMemoryVideoStorage,
+    InMemoryStorage,
+    InMemoryVideoStorage,
+)
+from services.video_metadata_service.app import create_app
+from services.video_metadata_service.service import (
+    AsyncVideoMetadataService,
+    VideoMetadataService,
+    set_async_service,
+)
+
+from .bench_read_path import make_document
+from .bench_search_with_mongo import LatencyMongo
+
+SUITES = ("consumer", "routes", "dto", "fanout")
+HIGHER = "higher"
+LOWER = "lower"
+
+Metrics = Dict[str, Dict[str, Any]]
+
+logger = logging.getLogger("bench")
+
+
+@dataclass
+class Backends:
+    """Services and broker plumbing a benchmark run talks to."""
+
+    service: VideoMetadataService
+    api_service: AsyncVideoMetadataService
+    make_broker: Callable[[], MessageBroker[VideoMetadataDTO]]
+    publish: Callable[[MessageBroker[VideoMetadataDTO], List[bytes]], None]
+    aggregations: bool
+    fake_mongo: Optional[AsyncInMemoryStorage[Dict[str, Any]]] = None
+
+
+def memory_backends(mongo_rtt_ms: float) -> Backends:
+    def publish(broker: MessageBroker[VideoMetadataDTO], bodies: List[bytes]) -> None:
+        assert isinstance(broker, InMemoryBroker)
+        for body in bodies:
+            broker.publish(body)
+
+    mongo = LatencyMongo(mongo_rtt_ms / 1000)
+    sync_mongo: Any = InMemoryStorage(key=lambda doc: doc["_id"])
+    return Backends(
+        service=VideoMetadataService(InMemoryVideoStorage(), sync_mongo, logger),
+        api_service=AsyncVideoMetadataService(AsyncInMemoryVideoStorage(), mongo, logger),
+        make_broker=lambda: InMemoryBroker(VideoMetadataDTO),
+        publish=publish,
+        aggregations=False,
+        fake_mongo=mongo,
+    )
+
+
+def live_backends() -> Backends:
+    # Imported lazily: Settings is validated from the environment on import.
+    import pika
+
+    from libs.config import get_settings
+    from services.video_metadata_service.bootstrap import (
+        build_async_service,
+        build_broker,
+        build_service,
+    )
+
+    settings = get_settings()
+
+    def publish(_broker: MessageBroker[VideoMetadataDTO], bodies: List[bytes]) -> None:
+        connection = pika.BlockingConnection(pika.URLParameters(settings.rabbitmq_url))
+        channel = connection.channel()
+        channel.queue_declare(queue=settings.video_metadata_queue, durable=True)
+        for body in bodies:
+            channel.basic_publish("", settings.video_metadata_queue, body)
+        connection.close()
+
+    service = build_service(settings, logger)
+    service.setup()
+    return Backends(
+        service=service,
+        api_service=build_async_service(settings, logger),
+        make_broker=lambda: build_broker(settings),
+        publish=publish,
+        aggregations=True,
+    )
+
+
+def _metric(value: float, unit: str, better: str) -> Dict[str, Any]:
+    return {"value": round(value, 4), "unit": unit, "better": better}
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def _message(video_id: str, frames: int) -> bytes:
+    return orjson.dumps(make_document(video_id, frames))
+
+
+def load_payloads(path: str) -> List[bytes]:
+    """Message bodies from an NDJSON file written by ``tools/generate_mocks.py --output``."""
+    with open(path, "rb") as fh:
+        return [line.rstrip(b"\n") for line in fh if line.strip()]
+
+
+def _valid(body: bytes) -> bool:
+    try:
+        VideoMetadataDTO.parse_obj(orjson.loads(body))
+    except (ValidationError, ValueError):
+        return False
+    return True
+
+
+def bench_consumer(
+    backends: Backends, messages: int, frames: int, payloads: Optional[List[bytes]] = None
+) -> Metrics:
+    """Messages per second from publish to storage, per consume mode.
+
+    With *payloads* both modes replay those bodies instead of generated ones.
+    Only valid messages reach the service, so throughput counts those.
+    """
+    service = backends.service
+    metrics: Metrics = {}
+    if payloads is not None:
+        messages = sum(1 for body in payloads if _valid(body))
+    for mode in ("single", "batch"):
+        broker = backends.make_broker()
+        if payloads is not None:
+            backends.publish(broker, payloads)
+        else:
+            backends.publish(
+                broker, [_message(f"bench-consumer-{mode}-{i}", frames) for i in range(messages)]
+            )
+        finished = threading.Event()
+        processed = [0]
+        lock = threading.Lock()
+
+        def done(count: int) -> None:
+            with lock:
+                processed[0] += count
+                if processed[0] >= messages:
+                    finished.set()
+
+        def handle(dto: VideoMetadataDTO) -> None:
+            service.create_from_message(dto)
+            done(1)
+
+        def handle_batch(dtos: List[VideoMetadataDTO]) -> List[bool]:
+            results = service.create_many_from_messages(dtos)
+            done(len(results))
+            return results
+
+        began = time.perf_counter()
+        if mode == "batch":
+            broker.start_consuming_batches(handle_batch)
+        else:
+            broker.start_consuming(handle)
+        completed = finished.wait(timeout=max(60.0, messages / 100))
+        elapsed = time.perf_counter() - began
+        broker.stop(timeout=10)
+        if not completed:
+            logger.warning("consumer.%s: only %d/%d messages processed", mode, processed[0], messages)
+        metrics[f"consumer.{mode}.msgs_per_s"] = _metric(processed[0] / elapsed, "msg/s", HIGHER)
+    return metrics
+
+
+Route = Tuple[str, str, Dict[str, Any]]
+
+
+def _routes(video_id: str, scratch_id: str, aggregations: bool) -> Dict[str, Route]:
+    match_all = json.dumps({"query": {"match_all": {}}, "size": 10})
+    algorithm = {
+        "type": "actionRecognition",
+        "results": [
+            {"frame_num": 0, "timestamp": "00:00:00.0", "action": "waving",
+             "confidence": 0.9, "clip_length": 16}
+        ],
+    }
+    routes: Dict[str, Route] = {
+        "list_videos": ("GET", "/videos", {"params": {"limit": 100}}),
+        "list_videos_ndjson": ("GET", "/videos", {"params": {"limit": 100, "format": "ndjson"}}),
+        "search_videos": ("GET", "/videos/search", {"params": {"query": match_all}}),
+        "filter_videos": (
+            "GET", "/videos/filter", {"params": {"min_confidence": 0.5, "fields": "timestamp", "size": 100}}
+        ),
+        "search_videos_with_mongo": (
+            "GET", "/videos/search_with_mongo", {"params": {"query": match_all}}
+        ),
+        "read_video": ("GET", f"/videos/{video_id}", {}),
+        "read_frames": ("GET", f"/videos/{video_id}/frames", {"params": {"limit": 100}}),
+        "update_video": ("PUT", f"/videos/{scratch_id}", {"json": {"extra": {"bench": True}}}),
+        "append_algorithms": ("POST", f"/videos/{scratch_id}/algorithms", {"json": [algorithm]}),
+        "delete_video": ("DELETE", f"/videos/{scratch_id}", {}),
+        "cache_stats": ("GET", "/cache/stats", {}),
+        "query_cache_stats": ("GET", "/cache/search/stats", {}),
+    }
+    if aggregations:
+        routes.update(
+            {
+                "action_histogram": ("GET", "/analytics/actions", {}),
+                "confidence_percentiles": ("GET", "/analytics/confidence", {}),
+                "action_timeline": ("GET", "/analytics/timeline", {}),
+            }
+        )
+    return routes
+
+
+async def bench_routes(backends: Backends, requests: int, videos: int, frames: int) -> Metrics:
+    """p50/p99 latency of each route through the ASGI app (no network)."""
+    service = backends.api_service
+    set_async_service(service)
+    app = create_app(import_only=True)
+
+    async def seed(video_id: str) -> None:
+        await service.create_from_message(VideoMetadataDTO(**make_document(video_id, frames)))
+
+    for i in range(videos):
+        await seed(f"bench-route-{i}")
+    scratch_id = "bench-route-scratch"
+
+    metrics: Metrics = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, (method, path, kwargs) in _routes(
+            "bench-route-0", scratch_id, backends.aggregations
+        ).items():
+            samples: List[float] = []
+            for _ in range(requests):
+                # Every mutating request starts from the same fresh document.
+                await seed(scratch_id)
+                began = time.perf_counter()
+                response = await client.request(method, path, **kwargs)
+                samples.append((time.perf_counter() - began) * 1000)
+                response.raise_for_status()
+            metrics[f"routes.{name}.p50_ms"] = _metric(_percentile(samples, 50), "ms", LOWER)
+            metrics[f"routes.{name}.p99_ms"] = _metric(_percentile(samples, 99), "ms", LOWER)
+    return metrics
+
+
+def _per_call_us(fn: Callable[[], Any], min_time: float = 0.2) -> float:
+    fn()
+    calls = 0
+    began = time.perf_counter()
+    while True:
+        fn()
+        calls += 1
+        elapsed = time.perf_counter() - began
+        if elapsed >= min_time:
+            return elapsed / calls * 1e6
+
+
+def bench_dto(frame_counts: List[int]) -> Metrics:
+    """Microseconds per conversion step of ``VideoMetadataDTO`` by frame count."""
+    metrics: Metrics = {}
+    for frames in frame_counts:
+        source = make_document("bench-dto", frames)
+        dto = VideoMetadataDTO(**source)
+        domain = dto.to_domain()
+        steps: Dict[str, Callable[[], Any]] = {
+            "parse": lambda: VideoMetadataDTO(**source),
+            "to_domain": dto.to_domain,
+            "from_domain": lambda: VideoMetadataDTO.from_domain(domain),
+            "dict": dto.dict,
+            "json": dto.json,
+            "orjson_source": lambda: orjson.dumps(source),
+        }
+        for step, fn in steps.items():
+            metrics[f"dto.{frames}_frames.{step}_us"] = _metric(_per_call_us(fn), "us", LOWER)
+    return metrics
+
+
+async def bench_fanout(backends: Backends, hit_counts: List[int], repeat: int) -> Metrics:
+    """Median ``search_with_mongo`` latency by number of search hits."""
+    service = backends.api_service
+    for i in range(max(hit_counts)):
+        video_id = f"bench-fanout-{i}"
+        await service.create_from_message(VideoMetadataDTO(**make_document(video_id, 1)))
+        if backends.fake_mongo is not None:
+            await backends.fake_mongo.create({"_id": video_id, "title": f"Video {i}"})
+
+    metrics: Metrics = {}
+    for hits in hit_counts:
+        query = {"query": {"match_all": {}}, "size": hits}
+        samples = []
+        for _ in range(repeat):
+            began = time.perf_counter()
+            await service.search_with_mongo(query)
+            samples.append((time.perf_counter() - began) * 1000)
+        metrics[f"fanout.{hits}_hits.p50_ms"] = _metric(_percentile(samples, 50), "ms", LOWER)
+    return metrics
+
+
+def compare(current: Metrics, baseline: Metrics, tolerance: float) -> List[str]:
+    """Print a comparison table and return the names of regressed metrics."""
+    regressions = []
+    print(f"{'metric':<48} {'baseline':>12} {'current':>12} {'change':>9}", file=sys.stderr)
+    for name in sorted(set(current) & set(baseline)):
+        before, after = baseline[name]["value"], current[name]["value"]
+        change = (after - before) / before if before else 0.0
+        worse = -change if current[name]["better"] == HIGHER else change
+        flag = ""
+        if worse > tolerance:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(
+            f"{name:<48} {before:>12.3f} {after:>12.3f} {change:>+8.1%}{flag}",
+            file=sys.stderr,
+        )
+    return regressions
+
+
+async def _run_async(
+    suites: List[str], backends: Backends, args: argparse.Namespace
+) -> Metrics:
+    metrics: Metrics = {}
+    if "routes" in suites:
+        metrics.update(await bench_routes(backends, args.requests, args.videos, args.frames))
+    if "fanout" in suites:
+        metrics.update(await bench_fanout(backends, args.hits, args.repeat))
+    if args.backend == "live":
+        await backends.api_service.close()
+    return metrics
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    backends = live_backends() if args.backend == "live" else memory_backends(args.mongo_rtt_ms)
+    metrics: Metrics = {}
+    if "consumer" in args.only:
+        payloads = load_payloads(args.payloads) if args.payloads else None
+        metrics.update(bench_consumer(backends, args.messages, args.frames, payloads))
+    if "dto" in args.only:
+        metrics.update(bench_dto(args.dto_frames))
+    metrics.update(asyncio.run(_run_async(args.only, backends, args)))
+    return {
+        "meta": {
+            "backend": args.backend,
+            "payloads": args.payloads,
+            "created_at": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "metrics": metrics,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", choices=["memory", "live"], default="memory")
+    parser.add_argument("--only", nargs="+", choices=SUITES, default=list(SUITES))
+    parser.add_argument("--output", help="Write results JSON here instead of stdout")
+    parser.add_argument("--baseline", help="Results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed relative slowdown")
+    parser.add_argument("--messages", type=int, default=5000, help="Messages per consume mode")
+    parser.add_argument("--frames", type=int, default=10, help="Frames per ingested/seeded video")
+    parser.add_argument("--payloads", help="Replay this NDJSON file in the consumer suite")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per route")
+    parser.add_argument("--videos", type=int, default=100, help="Videos seeded for routes")
+    parser.add_argument("--dto-frames", type=int, nargs="+", default=[1, 100, 1000, 10000])
+    parser.add_argument("--hits", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--repeat", type=int, default=20, help="Samples per fan-out size")
+    parser.add_argument("--mongo-rtt-ms", type=float, default=1.0, help="Simulated Mongo RTT")
+    args = parser.parse_args()
+
+    results = run(args)
+    encoded = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as fh:
+            fh.write(encoded + "\n")
+    else:
+        print(encoded)
+
+    if args.baseline:
+        with open(args.baseline) as fh:
+            baseline = json.load(fh)["metrics"]
+        regressions = compare(results["metrics"], baseline, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} metric(s) regressed beyond {args.tolerance:.0%}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
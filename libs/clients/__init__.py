@@ -0,0 +1,3 @@
+from .registry import ClientOptions, ClientRegistry, RetryPolicy
+
+__all__ = ["ClientOptions", "ClientRegistry", "RetryPolicy"]
@@ -0,0 +1,234 @@
+"""Process-wide registry of pooled Elasticsearch and MongoDB clients.
+
+Every component that talks to the same URL gets the same client, and with it
+the same connection pool: the log handler and the metadata storage share one
+``Elasticsearch`` transport when they point at the same cluster. Clients are
+created lazily on first use with the pool size, timeouts and retry policy of
+the registry's :class:`ClientOptions`.
+"""
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, Optional, Tuple, Type, TypeVar
+
+if TYPE_CHECKING:
+    from elasticsearch import AsyncElasticsearch, Elasticsearch
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from pymongo import MongoClient
+
+R = TypeVar("R")
+
+logger = logging.getLogger(__name__)
+
+# Statuses Elasticsearch returns while it is overloaded or failing over.
+RETRY_ON_STATUS = (429, 502, 503, 504)
+
+
+@dataclass(frozen=True)
+class ClientOptions:
+    """Pooling, timeout and retry settings applied to every registry client.
+
+    ``connect_timeout`` bounds establishing a connection, separately from
+    ``request_timeout``, for MongoDB and the synchronous Elasticsearch client;
+    the aiohttp transport of the async client has no separate connect
+    timeout, so there ``request_timeout`` covers both. ``keepalive_seconds``
+    closes MongoDB connections idle for longer; the Elasticsearch transports
+    have no such option and keep idle connections open for reuse.
+    """
+
+    pool_size: int = 20
+    connect_timeout: float = 5.0
+    request_timeout: float = 10.0
+    keepalive_seconds: float = 300.0
+    max_retries: int = 3
+    retry_backoff_base: float = 0.2
+    retry_backoff_cap: float = 5.0
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Full-jitter exponential backoff before retry number *attempt* (1-based)."""
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+class RetryPolicy:
+    """Retry calls that fail with *transient* errors, sleeping with jittered backoff.
+
+    Errors in *giveup* are raised at once even if they are also transient.
+    Used for MongoDB reads; the Elasticsearch transports get the same
+    parameters and retry natively.
+    """
+
+    def __init__(
+        self,
+        max_retries: int = 0,
+        base: float = 0.2,
+        cap: float = 5.0,
+        transient: Tuple[Type[BaseException], ...] = (),
+        giveup: Tuple[Type[BaseException], ...] = (),
+    ) -> None:
+        self.max_retries = max_retries
+        self.base = base
+        self.cap = cap
+        self.transient = transient
+        self.giveup = giveup
+
+    def call(self, fn: Callable[[], R]) -> R:
+        attempt = 0
+        while True:
+            try:
+                return fn()
+            except self.transient as exc:
+                attempt += 1
+                if attempt > self.max_retries or isinstance(exc, self.giveup):
+                    raise
+                delay = backoff_delay(attempt, self.base, self.cap)
+                logger.warning("Transient error (%s), retry %d in %.2fs", exc, attempt, delay)
+                time.sleep(delay)
+
+    async def acall(self, fn: Callable[[], Awaitable[R]]) -> R:
+        attempt = 0
+        while True:
+            try:
+                return await fn()
+            except self.transient as exc:
+                attempt += 1
+                if attempt > self.max_retries or isinstance(exc, self.giveup):
+                    raise
+                delay = backoff_delay(attempt, self.base, self.cap)
+                logger.warning("Transient error (%s), retry %d in %.2fs", exc, attempt, delay)
+                await asyncio.sleep(delay)
+
+
+def _urllib3_node(opts: ClientOptions) -> Type[Any]:
+    """Urllib3 transport node that connects within ``connect_timeout``.
+
+    The client passes its ``request_timeout`` with every request, as a single
+    number urllib3 would also use for connecting; split it into a connect and
+    a read timeout instead.
+    """
+    import urllib3
+    from elastic_transport import Urllib3HttpNode
+    from elastic_transport.client_utils import DEFAULT
+
+    class Node(Urllib3HttpNode):
+        def perform_request(self, *args: Any, request_timeout: Any = DEFAULT, **kwargs: Any) -> Any:
+            if isinstance(request_timeout, (int, float)):
+                request_timeout = urllib3.Timeout(
+                    connect=min(opts.connect_timeout, request_timeout), read=request_timeout
+                )
+            return super().perform_request(*args, request_timeout=request_timeout, **kwargs)
+
+    return Node
+
+
+class ClientRegistry:
+    """Lazily created, shared clients keyed by kind and URL."""
+
+    def __init__(self, options: Optional[ClientOptions] = None) -> None:
+        self.options = options or ClientOptions()
+        self._clients: Dict[Tuple[str, str], Any] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, kind: str, url: str, factory: Callable[[], Any]) -> Any:
+        key = (kind, str(url))
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = self._clients[key] = factory()
+            return client
+
+    def _es_options(self) -> Dict[str, Any]:
+        opts = self.options
+        return {
+            "connections_per_node": opts.pool_size,
+            "request_timeout": opts.request_timeout,
+            "max_retries": opts.max_retries,
+            "retry_on_status": RETRY_ON_STATUS,
+            "retry_on_timeout": True,
+            "retry_backoff_base": opts.retry_backoff_base,
+            "retry_backoff_cap": opts.retry_backoff_cap,
+        }
+
+    def _mongo_options(self) -> Dict[str, Any]:
+        opts = self.options
+        return {
+            "maxPoolSize": opts.pool_size,
+            "maxIdleTimeMS": int(opts.keepalive_seconds * 1000),
+            "connectTimeoutMS": int(opts.connect_timeout * 1000),
+            "serverSelectionTimeoutMS": int(opts.connect_timeout * 1000),
+            "socketTimeoutMS": int(opts.request_timeout * 1000),
+            "retryReads": True,
+            "retryWrites": True,
+        }
+
+    def elasticsearch(self, url: str) -> "Elasticsearch":
+        from elasticsearch import Elasticsearch
+
+        return self._get(
+            "es",
+            url,
+            lambda: Elasticsearch(
+                str(url), node_class=_urllib3_node(self.options), **self._es_options()
+            ),
+        )
+
+    def async_elasticsearch(self, url: str) -> "AsyncElasticsearch":
+        from elasticsearch import AsyncElasticsearch
+
+        return self._get(
+            "es-async", url, lambda: AsyncElasticsearch(str(url), **self._es_options())
+        )
+
+    def mongo(self, url: str) -> "MongoClient[Dict[str, Any]]":
+        from pymongo import MongoClient
+
+        return self._get("mongo", url, lambda: MongoClient(str(url), **self._mongo_options()))
+
+    def async_mongo(self, url: str) -> "AsyncIOMotorClient":
+        from motor.motor_asyncio import AsyncIOMotorClient
+
+        return self._get(
+            "mongo-async", url, lambda: AsyncIOMotorClient(str(url), **self._mongo_options())
+        )
+
+    def mongo_retry(self) -> RetryPolicy:
+        """Retry dropped connections; server selection already waited ``connect_timeout``."""
+        from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
+
+        opts = self.options
+        return RetryPolicy(
+            opts.max_retries,
+            opts.retry_backoff_base,
+            opts.retry_backoff_cap,
+            transient=(ConnectionFailure,),
+            giveup=(ServerSelectionTimeoutError,),
+        )
+
+    def close(self) -> None:
+        """Close the synchronous clients."""
+        with self._lock:
+            for (kind, url), client in list(self._clients.items()):
+                if kind in ("es", "mongo"):
+                    client.close()
+                    del self._clients[(kind, url)]
+
+    async def aclose(self) -> None:
+        """Close the asynchronous clients; call from the event loop that used them."""
+        with self._lock:
+            clients = [
+                (key, client)
+                for key, client in self._clients.items()
+                if key[0] in ("es-async", "mongo-async")
+            ]
+            for key, _ in clients:
+                del self._clients[key]
+        for (kind, _url), client in clients:
+            if kind == "es-async":
+                await client.close()
+            else:
+                client.close()
+
@@ -1,4 +1,7 @@
-from pydantic import BaseSettings, AnyUrl
+from functools import lru_cache
+from typing import Any, Dict, Literal, Optional
+
+from pydantic import BaseSettings, AnyUrl, validator
 
 
 class Settings(BaseSettings):
@@ -9,17 +12,82 @@ class Settings(BaseSettings):
 
     elasticsearch_url: AnyUrl
     elasticsearch_index: str
+    elasticsearch_retry_on_conflict: int = 3
+    elasticsearch_partitioned: bool = False
+    elasticsearch_split_frames: bool = False
 
     log_elasticsearch_url: AnyUrl
     log_elasticsearch_index: str
+    log_buffer_size: int = 10000
+    log_batch_size: int = 500
+    log_flush_interval_seconds: float = 1.0
+    log_drop_policy: Literal["drop_newest", "drop_oldest", "block"] = "drop_newest"
+    log_close_timeout_seconds: float = 5.0
 
     mongodb_url: AnyUrl
     mongodb_db: str
     mongodb_collection: str
 
+    client_pool_size: int = 20
+    client_connect_timeout: float = 5.0
+    client_request_timeout: float = 10.0
+    client_keepalive_seconds: float = 300.0
+    client_max_retries: int = 3
+    client_retry_backoff_base: float = 0.2
+    client_retry_backoff_cap: float = 5.0
+
+    consumer_batching: bool = False
+    consumer_batch_size: int = 500
+    consumer_batch_timeout_ms: int = 200
+    consumer_prefetch: int = 1000
+    # Decode and validate messages in this many processes; 0 decodes inline.
+    consumer_decode_workers: int = 0
+    # Deliveries decoded ahead per consumer; 0 means 4 per decode worker.
+    consumer_decode_max_in_flight: int = 0
+
+    ingest_dedup_enabled: bool = True
+    ingest_dedup_max_entries: int = 100000
+    ingest_dedup_ttl_seconds: float = 3600.0
+
+    api_consumer_enabled: bool = True
+    worker_concurrency: int = 1
+    worker_shutdown_timeout: float = 30.0
+
+    # The read caches are only invalidated by writes made in this process, so
+    # unless set they are enabled only when the consumer runs in the API too.
+    video_cache_enabled: Optional[bool] = None
+    video_cache_max_entries: int = 10000
+    video_cache_ttl_seconds: float = 30.0
+    video_cache_negative_ttl_seconds: float = 5.0
+
+    search_cache_enabled: Optional[bool] = None
+    search_cache_max_bytes: int = 64 * 1024 * 1024
+    search_cache_ttl_seconds: float = 10.0
+
+    metrics_enabled: bool = True
+    worker_metrics_port: int = 9100
+    profile_sample_rate: float = 0.0
+    profile_slow_ms: float = 500.0
+    profile_dir: str = "/tmp/video-metadata-profiles"
+
+    startup_warmup_timeout: float = 10.0
+    health_check_timeout: float = 2.0
+
+    # Most ids accepted by one /videos/batch_get or /videos/batch_delete call.
+    batch_max_size: int = 500
+    # Largest ``size`` accepted by /videos/filter.
+    search_max_size: int = 1000
+
+    @validator("video_cache_enabled", "search_cache_enabled", always=True)
+    def _default_to_consumer(cls, value: Optional[bool], values: Dict[str, Any]) -> bool:
+        return values.get("api_consumer_enabled", True) if value is None else value
+
     class Config:
         env_file = ".env"
         case_sensitive = False
 
 
-settings = Settings()
+@lru_cache()
+def get_settings() -> Settings:
+    """Validate settings from the environment on first use and reuse them afterwards."""
+    return Settings()
@@ -1,26 +1,153 @@
 """Elasticsearch logging handler."""
 
 import logging
-from typing import Any, Dict
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
 
 from elasticsearch import Elasticsearch
 
+from libs.metrics.collectors import LOG_RECORDS_DROPPED
+
+DROP_NEWEST = "drop_newest"
+DROP_OLDEST = "drop_oldest"
+BLOCK = "block"
+
 
 class ElasticsearchLogHandler(logging.Handler):
-    """Logging handler that ships logs to Elasticsearch."""
+    """Logging handler that ships logs to Elasticsearch.
+
+    ``emit`` only formats the record and puts it on a bounded in-memory
+    queue; a background thread sends queued records with ``_bulk`` requests
+    once ``batch_size`` records are waiting or ``flush_interval`` seconds have
+    passed. When the queue is full, ``drop_policy`` decides whether the new
+    record is dropped (``drop_newest``), the oldest queued record is dropped
+    (``drop_oldest``) or the caller waits (``block``). Dropped records are
+    counted in :attr:`dropped` and ``log_records_dropped_total``. Pending
+    records are sent on :meth:`flush` and :meth:`close`, which
+    :func:`logging.shutdown` calls at exit; both give up after
+    *close_timeout* seconds so an unreachable cluster cannot hang shutdown.
+    Pass *client* to reuse a pooled client instead of opening a new one.
+    """
 
-    def __init__(self, url: str, index: str) -> None:
+    def __init__(
+        self,
+        url: str,
+        index: str,
+        buffer_size: int = 10000,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        drop_policy: str = DROP_NEWEST,
+        client: Optional[Elasticsearch] = None,
+        close_timeout: float = 5.0,
+    ) -> None:
         super().__init__()
-        self.client = Elasticsearch(url)
+        if drop_policy not in (DROP_NEWEST, DROP_OLDEST, BLOCK):
+            raise ValueError(f"Unknown drop policy: {drop_policy}")
+        self.client = client if client is not None else Elasticsearch(url)
         self.index = index
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.drop_policy = drop_policy
+        self.close_timeout = close_timeout
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+        self._dropped_metric = LOG_RECORDS_DROPPED.labels(index)
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=buffer_size)
+        self._stopping = threading.Event()
+        self._flusher = threading.Thread(
+            target=self._run, name="es-log-flusher", daemon=True
+        )
+        self._flusher.start()
 
-    def emit(self, record: logging.LogRecord) -> None:  # pragma: no cover - best effort
+    def emit(self, record: logging.LogRecord) -> None:
         try:
             doc: Dict[str, Any] = {
+                "@timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
                 "level": record.levelname,
                 "message": self.format(record),
                 "logger": record.name,
             }
-            self.client.index(index=self.index, document=doc)
+        except Exception:  # pragma: no cover - best effort
+            self.handleError(record)
+            return
+
+        if self.drop_policy == BLOCK:
+            self._queue.put(doc)
+            return
+        while True:
+            try:
+                self._queue.put_nowait(doc)
+                return
+            except queue.Full:
+                self._count_dropped()
+                if self.drop_policy == DROP_NEWEST:
+                    return
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def _count_dropped(self) -> None:
+        with self._dropped_lock:
+            self.dropped += 1
+        self._dropped_metric.inc()
+
+    def _drain(self, timeout: float) -> List[Dict[str, Any]]:
+        """Collect up to ``batch_size`` records, waiting at most *timeout* seconds."""
+        batch: List[Dict[str, Any]] = []
+        deadline = time.monotonic() + timeout
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _send(
+        self, batch: List[Dict[str, Any]], timeout: Optional[float] = None
+    ) -> None:
+        operations: List[Dict[str, Any]] = []
+        for doc in batch:
+            operations.append({"index": {"_index": self.index}})
+            operations.append(doc)
+        client = self.client
+        if timeout is not None:
+            client = client.options(request_timeout=timeout, max_retries=0)
+        try:
+            client.bulk(operations=operations)
         except Exception:
             pass
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            batch = self._drain(self.flush_interval)
+            if batch:
+                self._send(batch)
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Send queued records from the calling thread for at most *timeout* seconds.
+
+        *timeout* defaults to ``close_timeout``; records still queued then are kept.
+        """
+        deadline = time.monotonic() + (self.close_timeout if timeout is None else timeout)
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            batch = self._drain(0)
+            if not batch:
+                return
+            self._send(batch, remaining)
+
+    def close(self) -> None:
+        self._stopping.set()
+        self._flusher.join(self.flush_interval + self.close_timeout)
+        self.flush()
+        super().close()
@@ -1,7 +1,7 @@
 """Abstract message broker interfaces."""
 
 from abc import ABC, abstractmethod
-from typing import Callable, Generic, TypeVar
+from typing import Callable, Generic, List, Optional, TypeVar
 
 from pydantic import BaseModel
 
@@ -17,3 +17,22 @@ class MessageBroker(ABC, Generic[T]):
         """Start consuming messages, invoking *callback* for each parsed payload."""
         raise NotImplementedError
 
+    @abstractmethod
+    def start_consuming_batches(self, callback: Callable[[List[T]], List[bool]]) -> None:
+        """Start consuming messages in batches.
+
+        *callback* receives a list of parsed payloads and returns a success
+        flag per payload. Successful messages are acknowledged together;
+        failed ones are rejected individually.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def alive(self) -> bool:
+        """Whether every consumer started so far is still running."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop consuming, letting in-flight messages finish within *timeout* seconds."""
+        raise NotImplementedError
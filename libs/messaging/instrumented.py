@@ -0,0 +1,55 @@
+"""Message broker decorator timing consumer callbacks in Prometheus."""
+
+import time
+from typing import Callable, Generic, List, Optional, TypeVar
+
+from pydantic import BaseModel
+
+from libs.metrics.collectors import BROKER_HANDLER_LATENCY
+
+from .base import MessageBroker
+
+
+T = TypeVar("T", bound=BaseModel)
+
+
+class InstrumentedBroker(MessageBroker[T], Generic[T]):
+    """:class:`MessageBroker` decorator recording callback latency for *queue*.
+
+    Delivery outcomes, ack latency and validation failures are recorded by
+    the broker implementations themselves, since only they see raw deliveries.
+    """
+
+    def __init__(self, inner: MessageBroker[T], queue: str) -> None:
+        self.inner = inner
+        self.queue = queue
+
+    def start_consuming(self, callback: Callable[[T], None]) -> None:
+        latency = BROKER_HANDLER_LATENCY.labels(self.queue, "single")
+
+        def timed(message: T) -> None:
+            started = time.perf_counter()
+            try:
+                callback(message)
+            finally:
+                latency.observe(time.perf_counter() - started)
+
+        self.inner.start_consuming(timed)
+
+    def start_consuming_batches(self, callback: Callable[[List[T]], List[bool]]) -> None:
+        latency = BROKER_HANDLER_LATENCY.labels(self.queue, "batch")
+
+        def timed(messages: List[T]) -> List[bool]:
+            started = time.perf_counter()
+            try:
+                return callback(messages)
+            finally:
+                latency.observe(time.perf_counter() - started)
+
+        self.inner.start_consuming_batches(timed)
+
+    def alive(self) -> bool:
+        return self.inner.alive()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self.inner.stop(timeout)
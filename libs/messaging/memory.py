@@ -0,0 +1,144 @@
+"""In-process message broker for tests, benchmarks and local runs without RabbitMQ."""
+
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Generic, List, Optional, Type, TypeVar, Union
+
+import orjson
+from pydantic import BaseModel, ValidationError
+
+from .base import MessageBroker
+
+
+T = TypeVar("T", bound=BaseModel)
+
+logger = logging.getLogger(__name__)
+
+
+class InMemoryBroker(MessageBroker[T], Generic[T]):
+    """Queue-backed :class:`MessageBroker` with RabbitMQ-like ack semantics.
+
+    Messages are published as raw bodies and parsed with *model* on the
+    consumer side, exactly like :class:`~libs.messaging.rabbitmq.RabbitMQBroker`,
+    so validation cost is part of the measured path. Counters record acked
+    (including dropped invalid payloads, which RabbitMQ acks too), rejected
+    (refused by the callback) and requeued messages.
+    """
+
+    def __init__(
+        self,
+        model: Type[T],
+        batch_size: int = 500,
+        batch_timeout_ms: int = 200,
+        poll_interval: float = 0.1,
+    ) -> None:
+        self.model = model
+        self.batch_size = batch_size
+        self.batch_timeout_ms = batch_timeout_ms
+        self.poll_interval = poll_interval
+        self._queue: "queue.Queue[bytes]" = queue.Queue()
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self.acked = 0
+        self.rejected = 0
+        self.requeued = 0
+
+    def publish(self, body: Union[bytes, str, Any]) -> None:
+        """Enqueue *body*; anything that is not bytes/str is JSON-encoded first."""
+        if isinstance(body, str):
+            body = body.encode()
+        elif not isinstance(body, bytes):
+            body = orjson.dumps(body, default=str)
+        self._queue.put(body)
+
+    def join(self) -> None:
+        """Block until every published message has been acked or rejected."""
+        self._queue.join()
+
+    def _parse(self, body: bytes) -> Optional[T]:
+        try:
+            return self.model.parse_obj(orjson.loads(body))
+        except (ValidationError, ValueError):
+            return None
+
+    def _settle(self, acked: int = 0, rejected: int = 0) -> None:
+        with self._lock:
+            self.acked += acked
+            self.rejected += rejected
+        for _ in range(acked + rejected):
+            self._queue.task_done()
+
+    def _requeue(self, bodies: List[bytes]) -> None:
+        with self._lock:
+            self.requeued += len(bodies)
+        for body in bodies:
+            self._queue.put(body)
+            self._queue.task_done()
+
+    def _spawn(self, target: Callable[[], None]) -> None:
+        thread = threading.Thread(target=target, daemon=True)
+        self._threads.append(thread)
+        thread.start()
+
+    def start_consuming(self, callback: Callable[[T], None]) -> None:
+        def _consume() -> None:
+            while not self._stopping.is_set():
+                try:
+                    body = self._queue.get(timeout=self.poll_interval)
+                except queue.Empty:
+                    continue
+                message = self._parse(body)
+                try:
+                    if message is not None:
+                        callback(message)
+                except Exception:
+                    # Like RabbitMQBroker: requeue and let the next delivery retry it.
+                    logger.warning("Callback failed, requeueing message", exc_info=True)
+                    self._requeue([body])
+                    continue
+                self._settle(acked=1)
+
+        self._spawn(_consume)
+
+    def start_consuming_batches(self, callback: Callable[[List[T]], List[bool]]) -> None:
+        def _consume() -> None:
+            timeout = self.batch_timeout_ms / 1000.0
+            while not self._stopping.is_set():
+                pending: List[bytes] = []
+                deadline = time.monotonic() + timeout
+                while len(pending) < self.batch_size:
+                    remaining = deadline - time.monotonic() if pending else self.poll_interval
+                    try:
+                        pending.append(self._queue.get(timeout=max(0.0, remaining)))
+                    except queue.Empty:
+                        break
+                if not pending:
+                    continue
+
+                parsed = [self._parse(body) for body in pending]
+                valid = [msg for msg in parsed if msg is not None]
+                try:
+                    results = callback(valid) if valid else []
+                except Exception:
+                    logger.warning("Batch of %d messages failed, requeueing", len(pending))
+                    self._requeue(pending)
+                    continue
+                # Invalid payloads are dropped and acked, as RabbitMQBroker does.
+                rejected = sum(1 for ok in results if not ok)
+                self._settle(acked=len(pending) - rejected, rejected=rejected)
+
+        self._spawn(_consume)
+
+    def alive(self) -> bool:
+        return all(thread.is_alive() for thread in self._threads)
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stopping.set()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in self._threads:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            thread.join(remaining)
+        self._threads = [t for t in self._threads if t.is_alive()]
@@ -0,0 +1,10 @@
+from .collectors import CONTENT_TYPE_LATEST, observe_storage, render
+from .middleware import MetricsMiddleware, SlowRequestProfiler
+
+__all__ = [
+    "CONTENT_TYPE_LATEST",
+    "MetricsMiddleware",
+    "SlowRequestProfiler",
+    "observe_storage",
+    "render",
+]
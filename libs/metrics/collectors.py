@@ -0,0 +1,96 @@
+"""Prometheus collectors shared by the storage, messaging and HTTP layers.
+
+All collectors live in the default ``prometheus_client`` registry and are
+created once at import time; label values are kept to small, fixed sets
+(backend, operation, queue, route template) so cardinality stays bounded.
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+# Storage round trips are usually sub-millisecond to a few hundred ms; bulk
+# requests can take seconds.
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+STORAGE_LATENCY = Histogram(
+    "storage_operation_seconds",
+    "Latency of storage backend operations",
+    ["backend", "operation"],
+    buckets=LATENCY_BUCKETS,
+)
+STORAGE_ERRORS = Counter(
+    "storage_errors_total",
+    "Storage backend operations that raised",
+    ["backend", "operation", "error"],
+)
+
+BROKER_MESSAGES = Counter(
+    "broker_messages_total",
+    "Messages handled by consumers, by outcome (acked, rejected, requeued)",
+    ["queue", "outcome"],
+)
+BROKER_VALIDATION_FAILURES = Counter(
+    "broker_validation_failures_total",
+    "Messages dropped because they were not valid JSON or failed model validation",
+    ["queue"],
+)
+BROKER_HANDLER_LATENCY = Histogram(
+    "broker_handler_seconds",
+    "Time spent in the consumer callback per message or batch",
+    ["queue", "mode"],
+    buckets=LATENCY_BUCKETS,
+)
+BROKER_ACK_LATENCY = Histogram(
+    "broker_ack_seconds",
+    "Time from delivery to ack/nack of a message",
+    ["queue"],
+    buckets=LATENCY_BUCKETS,
+)
+
+INGEST_MESSAGES = Counter(
+    "ingest_messages_total",
+    "Ingested messages, by outcome (written, deduplicated)",
+    ["outcome"],
+)
+
+LOG_RECORDS_DROPPED = Counter(
+    "log_records_dropped_total",
+    "Log records discarded because the Elasticsearch shipping buffer was full",
+    ["index"],
+)
+
+HTTP_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "Requests currently being served",
+    ["method", "route"],
+)
+HTTP_LATENCY = Histogram(
+    "http_request_seconds",
+    "HTTP request latency",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+
+
+@contextmanager
+def observe_storage(backend: str, operation: str) -> Iterator[None]:
+    """Time a storage call and count it as an error if it raises."""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception as exc:
+        STORAGE_ERRORS.labels(backend, operation, type(exc).__name__).inc()
+        raise
+    finally:
+        STORAGE_LATENCY.labels(backend, operation).observe(time.perf_counter() - started)
+
+
+def render() -> bytes:
+    """Current values of all collectors in the Prometheus text format."""
+    return generate_latest()
+
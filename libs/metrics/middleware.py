@@ -0,0 +1,120 @@
+"""ASGI middleware recording per-route request metrics and profiling slow requests."""
+
+import cProfile
+import logging
+import os
+import random
+import re
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, MutableMapping, Optional
+
+from starlette.routing import Match
+
+from .collectors import HTTP_IN_FLIGHT, HTTP_LATENCY
+
+Scope = MutableMapping[str, Any]
+Message = MutableMapping[str, Any]
+Receive = Callable[[], Awaitable[Message]]
+Send = Callable[[Message], Awaitable[None]]
+ASGIApp = Callable[[Scope, Receive, Send], Awaitable[None]]
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+logger = logging.getLogger(__name__)
+
+
+def _route_template(scope: Scope) -> str:
+    """Path template of the route that will serve *scope* (``/videos/{video_id}``)."""
+    app = scope.get("app")
+    for route in getattr(getattr(app, "router", None), "routes", []):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", UNMATCHED_ROUTE)
+    return UNMATCHED_ROUTE
+
+
+class SlowRequestProfiler:
+    """Opt-in cProfile hook for individual slow requests.
+
+    A random ``sample_rate`` fraction of requests runs under ``cProfile``;
+    when such a request takes longer than ``slow_ms`` its stats are written to
+    ``output_dir`` as a ``.prof`` file (open with ``snakeviz`` or ``pstats``).
+    At most one request is profiled at a time. The profile covers everything
+    the event loop ran meanwhile, so concurrent requests can show up in it.
+    """
+
+    def __init__(self, sample_rate: float, slow_ms: float, output_dir: str) -> None:
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.output_dir = output_dir
+        self._busy = threading.Lock()
+
+    def start(self) -> Optional[cProfile.Profile]:
+        if random.random() >= self.sample_rate or not self._busy.acquire(blocking=False):
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:  # another profiler is active in this thread
+            self._busy.release()
+            return None
+        return profiler
+
+    def finish(
+        self, profiler: cProfile.Profile, method: str, route: str, elapsed: float
+    ) -> None:
+        try:
+            profiler.disable()
+            if elapsed * 1000 < self.slow_ms:
+                return
+            os.makedirs(self.output_dir, exist_ok=True)
+            slug = re.sub(r"[^A-Za-z0-9]+", "_", route).strip("_") or "root"
+            name = f"{int(time.time() * 1000)}-{method}-{slug}.prof"
+            path = os.path.join(self.output_dir, name)
+            profiler.dump_stats(path)
+            logger.warning(
+                "Slow request %s %s took %.0fms, profile written to %s",
+                method,
+                route,
+                elapsed * 1000,
+                path,
+            )
+        finally:
+            self._busy.release()
+
+
+class MetricsMiddleware:
+    """Track in-flight requests and latency per method and route template."""
+
+    def __init__(self, app: ASGIApp, profiler: Optional[SlowRequestProfiler] = None) -> None:
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = _route_template(scope)
+        status: Dict[str, int] = {"code": 500}
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        in_flight = HTTP_IN_FLIGHT.labels(method, route)
+        in_flight.inc()
+        profile = self.profiler.start() if self.profiler is not None else None
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            in_flight.dec()
+            HTTP_LATENCY.labels(method, route, str(status["code"])).observe(elapsed)
+            if profile is not None:
+                assert self.profiler is not None
+                self.profiler.finish(profile, method, route, elapsed)
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Dict, List
+
+from pydantic import BaseModel
+
+
+class ActionBucketDTO(BaseModel):
+    action: str
+    count: int
+
+    class Config:
+        extra = "forbid"
+
+
+class DateBucketDTO(BaseModel):
+    date: datetime
+    count: int
+
+    class Config:
+        extra = "forbid"
+
+
+class ActionHistogramDTO(BaseModel):
+    buckets: List[ActionBucketDTO]
+
+    class Config:
+        extra = "forbid"
+
+
+class ConfidencePercentilesDTO(BaseModel):
+    percentiles: Dict[str, float]
+
+    class Config:
+        extra = "forbid"
+
+
+class ActionTimelineDTO(BaseModel):
+    interval: str
+    buckets: List[DateBucketDTO]
+
+    class Config:
+        extra = "forbid"
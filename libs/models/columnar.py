@@ -0,0 +1,171 @@
+"""Columnar, array-backed representation of frame-level action results."""
+
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .video_metadata import (
+    ActionRecognitionResult,
+    ActionRecognitionResultDTO,
+    AlgorithmResult,
+    AlgorithmResultDTO,
+)
+
+
+class ActionRecognitionColumns:
+    """Frame results stored as parallel NumPy columns.
+
+    ``frame_num``, ``confidence`` and ``clip_length`` are numeric arrays;
+    ``action`` is stored as ``int32`` codes into the interned ``actions``
+    vocabulary. ``timestamp`` strings are kept in an object array so
+    conversion back to dataclasses/DTOs is lossless. Instances are treated as
+    immutable: filtering returns a new instance.
+    """
+
+    __slots__ = (
+        "frame_num",
+        "timestamp",
+        "action_codes",
+        "actions",
+        "confidence",
+        "clip_length",
+    )
+
+    def __init__(
+        self,
+        frame_num: np.ndarray,
+        timestamp: np.ndarray,
+        action_codes: np.ndarray,
+        actions: Tuple[str, ...],
+        confidence: np.ndarray,
+        clip_length: np.ndarray,
+    ) -> None:
+        self.frame_num = frame_num
+        self.timestamp = timestamp
+        self.action_codes = action_codes
+        self.actions = actions
+        self.confidence = confidence
+        self.clip_length = clip_length
+
+    def __len__(self) -> int:
+        return len(self.frame_num)
+
+    @classmethod
+    def _from_rows(
+        cls, rows: Iterable[Tuple[int, str, str, float, int]]
+    ) -> "ActionRecognitionColumns":
+        vocabulary: Dict[str, int] = {}
+        frame_num: List[int] = []
+        timestamp: List[str] = []
+        codes: List[int] = []
+        confidence: List[float] = []
+        clip_length: List[int] = []
+        for frame, ts, action, conf, clip in rows:
+            frame_num.append(frame)
+            timestamp.append(ts)
+            codes.append(vocabulary.setdefault(action, len(vocabulary)))
+            confidence.append(conf)
+            clip_length.append(clip)
+        timestamps = np.empty(len(timestamp), dtype=object)
+        timestamps[:] = timestamp
+        return cls(
+            frame_num=np.asarray(frame_num, dtype=np.int64),
+            timestamp=timestamps,
+            action_codes=np.asarray(codes, dtype=np.int32),
+            actions=tuple(vocabulary),
+            confidence=np.asarray(confidence, dtype=np.float64),
+            clip_length=np.asarray(clip_length, dtype=np.int64),
+        )
+
+    @classmethod
+    def from_results(
+        cls, results: Sequence[ActionRecognitionResult]
+    ) -> "ActionRecognitionColumns":
+        return cls._from_rows(
+            (r.frame_num, r.timestamp, r.action, r.confidence, r.clip_length) for r in results
+        )
+
+    @classmethod
+    def from_dtos(
+        cls, results: Sequence[ActionRecognitionResultDTO]
+    ) -> "ActionRecognitionColumns":
+        return cls._from_rows(
+            (r.frame_num, r.timestamp, r.action, r.confidence, r.clip_length) for r in results
+        )
+
+    @classmethod
+    def from_algorithm(cls, algo: AlgorithmResult) -> "ActionRecognitionColumns":
+        return cls.from_results(algo.results)
+
+    def _rows(self) -> Iterable[Tuple[int, str, str, float, int]]:
+        actions = self.actions
+        return zip(
+            self.frame_num.tolist(),
+            self.timestamp.tolist(),
+            [actions[c] for c in self.action_codes.tolist()],
+            self.confidence.tolist(),
+            self.clip_length.tolist(),
+        )
+
+    def to_results(self) -> List[ActionRecognitionResult]:
+        return [
+            ActionRecognitionResult(
+                frame_num=frame, timestamp=ts, action=action, confidence=conf, clip_length=clip
+            )
+            for frame, ts, action, conf, clip in self._rows()
+        ]
+
+    def to_dtos(self) -> List[ActionRecognitionResultDTO]:
+        # Values originate from validated results, so skip re-validation.
+        return [
+            ActionRecognitionResultDTO.construct(
+                frame_num=frame, timestamp=ts, action=action, confidence=conf, clip_length=clip
+            )
+            for frame, ts, action, conf, clip in self._rows()
+        ]
+
+    def to_algorithm_dto(self, algo_type: str) -> AlgorithmResultDTO:
+        return AlgorithmResultDTO.construct(type=algo_type, results=self.to_dtos())
+
+    def action_mask(self, actions: Iterable[str]) -> np.ndarray:
+        """Boolean mask of rows whose action is one of *actions*."""
+        wanted = [self.actions.index(a) for a in set(actions) if a in self.actions]
+        return np.isin(self.action_codes, np.asarray(wanted, dtype=np.int32))
+
+    def select(self, mask: np.ndarray) -> "ActionRecognitionColumns":
+        return ActionRecognitionColumns(
+            frame_num=self.frame_num[mask],
+            timestamp=self.timestamp[mask],
+            action_codes=self.action_codes[mask],
+            actions=self.actions,
+            confidence=self.confidence[mask],
+            clip_length=self.clip_length[mask],
+        )
+
+    def filter(
+        self,
+        min_confidence: Optional[float] = None,
+        max_confidence: Optional[float] = None,
+        start_frame: Optional[int] = None,
+        end_frame: Optional[int] = None,
+        actions: Optional[Iterable[str]] = None,
+    ) -> "ActionRecognitionColumns":
+        """Vectorized row filter; frame bounds are inclusive."""
+        mask = np.ones(len(self), dtype=bool)
+        if min_confidence is not None:
+            mask &= self.confidence >= min_confidence
+        if max_confidence is not None:
+            mask &= self.confidence <= max_confidence
+        if start_frame is not None:
+            mask &= self.frame_num >= start_frame
+        if end_frame is not None:
+            mask &= self.frame_num <= end_frame
+        if actions is not None:
+            mask &= self.action_mask(actions)
+        return self.select(mask)
+
+    def action_counts(self) -> Dict[str, int]:
+        counts = np.bincount(self.action_codes, minlength=len(self.actions))
+        return {action: int(n) for action, n in zip(self.actions, counts) if n}
@@ -3,9 +3,9 @@ from __future__ import annotations
 from dataclasses import dataclass
 from datetime import datetime
 from enum import Enum
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Literal, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, root_validator
 
 class AlgorithmType(str, Enum):
     ACTION_RECOGNITION = "actionRecognition"
@@ -101,6 +101,31 @@ class VideoMetadataDTO(BaseModel):
             extra=meta.extra,
         )
 
+class VideoMetadataPageDTO(BaseModel):
+    items: List[VideoMetadataDTO]
+    next_cursor: Optional[str] = Field(
+        None, description="Opaque cursor for the next page; null on the last page"
+    )
+
+    class Config:
+        extra = "forbid"
+
+class VideoSourceDTO(BaseModel):
+    """A stored video document as search and filter return it, possibly projected.
+
+    Only the selected fields are present: ``/videos/filter`` always includes
+    ``video_id``, while a ``_source`` filter in a search query may drop any
+    field, including nested ones inside ``algorithms``.
+    """
+
+    video_id: Optional[str] = None
+    timestamp: Optional[datetime] = None
+    algorithms: Optional[List[Dict[str, Any]]] = None
+    extra: Optional[Dict[str, Any]] = None
+
+    class Config:
+        extra = "forbid"
+
 class EnrichedVideoMetadataDTO(BaseModel):
     metadata: VideoMetadataDTO
     mongo: Optional[Dict[str, Any]] = None
@@ -116,6 +141,17 @@ class VideoMetadataUpdateDTO(BaseModel):
     class Config:
         extra = "forbid"
 
+    def changes(self) -> Dict[str, Any]:
+        """Domain-level fields this update sets, with the same semantics as :meth:`apply`."""
+        fields: Dict[str, Any] = {}
+        if self.timestamp:
+            fields["timestamp"] = self.timestamp
+        if self.algorithms is not None:
+            fields["algorithms"] = [a.to_domain() for a in self.algorithms]
+        if self.extra:
+            fields["extra"] = self.extra
+        return fields
+
     def apply(self, meta: VideoMetadata) -> VideoMetadata:
         return VideoMetadata(
             video_id=meta.video_id,
@@ -123,3 +159,60 @@ class VideoMetadataUpdateDTO(BaseModel):
             algorithms=[a.to_domain() for a in self.algorithms] if self.algorithms is not None else meta.algorithms,
             extra=self.extra or meta.extra,
         )
+
+
+class BatchGetRequestDTO(BaseModel):
+    ids: List[str] = Field(..., min_items=1)
+
+    class Config:
+        extra = "forbid"
+
+
+class BatchGetItemDTO(BaseModel):
+    video_id: str
+    status: Literal["found", "not_found"]
+    doc: Optional[VideoMetadataDTO] = None
+
+
+class BatchGetResponseDTO(BaseModel):
+    docs: List[BatchGetItemDTO]
+
+
+class BatchDeleteRequestDTO(BaseModel):
+    """Delete the listed ``ids`` or everything matching ``query``, not both."""
+
+    ids: Optional[List[str]] = Field(None, min_items=1)
+    query: Optional[Dict[str, Any]] = Field(
+        None, description="Elasticsearch query clause, e.g. {\"term\": {\"algorithms.type\": ...}}"
+    )
+
+    class Config:
+        extra = "forbid"
+
+    @root_validator(skip_on_failure=True)
+    def _ids_or_query(cls, values: Dict[str, Any]) -> Dict[str, Any]:
+        if (values.get("ids") is None) == (values.get("query") is None):
+            raise ValueError("exactly one of ids and query is required")
+        return values
+
+
+class BatchDeleteItemDTO(BaseModel):
+    video_id: str
+    status: Literal["deleted", "not_found"]
+
+
+class BatchDeleteResponseDTO(BaseModel):
+    results: Optional[List[BatchDeleteItemDTO]] = None
+    deleted: int
+
+
+class FrameResultDTO(ActionRecognitionResultDTO):
+    algorithm: int = Field(..., description="Index of the algorithm in the video's algorithms")
+    type: AlgorithmType
+
+
+class FramePageDTO(BaseModel):
+    items: List[FrameResultDTO]
+    next_cursor: Optional[str] = Field(
+        None, description="Opaque cursor for the next page; null on the last page"
+    )
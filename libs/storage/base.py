@@ -1,28 +1,147 @@
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Generic, List, Optional, TypeVar
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    Generic,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
 
 
 T = TypeVar("T")
 
 
+class StorageThrottledError(Exception):
+    """Raised when the backend asks the caller to back off (e.g. HTTP 429)."""
+
+
+class StorageUnavailableError(Exception):
+    """Raised when the backend cannot be reached or fails after retries.
+
+    Distinct from a missing object, so callers do not cache or report an
+    outage as "not found".
+    """
+
+
+class StorageConflictError(Exception):
+    """Raised when a write keeps losing optimistic concurrency checks."""
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor is malformed or has expired."""
+
+
+def _offset(cursor: Optional[str]) -> int:
+    if cursor is None:
+        return 0
+    try:
+        offset = int(cursor)
+    except ValueError as exc:
+        raise InvalidCursorError(cursor) from exc
+    if offset < 0:
+        raise InvalidCursorError(cursor)
+    return offset
+
+
 class Storage(ABC, Generic[T]):
     """Abstract storage interface."""
 
+    def setup(self) -> None:
+        """Create whatever indices/collections the backend needs; idempotent."""
+
+    def ping(self) -> None:
+        """Raise if the backend cannot be reached; backends without a server never raise."""
+
     @abstractmethod
     def create(self, obj: T) -> None:
         """Persist *obj*."""
         raise NotImplementedError
 
+    def create_many(self, objs: List[T]) -> List[bool]:
+        """Persist *objs*, returning a success flag per object in input order.
+
+        Backends with a native bulk API should override this; the default
+        falls back to one ``create`` call per object.
+        """
+        results: List[bool] = []
+        for obj in objs:
+            try:
+                self.create(obj)
+            except Exception:
+                results.append(False)
+            else:
+                results.append(True)
+        return results
+
     @abstractmethod
     def get(self, obj_id: str) -> Optional[T]:
         """Retrieve object by *obj_id*."""
         raise NotImplementedError
 
+    def get_source(self, obj_id: str) -> Optional[Dict[str, Any]]:
+        """Retrieve the stored JSON document for *obj_id* without building a ``T``."""
+        raise NotImplementedError
+
+    def get_many(
+        self, obj_ids: List[str], fields: Optional[List[str]] = None
+    ) -> Dict[str, T]:
+        """Retrieve the objects identified by *obj_ids*, keyed by id.
+
+        Missing ids are absent from the result. *fields* is a projection hint
+        that backends may use to return partial objects. The default issues
+        one ``get`` per id.
+        """
+        found: Dict[str, T] = {}
+        for obj_id in obj_ids:
+            obj = self.get(obj_id)
+            if obj is not None:
+                found[obj_id] = obj
+        return found
+
+    def get_sources(self, obj_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Stored JSON documents of *obj_ids*, keyed by id; missing ids are absent.
+
+        The default issues one ``get_source`` per id.
+        """
+        found: Dict[str, Dict[str, Any]] = {}
+        for obj_id in obj_ids:
+            source = self.get_source(obj_id)
+            if source is not None:
+                found[obj_id] = source
+        return found
+
     @abstractmethod
     def list(self) -> List[T]:
         """List all stored objects."""
         raise NotImplementedError
 
+    def list_page(
+        self, limit: int, cursor: Optional[str] = None
+    ) -> Tuple[List[T], Optional[str]]:
+        """Return up to *limit* objects after *cursor* and the cursor of the next page.
+
+        The next cursor is ``None`` once the last page has been returned. The
+        default pages over :meth:`list`; backends should override it with
+        native pagination.
+        """
+        offset = _offset(cursor)
+        items = self.list()[offset : offset + limit]
+        next_cursor = str(offset + limit) if len(items) == limit else None
+        return items, next_cursor
+
+    def iter_all(self, page_size: int = 500) -> Iterator[T]:
+        """Yield every stored object, fetching *page_size* objects at a time."""
+        cursor: Optional[str] = None
+        while True:
+            items, cursor = self.list_page(page_size, cursor)
+            yield from items
+            if cursor is None:
+                return
+
     @abstractmethod
     def update(self, obj_id: str, obj: T) -> None:
         """Update object identified by *obj_id*."""
@@ -33,7 +152,249 @@ class Storage(ABC, Generic[T]):
         """Delete object identified by *obj_id*."""
         raise NotImplementedError
 
+    def delete_many(self, obj_ids: List[str]) -> List[bool]:
+        """Delete *obj_ids*, returning whether each one existed, in input order.
+
+        Backends with a native bulk API should override this; the default
+        checks and deletes one id at a time.
+        """
+        results: List[bool] = []
+        for obj_id in obj_ids:
+            results.append(self.get(obj_id) is not None)
+            self.delete(obj_id)
+        return results
+
     @abstractmethod
     def search(self, query: Dict[str, Any]) -> List[T]:
         """Search for objects matching an Elasticsearch-style *query*."""
         raise NotImplementedError
+
+    def search_sources(self, query: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Like :meth:`search` but return the stored JSON documents as-is."""
+        raise NotImplementedError
+
+
+class VideoStorage(Storage[T], Generic[T]):
+    """:class:`Storage` of video metadata.
+
+    Adds what only the video index supports: stored content hashes, scripted
+    partial updates, delete by query, typed filters, aggregations and paging
+    through a video's frame results.
+    """
+
+    @abstractmethod
+    def content_hashes(self, obj_ids: List[str]) -> Dict[str, str]:
+        """Content hash stored with each of *obj_ids*, keyed by id.
+
+        Ids without a stored hash are absent, so callers write them.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def partial_update(
+        self,
+        obj_id: str,
+        fields: Dict[str, Any],
+        append: Optional[Dict[str, List[Any]]] = None,
+    ) -> Optional[T]:
+        """Set *fields* and extend the list fields in *append* in place.
+
+        Returns the updated object, or ``None`` if *obj_id* does not exist.
+        Backends apply the change atomically against the latest version and
+        raise :class:`StorageConflictError` if concurrent writers keep winning.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete_by_query(self, query: Dict[str, Any]) -> int:
+        """Delete every object matching an Elasticsearch-style *query*; return the count."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def filter_sources(
+        self,
+        filters: Dict[str, Any],
+        fields: Optional[List[str]],
+        size: int,
+    ) -> List[Dict[str, Any]]:
+        """The newest *size* stored documents matching typed *filters*.
+
+        Documents only hold *fields* (plus ``video_id``), or every field when
+        it is ``None``. See :mod:`libs.storage.filters` for the filters.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def aggregate(self, query: Dict[str, Any], aggs: Dict[str, Any]) -> Dict[str, Any]:
+        """Run Elasticsearch-style *aggs* over objects matching *query*.
+
+        Only the aggregation results are returned, never the matching objects.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def frames_page(
+        self,
+        obj_id: str,
+        filters: Dict[str, Any],
+        limit: int,
+        cursor: Optional[str] = None,
+    ) -> Optional[Tuple[List[Dict[str, Any]], Optional[str]]]:
+        """One page of the frame results of *obj_id* matching *filters*.
+
+        Returns the rows and the cursor of the next page, or ``None`` if the
+        object does not exist. See :mod:`libs.storage.frames` for the filters.
+        """
+        raise NotImplementedError
+
+
+class AsyncStorage(ABC, Generic[T]):
+    """Asynchronous counterpart of :class:`Storage`."""
+
+    async def ping(self) -> None:
+        """Raise if the backend cannot be reached; backends without a server never raise."""
+
+    @abstractmethod
+    async def create(self, obj: T) -> None:
+        """Persist *obj*."""
+        raise NotImplementedError
+
+    async def create_many(self, objs: List[T]) -> List[bool]:
+        """Persist *objs*, returning a success flag per object in input order."""
+        results: List[bool] = []
+        for obj in objs:
+            try:
+                await self.create(obj)
+            except Exception:
+                results.append(False)
+            else:
+                results.append(True)
+        return results
+
+    @abstractmethod
+    async def get(self, obj_id: str) -> Optional[T]:
+        """Retrieve object by *obj_id*."""
+        raise NotImplementedError
+
+    async def get_source(self, obj_id: str) -> Optional[Dict[str, Any]]:
+        """Retrieve the stored JSON document for *obj_id* without building a ``T``."""
+        raise NotImplementedError
+
+    async def get_many(
+        self, obj_ids: List[str], fields: Optional[List[str]] = None
+    ) -> Dict[str, T]:
+        """Retrieve the objects identified by *obj_ids*, keyed by id."""
+        found: Dict[str, T] = {}
+        for obj_id in obj_ids:
+            obj = await self.get(obj_id)
+            if obj is not None:
+                found[obj_id] = obj
+        return found
+
+    async def get_sources(self, obj_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Stored JSON documents of *obj_ids*, keyed by id; missing ids are absent."""
+        found: Dict[str, Dict[str, Any]] = {}
+        for obj_id in obj_ids:
+            source = await self.get_source(obj_id)
+            if source is not None:
+                found[obj_id] = source
+        return found
+
+    @abstractmethod
+    async def list(self) -> List[T]:
+        """List all stored objects."""
+        raise NotImplementedError
+
+    async def list_page(
+        self, limit: int, cursor: Optional[str] = None
+    ) -> Tuple[List[T], Optional[str]]:
+        """Return up to *limit* objects after *cursor* and the cursor of the next page."""
+        offset = _offset(cursor)
+        items = (await self.list())[offset : offset + limit]
+        next_cursor = str(offset + limit) if len(items) == limit else None
+        return items, next_cursor
+
+    async def iter_all(self, page_size: int = 500) -> AsyncIterator[T]:
+        """Yield every stored object, fetching *page_size* objects at a time."""
+        cursor: Optional[str] = None
+        while True:
+            items, cursor = await self.list_page(page_size, cursor)
+            for item in items:
+                yield item
+            if cursor is None:
+                return
+
+    @abstractmethod
+    async def update(self, obj_id: str, obj: T) -> None:
+        """Update object identified by *obj_id*."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete(self, obj_id: str) -> None:
+        """Delete object identified by *obj_id*."""
+        raise NotImplementedError
+
+    async def delete_many(self, obj_ids: List[str]) -> List[bool]:
+        """Delete *obj_ids*, returning whether each one existed, in input order."""
+        results: List[bool] = []
+        for obj_id in obj_ids:
+            results.append(await self.get(obj_id) is not None)
+            await self.delete(obj_id)
+        return results
+
+    @abstractmethod
+    async def search(self, query: Dict[str, Any]) -> List[T]:
+        """Search for objects matching an Elasticsearch-style *query*."""
+        raise NotImplementedError
+
+    async def search_sources(self, query: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Like :meth:`search` but return the stored JSON documents as-is."""
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        """Release network resources held by the backend."""
+
+
+class AsyncVideoStorage(AsyncStorage[T], Generic[T]):
+    """Asynchronous counterpart of :class:`VideoStorage`."""
+
+    @abstractmethod
+    async def partial_update(
+        self,
+        obj_id: str,
+        fields: Dict[str, Any],
+        append: Optional[Dict[str, List[Any]]] = None,
+    ) -> Optional[T]:
+        """Set *fields* and extend the list fields in *append* in place."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete_by_query(self, query: Dict[str, Any]) -> int:
+        """Delete every object matching an Elasticsearch-style *query*; return the count."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def filter_sources(
+        self,
+        filters: Dict[str, Any],
+        fields: Optional[List[str]],
+        size: int,
+    ) -> List[Dict[str, Any]]:
+        """The newest *size* stored documents matching typed *filters*."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def aggregate(self, query: Dict[str, Any], aggs: Dict[str, Any]) -> Dict[str, Any]:
+        """Run Elasticsearch-style *aggs* over objects matching *query*."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def frames_page(
+        self,
+        obj_id: str,
+        filters: Dict[str, Any],
+        limit: int,
+        cursor: Optional[str] = None,
+    ) -> Optional[Tuple[List[Dict[str, Any]], Optional[str]]]:
+        """One page of the frame results of *obj_id* matching *filters*."""
+        raise NotImplementedError
@@ -0,0 +1,545 @@
+"""Read-through caching decorators for storage backends."""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Generic,
+    Hashable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+import orjson
+
+from .base import AsyncStorage, AsyncVideoStorage, Storage, VideoStorage
+
+
+T = TypeVar("T")
+
+_MISSING = object()
+
+
+def _video_id(obj: Any) -> str:
+    return obj.video_id
+
+
+def _source_key(obj_id: str) -> Tuple[str, str]:
+    return ("source", obj_id)
+
+
+def _invalidate(cache: "LRUCache", obj_id: str) -> None:
+    cache.invalidate(obj_id)
+    cache.invalidate(_source_key(obj_id))
+
+
+def _cached_sources(
+    cache: "LRUCache", obj_ids: List[str]
+) -> Tuple[Dict[str, Dict[str, Any]], List[str]]:
+    """Sources of *obj_ids* found in *cache* and the ids that still need fetching."""
+    found: Dict[str, Dict[str, Any]] = {}
+    missing: List[str] = []
+    for obj_id in dict.fromkeys(obj_ids):
+        hit, value = cache.lookup(_source_key(obj_id))
+        if not hit:
+            missing.append(obj_id)
+        elif value is not None:
+            found[obj_id] = value
+    return found, missing
+
+
+def _store_sources(
+    cache: "LRUCache", obj_ids: List[str], fetched: Dict[str, Dict[str, Any]], token: int
+) -> None:
+    for obj_id in obj_ids:
+        cache.store(_source_key(obj_id), fetched.get(obj_id), token)
+
+
+class LRUCache:
+    """Thread-safe bounded LRU cache with per-entry TTL and negative entries.
+
+    Negative entries remember that a key does not exist (e.g. a 404) for
+    ``negative_ttl`` seconds so repeated lookups of unknown ids stay cheap.
+
+    Read-through callers take a :meth:`token` before fetching and pass it to
+    :meth:`store`. Every invalidation leaves a tombstone stamped with a new
+    token, so a value fetched while a write was invalidating *its* key is
+    dropped instead of cached for a TTL; fills of other keys are unaffected.
+    At most ``max_entries`` tombstones are kept; fills that started before
+    the oldest dropped one are not stored.
+    """
+
+    def __init__(self, max_entries: int, ttl: float, negative_ttl: float) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._clock = 0
+        self._tombstones: "OrderedDict[Hashable, int]" = OrderedDict()
+        self._tombstone_floor = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def lookup(self, key: Hashable) -> Tuple[bool, Any]:
+        """Return ``(found, value)``; *value* is ``None`` for a cached miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            value = entry[1]
+            return True, None if value is _MISSING else value
+
+    def token(self) -> int:
+        """Mark the start of a read-through fill; pass the result to :meth:`store`."""
+        with self._lock:
+            return self._clock
+
+    def store(self, key: Hashable, value: Any, token: Optional[int] = None) -> None:
+        """Cache *value* for *key*; ``None`` is cached as a negative entry.
+
+        With *token*, nothing is stored if *key* was invalidated since.
+        """
+        ttl = self.negative_ttl if value is None else self.ttl
+        if ttl <= 0:
+            return
+        with self._lock:
+            if token is not None and (
+                token < self._tombstone_floor or self._tombstones.get(key, -1) > token
+            ):
+                return
+            self._entries[key] = (
+                time.monotonic() + ttl,
+                _MISSING if value is None else value,
+            )
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+            self._clock += 1
+            self._tombstones[key] = self._clock
+            self._tombstones.move_to_end(key)
+            while len(self._tombstones) > self.max_entries:
+                self._tombstone_floor = self._tombstones.popitem(last=False)[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._clock += 1
+            self._tombstones.clear()
+            self._tombstone_floor = self._clock
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+            }
+
+
+def canonical_key(*parts: Any) -> bytes:
+    """Stable cache key for JSON-compatible *parts*: sorted keys, no whitespace."""
+    return orjson.dumps(parts, option=orjson.OPT_SORT_KEYS)
+
+
+def content_hash(document: Any) -> str:
+    """Stable digest of a JSON-compatible *document*, independent of key order."""
+    return hashlib.blake2b(canonical_key(document), digest_size=16).hexdigest()
+
+
+class QueryCache:
+    """Thread-safe cache of serialized query results bounded by total bytes.
+
+    Every entry is tagged with the cache *generation* current when the query
+    started. Writers call :meth:`bump` after changing data, which makes all
+    older entries stale at once without walking the cache; stale entries are
+    dropped lazily on lookup or by LRU eviction.
+    """
+
+    def __init__(self, max_bytes: int, ttl: float) -> None:
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.generation = 0
+        self._entries: "OrderedDict[bytes, Tuple[float, int, bytes]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def bump(self) -> None:
+        with self._lock:
+            self.generation += 1
+
+    def lookup(self, key: bytes) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic() or entry[1] != self.generation:
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def store(self, key: bytes, body: bytes, generation: int) -> None:
+        """Cache *body* computed while *generation* was current."""
+        size = len(key) + len(body)
+        if self.ttl <= 0 or size > self.max_bytes:
+            return
+        with self._lock:
+            if generation != self.generation:
+                return
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic() + self.ttl, generation, body)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _drop(self, key: bytes) -> None:
+        body = self._entries.pop(key)[2]
+        self._bytes -= len(key) + len(body)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "bytes": self._bytes,
+                "generation": self.generation,
+            }
+
+
+class CachingStorage(Storage[T], Generic[T]):
+    """:class:`Storage` decorator serving ``get``/``get_source`` from an :class:`LRUCache`.
+
+    Writes go straight to the wrapped storage and invalidate the affected
+    ids afterwards; all other reads pass through uncached.
+    """
+
+    def __init__(
+        self, inner: Storage[T], cache: LRUCache, key: Callable[[T], str] = _video_id
+    ) -> None:
+        self.inner = inner
+        self.cache = cache
+        self._key = key
+
+    def setup(self) -> None:
+        self.inner.setup()
+
+    def ping(self) -> None:
+        self.inner.ping()
+
+    def create(self, obj: T) -> None:
+        try:
+            self.inner.create(obj)
+        finally:
+            _invalidate(self.cache, self._key(obj))
+
+    def create_many(self, objs: List[T]) -> List[bool]:
+        try:
+            return self.inner.create_many(objs)
+        finally:
+            for obj in objs:
+                _invalidate(self.cache, self._key(obj))
+
+    def get(self, obj_id: str) -> Optional[T]:
+        found, value = self.cache.lookup(obj_id)
+        if found:
+            return value
+        token = self.cache.token()
+        value = self.inner.get(obj_id)
+        self.cache.store(obj_id, value, token)
+        return value
+
+    def get_source(self, obj_id: str) -> Optional[Dict[str, Any]]:
+        found, value = self.cache.lookup(_source_key(obj_id))
+        if found:
+            return value
+        token = self.cache.token()
+        value = self.inner.get_source(obj_id)
+        self.cache.store(_source_key(obj_id), value, token)
+        return value
+
+    def get_many(
+        self, obj_ids: List[str], fields: Optional[List[str]] = None
+    ) -> Dict[str, T]:
+        return self.inner.get_many(obj_ids, fields)
+
+    def get_sources(self, obj_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Serve cached ids from the cache and fetch the rest with one inner call."""
+        found, missing = _cached_sources(self.cache, obj_ids)
+        if missing:
+            token = self.cache.token()
+            fetched = self.inner.get_sources(missing)
+            _store_sources(self.cache, missing, fetched, token)
+            found.update(fetched)
+        return found
+
+    def list(self) -> List[T]:
+        return self.inner.list()
+
+    def list_page(
+        self, limit: int, cursor: Optional[str] = None
+    ) -> Tuple[List[T], Optional[str]]:
+        return self.inner.list_page(limit, cursor)
+
+    def iter_all(self, page_size: int = 500) -> Iterator[T]:
+        return self.inner.iter_all(page_size)
+
+    def update(self, obj_id: str, obj: T) -> None:
+        try:
+            self.inner.update(obj_id, obj)
+        finally:
+            _invalidate(self.cache, obj_id)
+
+    def delete(self, obj_id: str) -> None:
+        try:
+            self.inner.delete(obj_id)
+        finally:
+            _invalidate(self.cache, obj_id)
+
+    def delete_many(self, obj_ids: List[str]) -> List[bool]:
+        try:
+            return self.inner.delete_many(obj_ids)
+        finally:
+            for obj_id in obj_ids:
+                _invalidate(self.cache, obj_id)
+
+    def search(self, query: Dict[str, Any]) -> List[T]:
+        return self.inner.search(query)
+
+    def search_sources(self, query: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return self.inner.search_sources(query)
+
+
+class CachingVideoStorage(CachingStorage[T], VideoStorage[T]):
+    """:class:`CachingStorage` of a :class:`VideoStorage`; the video-only calls pass through."""
+
+    inner: VideoStorage[T]
+
+    def __init__(
+        self, inner: VideoStorage[T], cache: LRUCache, key: Callable[[T], str] = _video_id
+    ) -> None:
+        super().__init__(inner, cache, key)
+
+    def content_hashes(self, obj_ids: List[str]) -> Dict[str, str]:
+        return self.inner.content_hashes(obj_ids)
+
+    def partial_update(
+        self,
+        obj_id: str,
+        fields: Dict[str, Any],
+        append: Optional[Dict[str, List[Any]]] = None,
+    ) -> Optional[T]:
+        try:
+            return self.inner.partial_update(obj_id, fields, append)
+        finally:
+            _invalidate(self.cache, obj_id)
+
+    def delete_by_query(self, query: Dict[str, Any]) -> int:
+        # The deleted ids are unknown, so nothing cached can be trusted.
+        try:
+            return self.inner.delete_by_query(query)
+        finally:
+            self.cache.clear()
+
+    def filter_sources(
+        self,
+        filters: Dict[str, Any],
+        fields: Optional[List[str]],
+        size: int,
+    ) -> List[Dict[str, Any]]:
+        return self.inner.filter_sources(filters, fields, size)
+
+    def aggregate(self, query: Dict[str, Any], aggs: Dict[str, Any]) -> Dict[str, Any]:
+        return self.inner.aggregate(query, aggs)
+
+    def frames_page(
+        self,
+        obj_id: str,
+        filters: Dict[str, Any],
+        limit: int,
+        cursor: Optional[str] = None,
+    ) -> Optional[Tuple[List[Dict[str, Any]], Optional[str]]]:
+        return self.inner.frames_page(obj_id, filters, limit, cursor)
+
+
+class AsyncCachingStorage(AsyncStorage[T], Generic[T]):
+    """Asynchronous counterpart of :class:`CachingStorage`.
+
+    Share one :class:`LRUCache` between the sync and async decorators so
+    writes made by the consumer invalidate entries read by the API.
+    """
+
+    def __init__(
+        self, inner: AsyncStorage[T], cache: LRUCache, key: Callable[[T], str] = _video_id
+    ) -> None:
+        self.inner = inner
+        self.cache = cache
+        self._key = key
+
+    async def ping(self) -> None:
+        await self.inner.ping()
+
+    async def create(self, obj: T) -> None:
+        try:
+            await self.inner.create(obj)
+        finally:
+            _invalidate(self.cache, self._key(obj))
+
+    async def create_many(self, objs: List[T]) -> List[bool]:
+        try:
+            return await self.inner.create_many(objs)
+        finally:
+            for obj in objs:
+                _invalidate(self.cache, self._key(obj))
+
+    async def get(self, obj_id: str) -> Optional[T]:
+        found, value = self.cache.lookup(obj_id)
+        if found:
+            return value
+        token = self.cache.token()
+        value = await self.inner.get(obj_id)
+        self.cache.store(obj_id, value, token)
+        return value
+
+    async def get_source(self, obj_id: str) -> Optional[Dict[str, Any]]:
+        found, value = self.cache.lookup(_source_key(obj_id))
+        if found:
+            return value
+        token = self.cache.token()
+        value = await self.inner.get_source(obj_id)
+        self.cache.store(_source_key(obj_id), value, token)
+        return value
+
+    async def get_many(
+        self, obj_ids: List[str], fields: Optional[List[str]] = None
+    ) -> Dict[str, T]:
+        return await self.inner.get_many(obj_ids, fields)
+
+    async def get_sources(self, obj_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        found, missing = _cached_sources(self.cache, obj_ids)
+        if missing:
+            token = self.cache.token()
+            fetched = await self.inner.get_sources(missing)
+            _store_sources(self.cache, missing, fetched, token)
+            found.update(fetched)
+        return found
+
+    async def list(self) -> List[T]:
+        return await self.inner.list()
+
+    async def list_page(
+        self, limit: int, cursor: Optional[str] = None
+    ) -> Tuple[List[T], Optional[str]]:
+        return await self.inner.list_page(limit, cursor)
+
+    def iter_all(self, page_size: int = 500) -> AsyncIterator[T]:
+        return self.inner.iter_all(page_size)
+
+    async def update(self, obj_id: str, obj: T) -> None:
+        try:
+            await self.inner.update(obj_id, obj)
+        finally:
+            _invalidate(self.cache, obj_id)
+
+    async def delete(self, obj_id: str) -> None:
+        try:
+            await self.inner.delete(obj_id)
+        finally:
+            _invalidate(self.cache, obj_id)
+
+    async def delete_many(self, obj_ids: List[str]) -> List[bool]:
+        try:
+            return await self.inner.delete_many(obj_ids)
+        finally:
+            for obj_id in obj_ids:
+                _invalidate(self.cache, obj_id)
+
+    async def search(self, query: Dict[str, Any]) -> List[T]:
+        return await self.inner.search(query)
+
+    async def search_sources(self, query: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return await self.inner.search_sources(query)
+
+    async def close(self) -> None:
+        await self.inner.close()
+
+
+class AsyncCachingVideoStorage(AsyncCachingStorage[T], AsyncVideoStorage[T]):
+    """Asynchronous counterpart of :class:`CachingVideoStorage`."""
+
+    inner: AsyncVideoStorage[T]
+
+    def __init__(
+        self, inner: AsyncVideoStorage[T], cache: LRUCache, key: Callable[[T], str] = _video_id
+    ) -> None:
+        super().__init__(inner, cache, key)
+
+    async def partial_update(
+        self,
+        obj_id: str,
+        fields: Dict[str, Any],
+        append: Optional[Dict[str, List[Any]]] = None,
+    ) -> Optional[T]:
+        try:
+            return await self.inner.partial_update(obj_id, fields, append)
+        finally:
+            _invalidate(self.cache, obj_id)
+
+    async def delete_by_query(self, query: Dict[str, Any]) -> int:
+        try:
+            return await self.inner.delete_by_query(query)
+        finally:
+            self.cache.clear()
+
+    async def filter_sources(
+        self,
+        filters: Dict[str, Any],
+        fields: Optional[List[str]],
+        size: int,
+    ) -> List[Dict[str, Any]]:
+        return await self.inner.filter_sources(filters, fields, size)
+
+    async def aggregate(self, query: Dict[str, Any], aggs: Dict[str, Any]) -> Dict[str, Any]:
+        return await self.inner.aggregate(query, aggs)
+
+    async def frames_page(
+        self,
+        obj_id: str,
+        filters: Dict[str, Any],
+        limit: int,
+        cursor: Optional[str] = None,
+    ) -> Optional[Tuple[List[Dict[str, Any]], Optional[str]]]:
+        return await self.inner.frames_page(obj_id, filters, limit, cursor)
@@ -1,50 +1,403 @@
-import os
-from typing import Any, Dict, List, Optional
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional, Tuple, TypeVar
 
-from elasticsearch import Elasticsearch
+from elasticsearch import ApiError, ConflictError, Elasticsearch, NotFoundError
 
 from libs.models.video_metadata import VideoMetadata, VideoMetadataDTO
-from .base import Storage
+from .base import StorageConflictError, StorageThrottledError, VideoStorage
+from .elasticsearch_filters import collapsed_ids, filter_body
+from .elasticsearch_index import CONTENT_HASH_FIELD, bulk_load as bulk_load_settings, ensure_index
+from .elasticsearch_requests import (
+    PIT_KEEP_ALIVE,
+    ElasticsearchRequests,
+    document,
+    hashes_from_mget,
+    hit_ids,
+    hit_sources,
+    hits_to_domain,
+    hits_to_sources,
+    page_result,
+    sources_from_mget,
+    translate_errors,
+)
+from .filters import frame_filters
+from .frames import FramePage, page_frames
 
+R = TypeVar("R")
 
-class ElasticsearchStorage(Storage[VideoMetadata]):
-    """Elasticsearch-backed storage implementation."""
 
-    def __init__(self, host: Optional[str] = None, index: Optional[str] = None) -> None:
-        self.host = host or os.getenv("ES_HOST", "http://localhost:9200")
-        self.index = index or os.getenv("ES_VIDEO_INDEX", "videos")
-        self.client = Elasticsearch(self.host)
+class ElasticsearchStorage(ElasticsearchRequests, VideoStorage[VideoMetadata]):
+    """Elasticsearch-backed storage implementation.
 
-    def create(self, metadata: VideoMetadata) -> None:
-        dto = VideoMetadataDTO.from_domain(metadata)
-        self.client.index(index=self.index, id=metadata.video_id, document=dto.dict())
+    With ``partitioned=True`` videos are spread over monthly indices behind
+    the ``index`` alias (see :mod:`libs.storage.elasticsearch_partitions`).
+    With ``split_frames=True`` frame results are stored as separate documents
+    and reassembled on read (see :mod:`libs.storage.elasticsearch_frames`);
+    the two modes cannot be combined. Requests are built by
+    :class:`~libs.storage.elasticsearch_requests.ElasticsearchRequests`.
+    """
 
-    def get(self, video_id: str) -> Optional[VideoMetadata]:
+    def __init__(
+        self,
+        host: Optional[str] = None,
+        index: Optional[str] = None,
+        retry_on_conflict: int = 3,
+        partitioned: bool = False,
+        client: Optional[Elasticsearch] = None,
+        split_frames: bool = False,
+    ) -> None:
+        super().__init__(host, index, retry_on_conflict, partitioned, split_frames)
+        # Pass a client from libs.clients.ClientRegistry to share its connection pool.
+        self.client = client if client is not None else Elasticsearch(self.host)
+
+    def setup(self) -> None:
+        """Install the managed index template and create the index behind the alias."""
+        if self.partitions is not None:
+            self.partitions.setup(self.client)
+        else:
+            ensure_index(self.client, self.index)
+        if self.frames is not None:
+            self.frames.setup(self.client)
+
+    def ping(self) -> None:
+        self.client.info()
+
+    @contextmanager
+    def bulk_load(self) -> Iterator[None]:
+        """Disable refresh and replicas on the index while backfilling."""
+        indices = self.index if self.frames is None else f"{self.index},{self.frames.index}"
+        with bulk_load_settings(self.client, indices):
+            yield
+
+    def _with_frames(self, sources: List[Dict[str, Any]]) -> None:
+        """Reassemble split videos in *sources* in place; a no-op unless frames are split."""
+        if self.frames is None:
+            return
+        found: Dict[str, Dict[str, Any]] = {}
+        for params in self._frame_mgets(sources):
+            found.update(sources_from_mget(self.client.mget(**params)))
+        self.frames.assemble(sources, found)
+
+    def _frame_counts(self, video_ids: List[str]) -> Dict[str, List[int]]:
+        """Stored ``frame_counts`` of the existing videos among *video_ids*."""
+        assert self.frames is not None
+        return self.frames.parse_counts(self.client.mget(**self._frame_counts_params(video_ids)))
+
+    def _matching_ids(self, query: Dict[str, Any], page_size: int = 1000) -> Iterator[List[str]]:
+        """Ids of the videos matching *query*, a page at a time from a point-in-time."""
+        pit_id = self.client.open_point_in_time(index=self.index, keep_alive=PIT_KEEP_ALIVE)["id"]
+        search_after: Optional[List[Any]] = None
+        try:
+            while True:
+                res = self.client.search(
+                    **self._matching_ids_params(query, page_size, pit_id, search_after)
+                )
+                ids = hit_ids(res)
+                if ids:
+                    yield ids
+                if len(ids) < page_size:
+                    return
+                search_after = res["hits"]["hits"][-1]["sort"]
+        finally:
+            self.client.close_point_in_time(id=pit_id)
+
+    def _lookup(self, video_id: str) -> Optional[str]:
+        """Read the partition of *video_id* from the lookup index, bypassing the LRU."""
+        assert self.partitions is not None
         try:
-            res = self.client.get(index=self.index, id=video_id)
-        except Exception:
+            res = self.client.get(index=self.partitions.lookup_index, id=video_id)
+        except NotFoundError:
+            self.partitions.forget(video_id)
+            return None
+        return self.partitions.remember(video_id, self.partitions.lookup_source(res))
+
+    def _lookup_many(self, video_ids: List[str], fresh: bool = False) -> Dict[str, str]:
+        """Partitions of *video_ids*; *fresh* reads them all from the lookup index."""
+        assert self.partitions is not None
+        found, missing = ({}, video_ids) if fresh else self._cached_partitions(video_ids)
+        if missing:
+            res = self.client.mget(index=self.partitions.lookup_index, ids=missing)
+            found.update(self.partitions.parse_lookups(res))
+        return found
+
+    def _current(self, video_ids: List[str]) -> Mapping[str, Any]:
+        """Stored frame counts or partitions of *video_ids*, as the write plans expect.
+
+        Partitions are read from the lookup index rather than the LRU: another
+        process may have moved a video to another month since it was cached,
+        and a stale entry would delete the moved copy from the wrong index.
+        """
+        if self.frames is not None:
+            return self._frame_counts(video_ids) if video_ids else {}
+        if self.partitions is not None:
+            return self._lookup_many(video_ids, fresh=True)
+        return {}
+
+    def _in_partition(self, video_id: str, call: Callable[[str], R]) -> Optional[R]:
+        """Run *call* against the index holding *video_id*.
+
+        Returns ``None`` when the video is unknown. A ``NotFoundError`` from a
+        cached partition triggers one retry with a fresh lookup, in case the
+        video moved partitions in another process.
+        """
+        if self.partitions is None:
+            return call(self.index)
+        cached = self.partitions.cached(video_id)
+        partition = cached or self._lookup(video_id)
+        if partition is None:
             return None
-        source = res.get("_source")
+        try:
+            return call(partition)
+        except NotFoundError:
+            if cached is None:
+                raise
+            fresh = self._lookup(video_id)
+            if fresh is None or fresh == cached:
+                raise
+            return call(fresh)
+
+    def create(self, metadata: VideoMetadata) -> None:
+        if self._writes_through_bulk():
+            if not self.create_many([metadata])[0]:
+                raise RuntimeError(f"Failed to index video {metadata.video_id}")
+            return
+        self.client.index(index=self.index, id=metadata.video_id, document=document(metadata))
+
+    def create_many(self, metadata: List[VideoMetadata]) -> List[bool]:
+        """Index *metadata* with a single ``_bulk`` request.
+
+        Raises :class:`StorageThrottledError` when Elasticsearch rejects the
+        request or any of its items with HTTP 429, so the caller can back off
+        and retry the whole batch (indexing by ``video_id`` is idempotent).
+        In partitioned mode the lookup entries are written in the same request
+        and copies left in another partition by a timestamp change are removed.
+        In split mode each video's frames are written before its header, and
+        frames beyond the new result counts are deleted in the same request.
+        """
+        if not metadata:
+            return []
+        current = self._current([meta.video_id for meta in metadata])
+        operations, spans = self._write_operations(metadata, current)
+        try:
+            res = self.client.bulk(operations=operations)
+        except ApiError as exc:
+            if exc.status_code == 429:
+                raise StorageThrottledError(str(exc)) from exc
+            raise
+        return self._write_results(metadata, res, spans)
+
+    def get(self, video_id: str) -> Optional[VideoMetadata]:
+        source = self.get_source(video_id)
         if not source:
             return None
         return VideoMetadataDTO(**source).to_domain()
 
+    def get_source(self, video_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            with translate_errors():
+                res = self._in_partition(
+                    video_id, lambda index: self.client.get(index=index, id=video_id)
+                )
+        except NotFoundError:
+            return None
+        source = self._get_result(res)
+        if source is not None:
+            self._with_frames([source])
+        return source
+
+    def get_sources(self, video_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Fetch *video_ids* with a single ``_mget``, routed to their partitions if any."""
+        ids = list(dict.fromkeys(video_ids))
+        if not ids:
+            return {}
+        with translate_errors():
+            located = None if self.partitions is None else self._lookup_many(ids)
+            if located == {}:
+                return {}
+            res = self.client.mget(
+                **self._mget_params(ids, located, source_excludes=[CONTENT_HASH_FIELD])
+            )
+            sources = sources_from_mget(res)
+            self._with_frames(list(sources.values()))
+        return sources
+
+    def get_many(
+        self, video_ids: List[str], fields: Optional[List[str]] = None
+    ) -> Dict[str, VideoMetadata]:
+        return {
+            video_id: VideoMetadataDTO(**source).to_domain()
+            for video_id, source in self.get_sources(video_ids).items()
+        }
+
+    def content_hashes(self, video_ids: List[str]) -> Dict[str, str]:
+        """Stored content hashes of *video_ids* with one ``_mget`` of that field only."""
+        if not video_ids:
+            return {}
+        located = None if self.partitions is None else self._lookup_many(video_ids)
+        if located == {}:
+            return {}
+        res = self.client.mget(
+            **self._mget_params(video_ids, located, source_includes=[CONTENT_HASH_FIELD])
+        )
+        return hashes_from_mget(res)
+
     def list(self) -> List[VideoMetadata]:
-        res = self.client.search(index=self.index, body={"query": {"match_all": {}}})
-        hits = res.get("hits", {}).get("hits", [])
-        return [VideoMetadataDTO(**hit["_source"]).to_domain() for hit in hits]
+        return list(self.iter_all())
+
+    def list_page(
+        self, limit: int, cursor: Optional[str] = None
+    ) -> Tuple[List[VideoMetadata], Optional[str]]:
+        """Page through the index ordered by ``(timestamp, video_id)``.
+
+        The cursor carries the sort values of the last hit for
+        ``search_after``; it holds no server-side state and never expires.
+        """
+        res = self.client.search(**self._page_params(limit, cursor))
+        self._with_frames(hit_sources(res))
+        return page_result(res, limit)
 
     def update(self, video_id: str, metadata: VideoMetadata) -> None:
-        dto = VideoMetadataDTO.from_domain(metadata)
-        self.client.index(index=self.index, id=video_id, document=dto.dict())
+        if self._writes_through_bulk():
+            self.create(metadata)
+            return
+        self.client.index(index=self.index, id=video_id, document=document(metadata))
 
-    def delete(self, video_id: str) -> None:
+    def partial_update(
+        self,
+        video_id: str,
+        fields: Dict[str, Any],
+        append: Optional[Dict[str, List[Any]]] = None,
+    ) -> Optional[VideoMetadata]:
+        """Apply the change with one ``_update`` call and return the new document.
+
+        Elasticsearch runs the script against the current ``_seq_no`` /
+        ``_primary_term`` and retries up to ``retry_on_conflict`` times if a
+        concurrent write (e.g. from the consumer) lands in between. In
+        partitioned mode a timestamp change that crosses a month boundary
+        re-indexes the video into its new partition instead. In split mode the
+        video is read, changed and written back, last writer wins.
+        """
+        if self._reads_before_update(fields):
+            current = self.get(video_id)
+            if current is None:
+                return None
+            changed = self._rewritten(current, fields, append)
+            if changed is not None:
+                self.create(changed)
+                return changed
+        params = self._update_params(video_id, fields, append)
         try:
-            self.client.delete(index=self.index, id=video_id)
-        except Exception:
-            pass
+            res = self._in_partition(
+                video_id, lambda index: self.client.update(index=index, **params)
+            )
+        except NotFoundError:
+            return None
+        except ConflictError as exc:
+            raise StorageConflictError(str(exc)) from exc
+        return self._updated(res)
+
+    def delete(self, video_id: str) -> None:
+        if self.frames is not None:
+            self.delete_many([video_id])
+            return
+        with translate_errors():
+            if self.partitions is not None:
+                partition = self._lookup(video_id)
+                if partition is not None:
+                    self.client.bulk(
+                        operations=self.partitions.delete_operations(video_id, partition)
+                    )
+                    self.partitions.forget(video_id)
+                return
+            try:
+                self.client.delete(index=self.index, id=video_id)
+            except NotFoundError:
+                pass
+
+    def delete_many(self, video_ids: List[str]) -> List[bool]:
+        """Delete *video_ids* with a single ``_bulk`` request; ``False`` for unknown ids."""
+        ids = list(dict.fromkeys(video_ids))
+        res = None
+        with translate_errors():
+            targets, operations, positions = self._delete_operations(ids, self._current(ids))
+            if operations:
+                res = self.client.bulk(operations=operations)
+        return self._deleted(video_ids, targets, res, positions)
+
+    def delete_by_query(self, query: Dict[str, Any]) -> int:
+        """Delete every video matching *query* with ``_delete_by_query``.
+
+        Documents changed concurrently are skipped instead of failing the
+        request. In partitioned mode the lookup entries of deleted videos are
+        left behind; they are harmless and replaced when a video is re-ingested.
+        In split mode the matching ids are paged through and deleted together
+        with their frames by :meth:`delete_many`.
+        """
+        with translate_errors():
+            if self.frames is not None:
+                return sum(sum(self.delete_many(ids)) for ids in self._matching_ids(query))
+            res = self.client.delete_by_query(**self._delete_by_query_params(query))
+        return res.get("deleted", 0)
 
     def search(self, query: Dict[str, Any]) -> List[VideoMetadata]:
-        res = self.client.search(index=self.index, body=query)
-        hits = res.get("hits", {}).get("hits", [])
-        return [VideoMetadataDTO(**hit["_source"]).to_domain() for hit in hits]
+        return hits_to_domain(self._search(query))
+
+    def search_sources(self, query: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return hits_to_sources(self._search(query))
+
+    def filter_sources(
+        self,
+        filters: Dict[str, Any],
+        fields: Optional[List[str]],
+        size: int,
+    ) -> List[Dict[str, Any]]:
+        """Compile *filters* to a ``bool.filter`` query with ``_source`` limited to *fields*.
+
+        In split mode, searches with frame conditions find the newest matching
+        videos on the frames index, collapsed by ``video_id``, then fetch their
+        headers; the others search the headers directly.
+        """
+        split = self.frames is not None
+        if not split or not frame_filters(filters):
+            return self.search_sources(filter_body(filters, fields, size, split))
+        with translate_errors():
+            ids = collapsed_ids(self.client.search(**self._frame_filter_params(filters, size)))
+            if not ids:
+                return []
+            sources = sources_from_mget(self.client.mget(**self._filter_mget_params(ids, fields)))
+            self._with_frames(list(sources.values()))
+        return [sources[video_id] for video_id in ids if video_id in sources]
+
+    def _search(self, query: Dict[str, Any]) -> Mapping[str, Any]:
+        """Run *query* against the videos; in split mode frame conditions never match."""
+        res = self.client.search(**self._search_params(query))
+        self._with_frames(hit_sources(res))
+        return res
+
+    def aggregate(self, query: Dict[str, Any], aggs: Dict[str, Any]) -> Dict[str, Any]:
+        """Run *aggs* over matching videos, or over matching frames in split mode."""
+        res = self.client.search(**self._aggregate_params(query, aggs))
+        return res.get("aggregations", {})
+
+    def frames_page(
+        self,
+        video_id: str,
+        filters: Dict[str, Any],
+        limit: int,
+        cursor: Optional[str] = None,
+    ) -> Optional[FramePage]:
+        """Frame results of *video_id* matching *filters* (see :mod:`libs.storage.frames`).
+
+        In split mode only the matching frame documents are searched;
+        otherwise the whole video is loaded and filtered. Returns ``None``
+        if the video does not exist.
+        """
+        if self.frames is None:
+            source = self.get_source(video_id)
+            return None if source is None else page_frames(source, filters, limit, cursor)
+        params = self._frames_page_params(video_id, filters, limit, cursor)
+        with translate_errors():
+            if not self.client.exists(index=self.index, id=video_id):
+                return None
+            res = self.client.search(**params)
+        return self._frames_page(res, limit)
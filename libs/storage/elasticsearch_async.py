@@ -0,0 +1,338 @@
+"""Asynchronous Elasticsearch storage implementation."""
+
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+from elasticsearch import ApiError, AsyncElasticsearch, ConflictError, NotFoundError
+
+from libs.models.video_metadata import VideoMetadata, VideoMetadataDTO
+from .base import AsyncVideoStorage, StorageConflictError, StorageThrottledError
+from .elasticsearch_filters import collapsed_ids, filter_body
+from .elasticsearch_index import CONTENT_HASH_FIELD
+from .elasticsearch_requests import (
+    PIT_KEEP_ALIVE,
+    ElasticsearchRequests,
+    document,
+    hit_ids,
+    hit_sources,
+    hits_to_domain,
+    hits_to_sources,
+    page_result,
+    sources_from_mget,
+    translate_errors,
+)
+from .filters import frame_filters
+from .frames import FramePage, page_frames
+
+R = TypeVar("R")
+
+
+class AsyncElasticsearchStorage(ElasticsearchRequests, AsyncVideoStorage[VideoMetadata]):
+    """``AsyncElasticsearch``-backed counterpart of ``ElasticsearchStorage``."""
+
+    def __init__(
+        self,
+        host: Optional[str] = None,
+        index: Optional[str] = None,
+        retry_on_conflict: int = 3,
+        partitioned: bool = False,
+        client: Optional[AsyncElasticsearch] = None,
+        split_frames: bool = False,
+    ) -> None:
+        super().__init__(host, index, retry_on_conflict, partitioned, split_frames)
+        self._owns_client = client is None
+        self.client = client if client is not None else AsyncElasticsearch(self.host)
+
+    async def ping(self) -> None:
+        await self.client.info()
+
+    async def _with_frames(self, sources: List[Dict[str, Any]]) -> None:
+        if self.frames is None:
+            return
+        found: Dict[str, Dict[str, Any]] = {}
+        for params in self._frame_mgets(sources):
+            found.update(sources_from_mget(await self.client.mget(**params)))
+        self.frames.assemble(sources, found)
+
+    async def _frame_counts(self, video_ids: List[str]) -> Dict[str, List[int]]:
+        assert self.frames is not None
+        res = await self.client.mget(**self._frame_counts_params(video_ids))
+        return self.frames.parse_counts(res)
+
+    async def _matching_ids(
+        self, query: Dict[str, Any], page_size: int = 1000
+    ) -> AsyncIterator[List[str]]:
+        pit = await self.client.open_point_in_time(index=self.index, keep_alive=PIT_KEEP_ALIVE)
+        pit_id = pit["id"]
+        search_after: Optional[List[Any]] = None
+        try:
+            while True:
+                res = await self.client.search(
+                    **self._matching_ids_params(query, page_size, pit_id, search_after)
+                )
+                ids = hit_ids(res)
+                if ids:
+                    yield ids
+                if len(ids) < page_size:
+                    return
+                search_after = res["hits"]["hits"][-1]["sort"]
+        finally:
+            await self.client.close_point_in_time(id=pit_id)
+
+    async def _lookup(self, video_id: str) -> Optional[str]:
+        assert self.partitions is not None
+        try:
+            res = await self.client.get(index=self.partitions.lookup_index, id=video_id)
+        except NotFoundError:
+            self.partitions.forget(video_id)
+            return None
+        return self.partitions.remember(video_id, self.partitions.lookup_source(res))
+
+    async def _lookup_many(self, video_ids: List[str], fresh: bool = False) -> Dict[str, str]:
+        """Partitions of *video_ids*; *fresh* reads them all from the lookup index."""
+        assert self.partitions is not None
+        found, missing = ({}, video_ids) if fresh else self._cached_partitions(video_ids)
+        if missing:
+            res = await self.client.mget(index=self.partitions.lookup_index, ids=missing)
+            found.update(self.partitions.parse_lookups(res))
+        return found
+
+    async def _current(self, video_ids: List[str]) -> Mapping[str, Any]:
+        if self.frames is not None:
+            return await self._frame_counts(video_ids) if video_ids else {}
+        if self.partitions is not None:
+            return await self._lookup_many(video_ids, fresh=True)
+        return {}
+
+    async def _in_partition(
+        self, video_id: str, call: Callable[[str], Awaitable[R]]
+    ) -> Optional[R]:
+        if self.partitions is None:
+            return await call(self.index)
+        cached = self.partitions.cached(video_id)
+        partition = cached or await self._lookup(video_id)
+        if partition is None:
+            return None
+        try:
+            return await call(partition)
+        except NotFoundError:
+            if cached is None:
+                raise
+            fresh = await self._lookup(video_id)
+            if fresh is None or fresh == cached:
+                raise
+            return await call(fresh)
+
+    async def create(self, metadata: VideoMetadata) -> None:
+        if self._writes_through_bulk():
+            if not (await self.create_many([metadata]))[0]:
+                raise RuntimeError(f"Failed to index video {metadata.video_id}")
+            return
+        await self.client.index(
+            index=self.index, id=metadata.video_id, document=document(metadata)
+        )
+
+    async def create_many(self, metadata: List[VideoMetadata]) -> List[bool]:
+        if not metadata:
+            return []
+        current = await self._current([meta.video_id for meta in metadata])
+        operations, spans = self._write_operations(metadata, current)
+        try:
+            res = await self.client.bulk(operations=operations)
+        except ApiError as exc:
+            if exc.status_code == 429:
+                raise StorageThrottledError(str(exc)) from exc
+            raise
+        return self._write_results(metadata, res, spans)
+
+    async def get(self, video_id: str) -> Optional[VideoMetadata]:
+        source = await self.get_source(video_id)
+        if not source:
+            return None
+        return VideoMetadataDTO(**source).to_domain()
+
+    async def get_source(self, video_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            with translate_errors():
+                res = await self._in_partition(
+                    video_id, lambda index: self.client.get(index=index, id=video_id)
+                )
+        except NotFoundError:
+            return None
+        source = self._get_result(res)
+        if source is not None:
+            await self._with_frames([source])
+        return source
+
+    async def get_sources(self, video_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Fetch *video_ids* with a single ``_mget``, routed to their partitions if any."""
+        ids = list(dict.fromkeys(video_ids))
+        if not ids:
+            return {}
+        with translate_errors():
+            located = None if self.partitions is None else await self._lookup_many(ids)
+            if located == {}:
+                return {}
+            res = await self.client.mget(
+                **self._mget_params(ids, located, source_excludes=[CONTENT_HASH_FIELD])
+            )
+            sources = sources_from_mget(res)
+            await self._with_frames(list(sources.values()))
+        return sources
+
+    async def get_many(
+        self, video_ids: List[str], fields: Optional[List[str]] = None
+    ) -> Dict[str, VideoMetadata]:
+        return {
+            video_id: VideoMetadataDTO(**source).to_domain()
+            for video_id, source in (await self.get_sources(video_ids)).items()
+        }
+
+    async def list(self) -> List[VideoMetadata]:
+        return [meta async for meta in self.iter_all()]
+
+    async def list_page(
+        self, limit: int, cursor: Optional[str] = None
+    ) -> Tuple[List[VideoMetadata], Optional[str]]:
+        res = await self.client.search(**self._page_params(limit, cursor))
+        await self._with_frames(hit_sources(res))
+        return page_result(res, limit)
+
+    async def update(self, video_id: str, metadata: VideoMetadata) -> None:
+        if self._writes_through_bulk():
+            await self.create(metadata)
+            return
+        await self.client.index(index=self.index, id=video_id, document=document(metadata))
+
+    async def partial_update(
+        self,
+        video_id: str,
+        fields: Dict[str, Any],
+        append: Optional[Dict[str, List[Any]]] = None,
+    ) -> Optional[VideoMetadata]:
+        if self._reads_before_update(fields):
+            current = await self.get(video_id)
+            if current is None:
+                return None
+            changed = self._rewritten(current, fields, append)
+            if changed is not None:
+                await self.create(changed)
+                return changed
+        params = self._update_params(video_id, fields, append)
+        try:
+            res = await self._in_partition(
+                video_id, lambda index: self.client.update(index=index, **params)
+            )
+        except NotFoundError:
+            return None
+        except ConflictError as exc:
+            raise StorageConflictError(str(exc)) from exc
+        return self._updated(res)
+
+    async def delete(self, video_id: str) -> None:
+        if self.frames is not None:
+            await self.delete_many([video_id])
+            return
+        with translate_errors():
+            if self.partitions is not None:
+                partition = await self._lookup(video_id)
+                if partition is not None:
+                    await self.client.bulk(
+                        operations=self.partitions.delete_operations(video_id, partition)
+                    )
+                    self.partitions.forget(video_id)
+                return
+            try:
+                await self.client.delete(index=self.index, id=video_id)
+            except NotFoundError:
+                pass
+
+    async def delete_many(self, video_ids: List[str]) -> List[bool]:
+        """Delete *video_ids* with a single ``_bulk`` request; ``False`` for unknown ids."""
+        ids = list(dict.fromkeys(video_ids))
+        res = None
+        with translate_errors():
+            targets, operations, positions = self._delete_operations(
+                ids, await self._current(ids)
+            )
+            if operations:
+                res = await self.client.bulk(operations=operations)
+        return self._deleted(video_ids, targets, res, positions)
+
+    async def delete_by_query(self, query: Dict[str, Any]) -> int:
+        """Delete every video matching *query*; see ``ElasticsearchStorage.delete_by_query``."""
+        with translate_errors():
+            if self.frames is not None:
+                deleted = 0
+                async for ids in self._matching_ids(query):
+                    deleted += sum(await self.delete_many(ids))
+                return deleted
+            res = await self.client.delete_by_query(**self._delete_by_query_params(query))
+        return res.get("deleted", 0)
+
+    async def search(self, query: Dict[str, Any]) -> List[VideoMetadata]:
+        return hits_to_domain(await self._search(query))
+
+    async def search_sources(self, query: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return hits_to_sources(await self._search(query))
+
+    async def filter_sources(
+        self,
+        filters: Dict[str, Any],
+        fields: Optional[List[str]],
+        size: int,
+    ) -> List[Dict[str, Any]]:
+        """See ``ElasticsearchStorage.filter_sources``."""
+        split = self.frames is not None
+        if not split or not frame_filters(filters):
+            return await self.search_sources(filter_body(filters, fields, size, split))
+        with translate_errors():
+            res = await self.client.search(**self._frame_filter_params(filters, size))
+            ids = collapsed_ids(res)
+            if not ids:
+                return []
+            res = await self.client.mget(**self._filter_mget_params(ids, fields))
+            sources = sources_from_mget(res)
+            await self._with_frames(list(sources.values()))
+        return [sources[video_id] for video_id in ids if video_id in sources]
+
+    async def _search(self, query: Dict[str, Any]) -> Mapping[str, Any]:
+        res = await self.client.search(**self._search_params(query))
+        await self._with_frames(hit_sources(res))
+        return res
+
+    async def aggregate(self, query: Dict[str, Any], aggs: Dict[str, Any]) -> Dict[str, Any]:
+        res = await self.client.search(**self._aggregate_params(query, aggs))
+        return res.get("aggregations", {})
+
+    async def frames_page(
+        self,
+        video_id: str,
+        filters: Dict[str, Any],
+        limit: int,
+        cursor: Optional[str] = None,
+    ) -> Optional[FramePage]:
+        """See ``ElasticsearchStorage.frames_page``."""
+        if self.frames is None:
+            source = await self.get_source(video_id)
+            return None if source is None else page_frames(source, filters, limit, cursor)
+        params = self._frames_page_params(video_id, filters, limit, cursor)
+        with translate_errors():
+            if not await self.client.exists(index=self.index, id=video_id):
+                return None
+            res = await self.client.search(**params)
+        return self._frames_page(res, limit)
+
+    async def close(self) -> None:
+        if self._owns_client:
+            await self.client.close()
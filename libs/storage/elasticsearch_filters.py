@@ -0,0 +1,80 @@
+"""Compile typed video searches (see :mod:`libs.storage.filters`) to query DSL.
+
+Every condition goes into ``bool.filter``: nothing is scored, and the node
+query cache can reuse the clauses across requests. A closed ``start``/``end``
+range sits at the top level of the filter so partitioned storages can
+restrict the search to the months it covers.
+"""
+
+from typing import Any, Dict, List, Mapping, Optional
+
+from .elasticsearch_frames import frame_clauses
+from .elasticsearch_index import CONTENT_HASH_FIELD, FRAME_COUNTS_FIELD, RESULTS_PATH
+from .filters import frame_filters, source_fields
+
+
+def filter_clauses(filters: Mapping[str, Any]) -> List[Dict[str, Any]]:
+    clauses: List[Dict[str, Any]] = []
+    per_frame = frame_clauses(frame_filters(filters))
+    if per_frame:
+        clauses.append({"nested": {"path": RESULTS_PATH, "query": {"bool": {"filter": per_frame}}}})
+    if "algorithm_type" in filters:
+        clauses.append({"term": {"algorithms.type": filters["algorithm_type"]}})
+    bounds = {}
+    if "start" in filters:
+        bounds["gte"] = filters["start"].isoformat()
+    if "end" in filters:
+        bounds["lt"] = filters["end"].isoformat()
+    if bounds:
+        clauses.append({"range": {"timestamp": bounds}})
+    return clauses
+
+
+def source_filter(fields: Optional[List[str]], split_frames: bool = False) -> Dict[str, Any]:
+    """``_source`` filtering for *fields*; split headers also need their frame counts."""
+    include = source_fields(fields)
+    if include is None:
+        return {"excludes": [CONTENT_HASH_FIELD]}
+    if split_frames and "algorithms" in include:
+        include.append(FRAME_COUNTS_FIELD)
+    return {"includes": include}
+
+
+def mget_source_params(fields: Optional[List[str]], split_frames: bool = False) -> Dict[str, Any]:
+    """:func:`source_filter` as ``_mget`` keyword arguments."""
+    source = source_filter(fields, split_frames)
+    return {"source_includes": source.get("includes"), "source_excludes": source.get("excludes")}
+
+
+def filter_body(
+    filters: Mapping[str, Any], fields: Optional[List[str]], size: int, split_frames: bool = False
+) -> Dict[str, Any]:
+    """Search for the newest *size* videos matching *filters*."""
+    return {
+        "query": {"bool": {"filter": filter_clauses(filters)}},
+        "size": size,
+        "sort": [{"timestamp": "desc"}],
+        "track_total_hits": False,
+        "_source": source_filter(fields, split_frames),
+    }
+
+
+def frame_filter_body(filters: Mapping[str, Any], size: int) -> Dict[str, Any]:
+    """Ids of the newest *size* videos with frames matching *filters*, from the frames index.
+
+    Frame documents repeat their video's ``timestamp`` and algorithm ``type``,
+    so every filter applies; ``algorithm_type`` then constrains the algorithm
+    of the matching frame rather than any algorithm of the video.
+    """
+    return {
+        "query": {"bool": {"filter": filter_clauses(filters)}},
+        "size": size,
+        "sort": [{"timestamp": "desc"}],
+        "collapse": {"field": "video_id"},
+        "track_total_hits": False,
+        "_source": False,
+    }
+
+
+def collapsed_ids(res: Mapping[str, Any]) -> List[str]:
+    return [hit["fields"]["video_id"][0] for hit in res.get("hits", {}).get("hits", [])]
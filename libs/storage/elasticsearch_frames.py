@@ -0,0 +1,251 @@
+"""Split storage of frame-level results for very large videos.
+
+In split mode the main index only holds each video's header: the document
+with every ``algorithms[].results`` emptied and ``frame_counts`` set to the
+number of results each algorithm had. Every result is its own document in
+``{alias}-frames`` with id ``{video_id}:{algorithm}:{position}``, so reads
+reassemble a video with one realtime ``_mget`` and frame ranges can be
+queried without loading the whole video.
+
+Frame documents repeat the video ``timestamp`` and keep their result under
+``algorithms.results`` as a single nested object, so the analytics
+aggregations run unchanged against the frames index.
+"""
+
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+from .base import StorageThrottledError
+from .elasticsearch_index import (
+    FRAME_COUNTS_FIELD,
+    INDEX_SETTINGS,
+    MAPPING_VERSION,
+    RESULTS_PATH,
+    VIDEO_METADATA_MAPPINGS,
+    add_new_fields,
+)
+
+if TYPE_CHECKING:
+    from elasticsearch import Elasticsearch
+
+FRAME_MAPPINGS: Dict[str, Any] = {
+    "dynamic": "strict",
+    "_meta": {"mapping_version": MAPPING_VERSION},
+    "properties": {
+        "video_id": {"type": "keyword"},
+        "timestamp": {"type": "date"},
+        "algorithm": {"type": "integer"},
+        "position": {"type": "integer"},
+        "algorithms": VIDEO_METADATA_MAPPINGS["properties"]["algorithms"],
+    },
+}
+
+# Frame documents fetched per _mget when reassembling videos.
+MGET_CHUNK = 10000
+
+Span = Tuple[int, int]
+
+
+def frame_id(video_id: str, algorithm: int, position: int) -> str:
+    return f"{video_id}:{algorithm}:{position}"
+
+
+def retry_later(result: Mapping[str, Any]) -> bool:
+    """Whether a bulk item failed only for now: throttled (429) or its index is write-blocked."""
+    status = result.get("status")
+    if status == 429:
+        return True
+    return status == 403 and result.get("error", {}).get("type") == "cluster_block_exception"
+
+
+def span_results(res: Mapping[str, Any], spans: Iterable[Span]) -> List[bool]:
+    """Whether every bulk item in each ``[start, end)`` span succeeded.
+
+    Deletes of documents that no longer exist count as successful; any item
+    that should be retried later raises so the caller can back off and retry
+    the whole request.
+    """
+    items = [next(iter(item.items())) for item in res["items"]]
+    if any(retry_later(result) for _, result in items):
+        raise StorageThrottledError("bulk request partially rejected; retry later")
+    return [
+        all(
+            result.get("status", 500) < 300 or (action == "delete" and result.get("status") == 404)
+            for action, result in items[start:end]
+        )
+        for start, end in spans
+    ]
+
+
+def frame_clauses(filters: Mapping[str, Any]) -> List[Dict[str, Any]]:
+    """Filters on a frame result, for use inside the nested context."""
+    clauses: List[Dict[str, Any]] = []
+    for field, start, end in (
+        ("frame_num", "start_frame", "end_frame"),
+        ("timestamp", "start_time", "end_time"),
+    ):
+        bounds = {}
+        if start in filters:
+            bounds["gte"] = filters[start]
+        if end in filters:
+            bounds["lt"] = filters[end]
+        if bounds:
+            clauses.append({"range": {f"{RESULTS_PATH}.{field}": bounds}})
+    if "action" in filters:
+        clauses.append({"term": {f"{RESULTS_PATH}.action": filters["action"]}})
+    if "min_confidence" in filters:
+        clauses.append({"range": {f"{RESULTS_PATH}.confidence": {"gte": filters["min_confidence"]}}})
+    return clauses
+
+
+class FrameScheme:
+    """Naming, bulk operations and reassembly of split frame documents."""
+
+    def __init__(self, alias: str) -> None:
+        self.index = f"{alias}-frames"
+
+    def setup(self, client: "Elasticsearch") -> None:
+        if client.indices.exists(index=self.index):
+            add_new_fields(client, self.index, FRAME_MAPPINGS)
+        else:
+            client.indices.create(index=self.index, settings=INDEX_SETTINGS, mappings=FRAME_MAPPINGS)
+
+    def split(self, document: Dict[str, Any]) -> Tuple[Dict[str, Any], List[Tuple[str, Dict[str, Any]]]]:
+        """The header of a full *document* and its ``(id, frame document)`` pairs."""
+        video_id = document["video_id"]
+        frames: List[Tuple[str, Dict[str, Any]]] = []
+        algorithms = []
+        for i, algorithm in enumerate(document["algorithms"]):
+            for position, result in enumerate(algorithm["results"]):
+                frames.append(
+                    (
+                        frame_id(video_id, i, position),
+                        {
+                            "video_id": video_id,
+                            "timestamp": document["timestamp"],
+                            "algorithm": i,
+                            "position": position,
+                            "algorithms": {"type": algorithm["type"], "results": [result]},
+                        },
+                    )
+                )
+            algorithms.append({**algorithm, "results": []})
+        header = {
+            **document,
+            "algorithms": algorithms,
+            FRAME_COUNTS_FIELD: [len(a["results"]) for a in document["algorithms"]],
+        }
+        return header, frames
+
+    def _frame_deletes(self, video_id: str, counts: List[int], keep: List[int]) -> Iterator[Dict[str, Any]]:
+        for i, count in enumerate(counts):
+            for position in range(keep[i] if i < len(keep) else 0, count):
+                yield {"delete": {"_index": self.index, "_id": frame_id(video_id, i, position)}}
+
+    def write_operations(
+        self, index: str, documents: Iterable[Dict[str, Any]], previous: Mapping[str, List[int]]
+    ) -> Tuple[List[Dict[str, Any]], List[Span]]:
+        """Bulk operations writing each video's frames, deleting its stale ones, then its header.
+
+        *previous* maps video ids to their stored ``frame_counts``. Also
+        returns the span of bulk items belonging to each video, in input order.
+        """
+        operations: List[Dict[str, Any]] = []
+        spans: List[Span] = []
+        actions = 0
+        for document in documents:
+            header, frames = self.split(document)
+            start = actions
+            for _id, frame in frames:
+                operations.append({"index": {"_index": self.index, "_id": _id}})
+                operations.append(frame)
+            actions += len(frames)
+            for delete in self._frame_deletes(
+                header["video_id"], previous.get(header["video_id"], []), header[FRAME_COUNTS_FIELD]
+            ):
+                operations.append(delete)
+                actions += 1
+            operations.append({"index": {"_index": index, "_id": header["video_id"]}})
+            operations.append(header)
+            actions += 1
+            spans.append((start, actions))
+        return operations, spans
+
+    def delete_operations(self, index: str, video_id: str, counts: List[int]) -> List[Dict[str, Any]]:
+        """Delete the header of *video_id* first, so readers never see it without frames."""
+        return [{"delete": {"_index": index, "_id": video_id}}, *self._frame_deletes(video_id, counts, [])]
+
+    def parse_counts(self, res: Mapping[str, Any]) -> Dict[str, List[int]]:
+        """Map ids of existing videos to their ``frame_counts`` from a header ``_mget``."""
+        return {
+            doc["_id"]: doc.get("_source", {}).get(FRAME_COUNTS_FIELD, [])
+            for doc in res.get("docs", [])
+            if doc.get("found")
+        }
+
+    def frame_ids(self, headers: Iterable[Mapping[str, Any]]) -> List[str]:
+        return [
+            frame_id(header["video_id"], i, position)
+            for header in headers
+            if "video_id" in header
+            for i, count in enumerate(header.get(FRAME_COUNTS_FIELD) or [])
+            for position in range(count)
+        ]
+
+    def assemble(self, headers: Iterable[Dict[str, Any]], frames: Mapping[str, Mapping[str, Any]]) -> None:
+        """Put the results from *frames* (id -> frame source) back into *headers* in place.
+
+        Documents written before split mode was enabled have no
+        ``frame_counts`` and are left as they are, as are search hits whose
+        ``_source`` filtering dropped the fields needed to reassemble them.
+        """
+        for header in headers:
+            counts = header.pop(FRAME_COUNTS_FIELD, None)
+            if counts is None or "video_id" not in header:
+                continue
+            for i, (algorithm, count) in enumerate(zip(header.get("algorithms", []), counts)):
+                algorithm["results"] = [
+                    frames[_id]["algorithms"]["results"][0]
+                    for _id in (frame_id(header["video_id"], i, p) for p in range(count))
+                    if _id in frames
+                ]
+
+    def page_body(
+        self,
+        video_id: str,
+        filters: Mapping[str, Any],
+        limit: int,
+        search_after: Optional[List[Any]],
+    ) -> Dict[str, Any]:
+        """Search for one page of the frames of *video_id* matching *filters*, in frame order."""
+        query_filters: List[Dict[str, Any]] = [{"term": {"video_id": video_id}}]
+        clauses = frame_clauses(filters)
+        if clauses:
+            query_filters.append(
+                {"nested": {"path": RESULTS_PATH, "query": {"bool": {"filter": clauses}}}}
+            )
+        body: Dict[str, Any] = {
+            "query": {"bool": {"filter": query_filters}},
+            "size": limit,
+            "sort": [
+                {f"{RESULTS_PATH}.frame_num": {"order": "asc", "nested": {"path": RESULTS_PATH}}},
+                {"algorithm": "asc"},
+                {"position": "asc"},
+            ],
+            "track_total_hits": False,
+        }
+        if search_after is not None:
+            body["search_after"] = search_after
+        return body
+
+    def page_rows(self, res: Mapping[str, Any]) -> Tuple[List[Dict[str, Any]], Optional[List[Any]]]:
+        """Frame rows of a :meth:`page_body` response and the sort values of the last hit."""
+        hits = res.get("hits", {}).get("hits", [])
+        rows = [
+            {
+                "algorithm": hit["_source"]["algorithm"],
+                "type": hit["_source"]["algorithms"]["type"],
+                **hit["_source"]["algorithms"]["results"][0],
+            }
+            for hit in hits
+        ]
+        return rows, hits[-1]["sort"] if hits else None
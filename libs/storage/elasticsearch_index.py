@@ -0,0 +1,163 @@
+"""Managed index template, mapping and bulk-load settings for video metadata."""
+
+import logging
+from contextlib import contextmanager
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List
+
+if TYPE_CHECKING:  # the constants are imported by the API without needing the client
+    from elasticsearch import Elasticsearch
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever VIDEO_METADATA_MAPPINGS or INDEX_SETTINGS change, then run
+# tools/reindex.py to move existing data onto a new index.
+MAPPING_VERSION = 3
+
+RESULTS_PATH = "algorithms.results"
+
+# Digest of the ingested document (see libs.storage.cache.content_hash), used
+# to skip rewriting unchanged messages. Stripped from every document we return.
+CONTENT_HASH_FIELD = "content_hash"
+
+# Number of results of each algorithm, set on video headers whose frame
+# results are stored separately (see libs.storage.elasticsearch_frames).
+FRAME_COUNTS_FIELD = "frame_counts"
+
+VIDEO_METADATA_MAPPINGS: Dict[str, Any] = {
+    "dynamic": "strict",
+    "_meta": {"mapping_version": MAPPING_VERSION},
+    "properties": {
+        "video_id": {"type": "keyword"},
+        "timestamp": {"type": "date"},
+        "algorithms": {
+            "properties": {
+                "type": {"type": "keyword"},
+                "results": {
+                    # nested keeps each frame's action/confidence correlated.
+                    "type": "nested",
+                    "properties": {
+                        "frame_num": {"type": "integer"},
+                        "timestamp": {"type": "keyword"},
+                        "action": {"type": "keyword"},
+                        "confidence": {"type": "float"},
+                        "clip_length": {"type": "integer"},
+                    },
+                },
+            }
+        },
+        # Free-form; flattened avoids a mapping entry per distinct key.
+        "extra": {"type": "flattened"},
+        # Only ever fetched by id, never searched.
+        CONTENT_HASH_FIELD: {"type": "keyword", "index": False, "doc_values": False},
+        FRAME_COUNTS_FIELD: {"type": "integer", "index": False, "doc_values": False},
+    },
+}
+
+INDEX_SETTINGS: Dict[str, Any] = {
+    "index.mapping.nested_objects.limit": 50000,
+    "index.refresh_interval": "1s",
+}
+
+
+def template_name(alias: str) -> str:
+    return f"{alias}-template"
+
+
+def versioned_index_name(alias: str, version: int = MAPPING_VERSION) -> str:
+    return f"{alias}-v{version}"
+
+
+def put_template(client: "Elasticsearch", alias: str) -> None:
+    """Install (or overwrite) the versioned template for ``{alias}-v*`` indices."""
+    client.indices.put_index_template(
+        name=template_name(alias),
+        index_patterns=[f"{alias}-v*"],
+        version=MAPPING_VERSION,
+        priority=100,
+        template={"settings": INDEX_SETTINGS, "mappings": VIDEO_METADATA_MAPPINGS},
+    )
+
+
+def add_new_fields(
+    client: "Elasticsearch", index: str, mappings: Dict[str, Any] = VIDEO_METADATA_MAPPINGS
+) -> None:
+    """Add fields introduced since *index* was created to its mapping.
+
+    New fields can be added in place; changes to existing fields still need
+    ``tools/reindex.py``, which is logged instead of raised.
+    """
+    from elasticsearch import BadRequestError
+
+    try:
+        client.indices.put_mapping(index=index, properties=mappings["properties"])
+    except BadRequestError as exc:
+        logger.warning("Mapping of %s is out of date (%s); run tools/reindex.py", index, exc)
+
+
+def ensure_index(client: "Elasticsearch", alias: str) -> None:
+    """Make sure *alias* resolves to an index created from the managed template.
+
+    Existing aliases only get new fields added (use ``tools/reindex.py`` to
+    migrate them to a newer mapping version). A legacy concrete index named
+    *alias* is also left in place with a warning, since an alias cannot share
+    its name.
+    """
+    put_template(client, alias)
+    if client.indices.exists_alias(name=alias):
+        add_new_fields(client, alias)
+        return
+    if client.indices.exists(index=alias):
+        logger.warning(
+            "Index %s is not managed by the index template; run tools/reindex.py", alias
+        )
+        return
+    client.indices.create(
+        index=versioned_index_name(alias),
+        aliases={alias: {"is_write_index": True}},
+    )
+
+
+def new_index_name(client: "Elasticsearch", alias: str) -> str:
+    name = versioned_index_name(alias)
+    if client.indices.exists(index=name):
+        name = f"{name}-{datetime.utcnow():%Y%m%d%H%M%S}"
+    return name
+
+
+def indices_behind(client: "Elasticsearch", alias: str) -> List[str]:
+    if client.indices.exists_alias(name=alias):
+        return list(client.indices.get_alias(name=alias))
+    return []
+
+
+@contextmanager
+def bulk_load(client: "Elasticsearch", index: str) -> Iterator[None]:
+    """Disable refreshes and replicas on *index* for the duration of a backfill.
+
+    The previous ``refresh_interval`` and ``number_of_replicas`` are restored
+    on exit, followed by an explicit refresh so the loaded data is visible.
+    """
+    current = client.indices.get_settings(
+        index=index,
+        name=["index.refresh_interval", "index.number_of_replicas"],
+        include_defaults=True,
+        flat_settings=True,
+    )
+    restore: Dict[str, Dict[str, Any]] = {}
+    for name, body in current.items():
+        merged = {**body.get("defaults", {}), **body.get("settings", {})}
+        restore[name] = {
+            "index.refresh_interval": merged.get("index.refresh_interval", "1s"),
+            "index.number_of_replicas": merged.get("index.number_of_replicas", "1"),
+        }
+    client.indices.put_settings(
+        index=index,
+        settings={"index.refresh_interval": "-1", "index.number_of_replicas": 0},
+    )
+    try:
+        yield
+    finally:
+        for name, settings in restore.items():
+            client.indices.put_settings(index=name, settings=settings)
+        client.indices.refresh(index=index)
@@ -0,0 +1,185 @@
+"""Monthly time partitioning of the video metadata index.
+
+In partitioned mode every video is written to ``{alias}-YYYY.MM`` based on
+its ``timestamp``; the partition index template adds each partition to the
+read alias. A small ``{alias}-ids`` lookup index maps ``video_id`` to its
+partition so point reads and writes go straight to one index, with an
+in-process LRU in front of it. Searches that carry a ``timestamp`` range are
+sent only to the months that range covers.
+"""
+
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from elasticsearch import Elasticsearch
+
+from .cache import LRUCache
+from .elasticsearch_index import (
+    INDEX_SETTINGS,
+    MAPPING_VERSION,
+    VIDEO_METADATA_MAPPINGS,
+    add_new_fields,
+)
+
+# Beyond this many months a range query simply targets the read alias.
+MAX_TARGETED_PARTITIONS = 36
+
+
+def _utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _parse_bound(value: Any) -> Optional[datetime]:
+    """*value* as Elasticsearch reads it with the default date format, if known.
+
+    Numbers are epoch milliseconds and strings ISO 8601 dates. Anything else,
+    such as date math or a digit string that may be either a year or epoch
+    milliseconds, returns ``None``.
+    """
+    if isinstance(value, str) and value.isdigit():
+        return None
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return datetime.utcfromtimestamp(value / 1000)
+    if isinstance(value, datetime):
+        return _utc(value)
+    if isinstance(value, str):
+        try:
+            return _utc(datetime.fromisoformat(value.replace("Z", "+00:00")))
+        except ValueError:
+            return None  # date math such as "now-1d"
+    return None
+
+
+def timestamp_range(query: Mapping[str, Any]) -> Optional[Tuple[datetime, datetime]]:
+    """Extract a closed ``timestamp`` range from the top level of *query*.
+
+    Looks at a bare ``range`` clause and at ``bool.filter``/``bool.must``;
+    returns ``None`` when the range is missing, open-ended, uses date math or
+    sets its own ``format`` or ``time_zone``, which change how bounds are read.
+    """
+    clause = query.get("query", query)
+    candidates: List[Mapping[str, Any]] = [clause]
+    bool_clause = clause.get("bool", {})
+    for key in ("filter", "must"):
+        value = bool_clause.get(key, [])
+        candidates.extend(value if isinstance(value, list) else [value])
+    for candidate in candidates:
+        bounds = candidate.get("range", {}).get("timestamp")
+        if not bounds or "format" in bounds or "time_zone" in bounds:
+            continue
+        start = _parse_bound(bounds.get("gte", bounds.get("gt")))
+        end = _parse_bound(bounds.get("lte", bounds.get("lt")))
+        if start is not None and end is not None:
+            return start, end
+    return None
+
+
+class PartitionScheme:
+    """Naming, routing and request building for monthly partitions (no I/O)."""
+
+    def __init__(self, alias: str, cache_size: int = 100000, cache_ttl: float = 300.0) -> None:
+        self.alias = alias
+        self.lookup_index = f"{alias}-ids"
+        self._locations = LRUCache(cache_size, cache_ttl, negative_ttl=0)
+
+    def partition_for(self, timestamp: datetime) -> str:
+        return f"{self.alias}-{_utc(timestamp):%Y.%m}"
+
+    def partitions_between(self, start: datetime, end: datetime) -> Optional[List[str]]:
+        year, month = start.year, start.month
+        names: List[str] = []
+        while (year, month) <= (end.year, end.month):
+            names.append(f"{self.alias}-{year:04d}.{month:02d}")
+            if len(names) > MAX_TARGETED_PARTITIONS:
+                return None
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        return names
+
+    def search_index(self, query: Mapping[str, Any]) -> str:
+        """Comma-separated partitions covered by *query*, or the read alias."""
+        bounds = timestamp_range(query)
+        if bounds is None:
+            return self.alias
+        names = self.partitions_between(*bounds)
+        return ",".join(names) if names else self.alias
+
+    def cached(self, video_id: str) -> Optional[str]:
+        return self._locations.lookup(video_id)[1]
+
+    def remember(self, video_id: str, partition: str) -> str:
+        self._locations.store(video_id, partition)
+        return partition
+
+    def forget(self, video_id: str) -> None:
+        self._locations.invalidate(video_id)
+
+    def lookup_source(self, res: Mapping[str, Any]) -> str:
+        return res["_source"]["partition"]
+
+    def parse_lookups(self, res: Mapping[str, Any]) -> Dict[str, str]:
+        """Map ids to partitions from an ``_mget`` on the lookup index, refreshing the LRU."""
+        found: Dict[str, str] = {}
+        for doc in res.get("docs", []):
+            if doc.get("found"):
+                found[doc["_id"]] = self.remember(doc["_id"], doc["_source"]["partition"])
+            else:
+                self.forget(doc["_id"])
+        return found
+
+    def write_operations(
+        self, documents: Iterable[Tuple[str, datetime, Any]], current: Mapping[str, str]
+    ) -> Tuple[List[Any], List[int]]:
+        """Bulk operations writing each video, its lookup entry and removing moved copies.
+
+        *documents* are ``(video_id, timestamp, source)`` tuples; the source
+        may also be an already serialized JSON line. Also returns the position
+        of each video's index action in the bulk response items, in input order.
+        """
+        operations: List[Any] = []
+        positions: List[int] = []
+        actions = 0
+        for video_id, timestamp, source in documents:
+            partition = self.partition_for(timestamp)
+            positions.append(actions)
+            operations.append({"index": {"_index": partition, "_id": video_id}})
+            operations.append(source)
+            operations.append({"index": {"_index": self.lookup_index, "_id": video_id}})
+            operations.append({"partition": partition})
+            actions += 2
+            previous = current.get(video_id)
+            if previous is not None and previous != partition:
+                operations.append({"delete": {"_index": previous, "_id": video_id}})
+                actions += 1
+        return operations, positions
+
+    def delete_operations(self, video_id: str, partition: str) -> List[Dict[str, Any]]:
+        return [
+            {"delete": {"_index": partition, "_id": video_id}},
+            {"delete": {"_index": self.lookup_index, "_id": video_id}},
+        ]
+
+    def setup(self, client: Elasticsearch) -> None:
+        """Install the partition template, the lookup index and the current partition."""
+        client.indices.put_index_template(
+            name=f"{self.alias}-partitions-template",
+            index_patterns=[f"{self.alias}-2*"],
+            version=MAPPING_VERSION,
+            priority=100,
+            template={
+                "settings": INDEX_SETTINGS,
+                "mappings": VIDEO_METADATA_MAPPINGS,
+                "aliases": {self.alias: {}},
+            },
+        )
+        if client.indices.exists_alias(name=self.alias):
+            add_new_fields(client, self.alias)
+        if not client.indices.exists(index=self.lookup_index):
+            client.indices.create(
+                index=self.lookup_index,
+                mappings={"dynamic": "strict", "properties": {"partition": {"type": "keyword"}}},
+            )
+        current = self.partition_for(datetime.utcnow())
+        if not client.indices.exists(index=current):
+            client.indices.create(index=current)
@@ -0,0 +1,480 @@
+"""Request building and response parsing shared by the Elasticsearch storages.
+
+:class:`ElasticsearchRequests` holds the index layout (plain, partitioned or
+split frames) and turns storage calls into client keyword arguments, bulk
+operations and results without doing any I/O. ``ElasticsearchStorage`` and
+``AsyncElasticsearchStorage`` subclass it and only differ in how they call
+the client.
+"""
+
+import base64
+import dataclasses
+import json
+import os
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from elasticsearch import ApiError, TransportError
+
+from libs.models.video_metadata import (
+    AlgorithmResult,
+    AlgorithmResultDTO,
+    VideoMetadata,
+    VideoMetadataDTO,
+)
+from .base import InvalidCursorError, StorageThrottledError, StorageUnavailableError
+from .cache import content_hash
+from .elasticsearch_filters import frame_filter_body, mget_source_params
+from .elasticsearch_frames import MGET_CHUNK, FrameScheme, Span, retry_later, span_results
+from .elasticsearch_index import CONTENT_HASH_FIELD, FRAME_COUNTS_FIELD
+from .elasticsearch_partitions import PartitionScheme
+from .frames import FramePage, decode_cursor, encode_cursor
+
+PIT_KEEP_ALIVE = "1m"
+
+# Applied by the _update API against the latest document version; fields in
+# params.fields are replaced wholesale and lists in params.append are extended.
+# The content hash no longer describes the document afterwards, so it is dropped.
+UPDATE_SCRIPT = """
+ctx._source.remove(params.hash_field);
+for (entry in params.fields.entrySet()) {
+  ctx._source[entry.getKey()] = entry.getValue();
+}
+for (entry in params.append.entrySet()) {
+  if (ctx._source[entry.getKey()] == null) {
+    ctx._source[entry.getKey()] = new ArrayList();
+  }
+  ctx._source[entry.getKey()].addAll(entry.getValue());
+}
+"""
+
+
+def document(metadata: VideoMetadata) -> Dict[str, Any]:
+    source = VideoMetadataDTO.from_domain(metadata).dict()
+    source[CONTENT_HASH_FIELD] = content_hash(source)
+    return source
+
+
+def strip(source: Dict[str, Any]) -> Dict[str, Any]:
+    """Drop storage-internal fields from a stored document."""
+    source.pop(CONTENT_HASH_FIELD, None)
+    return source
+
+
+def hits_to_domain(res: Mapping[str, Any]) -> List[VideoMetadata]:
+    return [VideoMetadataDTO(**source).to_domain() for source in hits_to_sources(res)]
+
+
+def hits_to_sources(res: Mapping[str, Any]) -> List[Dict[str, Any]]:
+    return [strip(hit["_source"]) for hit in res.get("hits", {}).get("hits", [])]
+
+
+def hit_sources(res: Mapping[str, Any]) -> List[Dict[str, Any]]:
+    return [hit["_source"] for hit in res.get("hits", {}).get("hits", []) if "_source" in hit]
+
+
+def hit_ids(res: Mapping[str, Any]) -> List[str]:
+    return [hit["_id"] for hit in res["hits"]["hits"]]
+
+
+def hashes_from_mget(res: Mapping[str, Any]) -> Dict[str, str]:
+    return {
+        doc["_id"]: doc["_source"][CONTENT_HASH_FIELD]
+        for doc in res.get("docs", [])
+        if doc.get("found") and CONTENT_HASH_FIELD in doc.get("_source", {})
+    }
+
+
+def sources_from_mget(res: Mapping[str, Any]) -> Dict[str, Dict[str, Any]]:
+    return {doc["_id"]: doc["_source"] for doc in res.get("docs", []) if doc.get("found")}
+
+
+def bulk_operations(index: str, metadata: List[VideoMetadata]) -> List[Dict[str, Any]]:
+    operations: List[Dict[str, Any]] = []
+    for meta in metadata:
+        operations.append({"index": {"_index": index, "_id": meta.video_id}})
+        operations.append(document(meta))
+    return operations
+
+
+def bulk_results(res: Mapping[str, Any], positions: Sequence[int]) -> List[bool]:
+    """Success flag for the bulk items at *positions*.
+
+    Raises if any item was throttled or hit a write block, see :func:`retry_later`.
+    """
+    if not res.get("errors"):
+        return [True] * len(positions)
+    results = [next(iter(item.values())) for item in res["items"]]
+    if any(retry_later(result) for result in results):
+        raise StorageThrottledError("bulk request partially rejected; retry later")
+    statuses = [result.get("status", 500) for result in results]
+    return [statuses[pos] < 300 for pos in positions]
+
+
+def delete_results(res: Mapping[str, Any], positions: Sequence[int]) -> List[bool]:
+    """Whether the bulk deletes at *positions* found their document.
+
+    ``not_found`` is a normal outcome; other item failures raise.
+    """
+    results = [next(iter(item.values())) for item in res["items"]]
+    if any(retry_later(result) for result in results):
+        raise StorageThrottledError("bulk request partially rejected; retry later")
+    statuses = [result.get("status", 500) for result in results]
+    failed = [status for status in statuses if status >= 300 and status != 404]
+    if failed:
+        raise StorageUnavailableError(f"{len(failed)} bulk delete item(s) failed")
+    return [statuses[pos] < 300 for pos in positions]
+
+
+@contextmanager
+def translate_errors() -> Iterator[None]:
+    """Raise transport failures and 5xx/429 responses as storage errors.
+
+    ``NotFoundError`` and other client errors pass through unchanged so
+    callers can still tell a missing document from an unreachable cluster.
+    """
+    try:
+        yield
+    except TransportError as exc:
+        raise StorageUnavailableError(str(exc)) from exc
+    except ApiError as exc:
+        if exc.status_code == 429:
+            raise StorageThrottledError(str(exc)) from exc
+        if exc.status_code >= 500:
+            raise StorageUnavailableError(str(exc)) from exc
+        raise
+
+
+def _json_value(value: Any) -> Any:
+    if isinstance(value, AlgorithmResult):
+        return AlgorithmResultDTO.from_domain(value).dict()
+    if isinstance(value, list):
+        return [_json_value(v) for v in value]
+    return value
+
+
+def apply_changes(
+    metadata: VideoMetadata,
+    fields: Dict[str, Any],
+    append: Optional[Dict[str, List[Any]]],
+) -> VideoMetadata:
+    changes = dict(fields)
+    for name, values in (append or {}).items():
+        changes[name] = list(getattr(metadata, name)) + list(values)
+    return dataclasses.replace(metadata, **changes)
+
+
+def update_script(
+    fields: Dict[str, Any], append: Optional[Dict[str, List[Any]]]
+) -> Dict[str, Any]:
+    return {
+        "source": UPDATE_SCRIPT,
+        "lang": "painless",
+        "params": {
+            "fields": {k: _json_value(v) for k, v in fields.items()},
+            "append": {k: _json_value(v) for k, v in (append or {}).items()},
+            "hash_field": CONTENT_HASH_FIELD,
+        },
+    }
+
+
+def encode_page_cursor(search_after: List[Any]) -> str:
+    raw = json.dumps({"after": search_after}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_page_cursor(cursor: str) -> List[Any]:
+    try:
+        after = json.loads(base64.urlsafe_b64decode(cursor.encode()))["after"]
+    except (ValueError, KeyError, TypeError) as exc:
+        raise InvalidCursorError(cursor) from exc
+    if not (
+        isinstance(after, list)
+        and len(after) == 2
+        and isinstance(after[0], int)
+        and isinstance(after[1], str)
+    ):
+        raise InvalidCursorError(cursor)
+    return after
+
+
+def page_body(limit: int, search_after: Optional[List[Any]]) -> Dict[str, Any]:
+    # (timestamp, video_id) is unique, so search_after needs no point-in-time:
+    # nothing is left open on the cluster when a client stops paging.
+    body: Dict[str, Any] = {
+        "size": limit,
+        "query": {"match_all": {}},
+        "sort": [{"timestamp": "asc"}, {"video_id": "asc"}],
+    }
+    if search_after is not None:
+        body["search_after"] = search_after
+    return body
+
+
+def page_result(
+    res: Mapping[str, Any], limit: int
+) -> Tuple[List[VideoMetadata], Optional[str]]:
+    """Return the page items and the next cursor (``None`` when done)."""
+    hits = res.get("hits", {}).get("hits", [])
+    items = [VideoMetadataDTO(**strip(hit["_source"])).to_domain() for hit in hits]
+    if len(hits) < limit:
+        return items, None
+    return items, encode_page_cursor(hits[-1]["sort"])
+
+
+class ElasticsearchRequests:
+    """Index layout of a video storage and the requests it sends.
+
+    With ``partitioned=True`` videos are spread over monthly indices behind
+    the ``index`` alias (see :mod:`libs.storage.elasticsearch_partitions`).
+    With ``split_frames=True`` frame results are stored as separate documents
+    and reassembled on read (see :mod:`libs.storage.elasticsearch_frames`);
+    the two modes cannot be combined.
+
+    Methods returning ``*_params`` dicts are passed as keyword arguments to
+    the matching client call.
+    """
+
+    def __init__(
+        self,
+        host: Optional[str] = None,
+        index: Optional[str] = None,
+        retry_on_conflict: int = 3,
+        partitioned: bool = False,
+        split_frames: bool = False,
+    ) -> None:
+        if partitioned and split_frames:
+            raise ValueError("split_frames cannot be combined with partitioned indices")
+        self.host = host or os.getenv("ES_HOST", "http://localhost:9200")
+        self.index = index or os.getenv("ES_VIDEO_INDEX", "videos")
+        self.retry_on_conflict = retry_on_conflict
+        self.partitions = PartitionScheme(self.index) if partitioned else None
+        self.frames = FrameScheme(self.index) if split_frames else None
+
+    def _search_index(self, query: Mapping[str, Any]) -> str:
+        if self.partitions is None:
+            return self.index
+        return self.partitions.search_index(query)
+
+    def _frame_mgets(self, sources: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """``_mget`` calls loading the split frames of *sources*, at most ``MGET_CHUNK`` ids each."""
+        if self.frames is None:
+            return []
+        ids = self.frames.frame_ids(sources)
+        return [
+            {"index": self.frames.index, "ids": ids[start : start + MGET_CHUNK]}
+            for start in range(0, len(ids), MGET_CHUNK)
+        ]
+
+    def _frame_counts_params(self, video_ids: List[str]) -> Dict[str, Any]:
+        return {"index": self.index, "ids": video_ids, "source_includes": [FRAME_COUNTS_FIELD]}
+
+    def _cached_partitions(self, video_ids: List[str]) -> Tuple[Dict[str, str], List[str]]:
+        """Partitions of *video_ids* known to the lookup cache, and the ids to look up."""
+        assert self.partitions is not None
+        found: Dict[str, str] = {}
+        missing: List[str] = []
+        for video_id in video_ids:
+            partition = self.partitions.cached(video_id)
+            if partition is None:
+                missing.append(video_id)
+            else:
+                found[video_id] = partition
+        return found, missing
+
+    def _matching_ids_params(
+        self, query: Dict[str, Any], page_size: int, pit_id: str, search_after: Optional[List[Any]]
+    ) -> Dict[str, Any]:
+        return {
+            "query": query,
+            "size": page_size,
+            "source": False,
+            "sort": [{"_shard_doc": "asc"}],
+            "pit": {"id": pit_id, "keep_alive": PIT_KEEP_ALIVE},
+            "search_after": search_after,
+        }
+
+    def _writes_through_bulk(self) -> bool:
+        """Whether single writes must go through ``_bulk`` with extra operations."""
+        return self.partitions is not None or self.frames is not None
+
+    def _write_operations(
+        self, metadata: List[VideoMetadata], current: Mapping[str, Any]
+    ) -> Tuple[List[Any], List[Span]]:
+        """Bulk operations indexing *metadata* and the span of bulk items checked per video.
+
+        *current* maps video ids to their stored ``frame_counts`` in split
+        mode and to their partition in partitioned mode; it is ignored otherwise.
+        """
+        if self.frames is not None:
+            return self.frames.write_operations(
+                self.index, (document(meta) for meta in metadata), current
+            )
+        if self.partitions is not None:
+            operations, positions = self.partitions.write_operations(
+                ((meta.video_id, meta.timestamp, document(meta)) for meta in metadata), current
+            )
+        else:
+            operations = bulk_operations(self.index, metadata)
+            positions = list(range(len(metadata)))
+        return operations, [(pos, pos + 1) for pos in positions]
+
+    def _write_results(
+        self, metadata: List[VideoMetadata], res: Mapping[str, Any], spans: List[Span]
+    ) -> List[bool]:
+        if self.frames is not None:
+            return span_results(res, spans)
+        results = bulk_results(res, [start for start, _ in spans])
+        if self.partitions is not None:
+            for meta, ok in zip(metadata, results):
+                if ok:
+                    self.partitions.remember(
+                        meta.video_id, self.partitions.partition_for(meta.timestamp)
+                    )
+        return results
+
+    def _mget_params(
+        self, ids: List[str], partitions: Optional[Mapping[str, str]], **source: Any
+    ) -> Dict[str, Any]:
+        """``_mget`` of *ids*, or of the *partitions* (id -> index) they were found in."""
+        if partitions is None:
+            return {"index": self.index, "ids": ids, **source}
+        return {
+            "docs": [{"_index": index, "_id": video_id} for video_id, index in partitions.items()],
+            **source,
+        }
+
+    def _get_result(self, res: Optional[Mapping[str, Any]]) -> Optional[Dict[str, Any]]:
+        if res is None or not res.get("_source"):
+            return None
+        return strip(res["_source"])
+
+    def _page_params(self, limit: int, cursor: Optional[str]) -> Dict[str, Any]:
+        search_after = None if cursor is None else decode_page_cursor(cursor)
+        return {"index": self.index, "body": page_body(limit, search_after)}
+
+    def _reads_before_update(self, fields: Mapping[str, Any]) -> bool:
+        """Whether :meth:`_rewritten` needs the current video to apply an update."""
+        return self.frames is not None or (
+            self.partitions is not None and fields.get("timestamp") is not None
+        )
+
+    def _rewritten(
+        self,
+        current: VideoMetadata,
+        fields: Dict[str, Any],
+        append: Optional[Dict[str, List[Any]]],
+    ) -> Optional[VideoMetadata]:
+        """The updated video if it must be re-indexed rather than scripted, else ``None``.
+
+        Split videos are always rewritten; partitioned ones only when the new
+        timestamp moves them to another month.
+        """
+        if self.partitions is not None:
+            target = self.partitions.partition_for(fields["timestamp"])
+            if target == self.partitions.partition_for(current.timestamp):
+                return None
+        return apply_changes(current, fields, append)
+
+    def _update_params(
+        self,
+        video_id: str,
+        fields: Dict[str, Any],
+        append: Optional[Dict[str, List[Any]]],
+    ) -> Dict[str, Any]:
+        return {
+            "id": video_id,
+            "script": update_script(fields, append),
+            "retry_on_conflict": self.retry_on_conflict,
+            "source": True,
+        }
+
+    def _updated(self, res: Optional[Mapping[str, Any]]) -> Optional[VideoMetadata]:
+        if res is None:
+            return None
+        return VideoMetadataDTO(**strip(res["get"]["_source"])).to_domain()
+
+    def _delete_operations(
+        self, ids: List[str], current: Mapping[str, Any]
+    ) -> Tuple[List[str], List[Dict[str, Any]], List[int]]:
+        """Videos to delete, their bulk operations and the position of each video's delete.
+
+        *current* is as for :meth:`_write_operations`; only the videos it
+        lists are deleted in split and partitioned mode.
+        """
+        if self.frames is None and self.partitions is None:
+            operations = [{"delete": {"_index": self.index, "_id": video_id}} for video_id in ids]
+            return ids, operations, list(range(len(ids)))
+        targets = list(current)
+        operations, positions = [], []
+        for video_id, located in current.items():
+            positions.append(len(operations))
+            if self.frames is not None:
+                operations.extend(self.frames.delete_operations(self.index, video_id, located))
+            else:
+                assert self.partitions is not None
+                operations.extend(self.partitions.delete_operations(video_id, located))
+        return targets, operations, positions
+
+    def _deleted(
+        self,
+        video_ids: List[str],
+        targets: List[str],
+        res: Optional[Mapping[str, Any]],
+        positions: List[int],
+    ) -> List[bool]:
+        """Per requested id, whether it was deleted by the bulk response *res*."""
+        deleted = {} if res is None else dict(zip(targets, delete_results(res, positions)))
+        if self.partitions is not None:
+            for video_id in targets:
+                self.partitions.forget(video_id)
+        return [deleted.get(video_id, False) for video_id in video_ids]
+
+    def _delete_by_query_params(self, query: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "index": self._search_index({"query": query}),
+            "query": query,
+            "conflicts": "proceed",
+            "slices": "auto",
+            "ignore_unavailable": self.partitions is not None,
+        }
+
+    def _search_params(self, query: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "index": self._search_index(query),
+            "body": query,
+            "ignore_unavailable": self.partitions is not None,
+        }
+
+    def _frame_filter_params(self, filters: Mapping[str, Any], size: int) -> Dict[str, Any]:
+        assert self.frames is not None
+        return {"index": self.frames.index, "body": frame_filter_body(filters, size)}
+
+    def _filter_mget_params(self, ids: List[str], fields: Optional[List[str]]) -> Dict[str, Any]:
+        return {"index": self.index, "ids": ids, **mget_source_params(fields, split_frames=True)}
+
+    def _aggregate_params(self, query: Dict[str, Any], aggs: Dict[str, Any]) -> Dict[str, Any]:
+        index = self.frames.index if self.frames is not None else self._search_index({"query": query})
+        return {
+            "index": index,
+            "query": query,
+            "aggs": aggs,
+            "size": 0,
+            "track_total_hits": False,
+            "ignore_unavailable": self.partitions is not None,
+        }
+
+    def _frames_page_params(
+        self, video_id: str, filters: Dict[str, Any], limit: int, cursor: Optional[str]
+    ) -> Dict[str, Any]:
+        assert self.frames is not None
+        search_after = None if cursor is None else decode_cursor(cursor)
+        return {
+            "index": self.frames.index,
+            "body": self.frames.page_body(video_id, filters, limit, search_after),
+        }
+
+    def _frames_page(self, res: Mapping[str, Any], limit: int) -> FramePage:
+        assert self.frames is not None
+        rows, last = self.frames.page_rows(res)
+        return rows, encode_cursor(last) if last is not None and len(rows) == limit else None
@@ -0,0 +1,66 @@
+"""Backend-independent helpers for typed video searches.
+
+Filters are a dict with any of ``action`` and ``min_confidence``, matched
+together against single frame results; ``algorithm_type``; and ``start``/
+``end`` datetimes bounding the video ``timestamp``, start inclusive and end
+exclusive. Fields name the top-level document fields to return; ``video_id``
+is always included.
+"""
+
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Mapping, Optional
+
+from .frames import matches
+
+FILTER_FIELDS = ("video_id", "timestamp", "algorithms", "extra")
+FRAME_FILTERS = ("action", "min_confidence")
+
+
+def frame_filters(filters: Mapping[str, Any]) -> Dict[str, Any]:
+    """The subset of *filters* evaluated per frame result."""
+    return {name: filters[name] for name in FRAME_FILTERS if name in filters}
+
+
+def source_fields(fields: Optional[List[str]]) -> Optional[List[str]]:
+    """Top-level fields to load for *fields*, or ``None`` for whole documents."""
+    if fields is None:
+        return None
+    return list(dict.fromkeys(["video_id", *fields]))
+
+
+def _utc(value: datetime) -> datetime:
+    return value.astimezone(timezone.utc) if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def video_matches(source: Mapping[str, Any], filters: Mapping[str, Any]) -> bool:
+    if "start" in filters and _utc(source["timestamp"]) < _utc(filters["start"]):
+        return False
+    if "end" in filters and _utc(source["timestamp"]) >= _utc(filters["end"]):
+        return False
+    if "algorithm_type" in filters and not any(
+        algorithm["type"] == filters["algorithm_type"] for algorithm in source.get("algorithms", [])
+    ):
+        return False
+    per_frame = frame_filters(filters)
+    if per_frame and not any(
+        matches(result, per_frame)
+        for algorithm in source.get("algorithms", [])
+        for result in algorithm.get("results", [])
+    ):
+        return False
+    return True
+
+
+def filter_sources(
+    sources: List[Dict[str, Any]],
+    filters: Mapping[str, Any],
+    fields: Optional[List[str]],
+    size: int,
+) -> List[Dict[str, Any]]:
+    """The newest *size* of *sources* matching *filters*, projected to *fields*."""
+    found = [source for source in sources if video_matches(source, filters)]
+    found.sort(key=lambda source: _utc(source["timestamp"]), reverse=True)
+    include = source_fields(fields)
+    if include is None:
+        return found[:size]
+    return [{name: source[name] for name in include if name in source} for source in found[:size]]
@@ -0,0 +1,72 @@
+"""Backend-independent helpers for querying the frame results of one video.
+
+A frame row is one entry of ``algorithms[].results`` plus ``algorithm``, the
+index of its algorithm in ``algorithms``, and that algorithm's ``type``.
+Filters are a dict with any of ``start_frame``/``end_frame`` (on
+``frame_num``), ``start_time``/``end_time`` (on the zero-padded
+``HH:MM:SS.s`` frame ``timestamp``), ``action`` and ``min_confidence``.
+Starts are inclusive and ends exclusive.
+"""
+
+import base64
+import json
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from .base import InvalidCursorError, _offset
+
+FramePage = Tuple[List[Dict[str, Any]], Optional[str]]
+
+
+def frame_rows(source: Mapping[str, Any]) -> List[Dict[str, Any]]:
+    """Every frame result of the stored document *source*, in frame order."""
+    rows = [
+        {"algorithm": i, "type": algorithm["type"], **result}
+        for i, algorithm in enumerate(source.get("algorithms", []))
+        for result in algorithm.get("results", [])
+    ]
+    rows.sort(key=lambda row: (row["frame_num"], row["algorithm"]))
+    return rows
+
+
+def matches(row: Mapping[str, Any], filters: Mapping[str, Any]) -> bool:
+    if "start_frame" in filters and row["frame_num"] < filters["start_frame"]:
+        return False
+    if "end_frame" in filters and row["frame_num"] >= filters["end_frame"]:
+        return False
+    if "start_time" in filters and row["timestamp"] < filters["start_time"]:
+        return False
+    if "end_time" in filters and row["timestamp"] >= filters["end_time"]:
+        return False
+    if "action" in filters and row["action"] != filters["action"]:
+        return False
+    if "min_confidence" in filters and row["confidence"] < filters["min_confidence"]:
+        return False
+    return True
+
+
+def page_frames(
+    source: Mapping[str, Any],
+    filters: Mapping[str, Any],
+    limit: int,
+    cursor: Optional[str] = None,
+) -> FramePage:
+    """Filter the frames of a fully loaded document and return one page of them."""
+    offset = _offset(cursor)
+    rows = [row for row in frame_rows(source) if matches(row, filters)]
+    page = rows[offset : offset + limit]
+    return page, str(offset + limit) if offset + limit < len(rows) else None
+
+
+def encode_cursor(search_after: List[Any]) -> str:
+    raw = json.dumps(search_after, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    try:
+        search_after = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError as exc:
+        raise InvalidCursorError(cursor) from exc
+    if not isinstance(search_after, list):
+        raise InvalidCursorError(cursor)
+    return search_after
@@ -0,0 +1,257 @@
+"""Storage decorators recording per-operation latency and errors in Prometheus."""
+
+from typing import Any, AsyncIterator, Dict, Generic, Iterator, List, Optional, Tuple, TypeVar
+
+from libs.metrics import observe_storage
+
+from .base import AsyncStorage, AsyncVideoStorage, Storage, VideoStorage
+
+
+T = TypeVar("T")
+
+
+class InstrumentedStorage(Storage[T], Generic[T]):
+    """:class:`Storage` decorator timing every call to *inner* under ``backend``.
+
+    ``iter_all`` is not timed as a whole; wrap the storage before anything
+    that pages through it if per-page latency is needed.
+    """
+
+    def __init__(self, inner: Storage[T], backend: str) -> None:
+        self.inner = inner
+        self.backend = backend
+
+    def setup(self) -> None:
+        with observe_storage(self.backend, "setup"):
+            self.inner.setup()
+
+    def ping(self) -> None:
+        with observe_storage(self.backend, "ping"):
+            self.inner.ping()
+
+    def create(self, obj: T) -> None:
+        with observe_storage(self.backend, "create"):
+            self.inner.create(obj)
+
+    def create_many(self, objs: List[T]) -> List[bool]:
+        with observe_storage(self.backend, "create_many"):
+            return self.inner.create_many(objs)
+
+    def get(self, obj_id: str) -> Optional[T]:
+        with observe_storage(self.backend, "get"):
+            return self.inner.get(obj_id)
+
+    def get_source(self, obj_id: str) -> Optional[Dict[str, Any]]:
+        with observe_storage(self.backend, "get_source"):
+            return self.inner.get_source(obj_id)
+
+    def get_many(
+        self, obj_ids: List[str], fields: Optional[List[str]] = None
+    ) -> Dict[str, T]:
+        with observe_storage(self.backend, "get_many"):
+            return self.inner.get_many(obj_ids, fields)
+
+    def get_sources(self, obj_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        with observe_storage(self.backend, "get_sources"):
+            return self.inner.get_sources(obj_ids)
+
+    def list(self) -> List[T]:
+        with observe_storage(self.backend, "list"):
+            return self.inner.list()
+
+    def list_page(
+        self, limit: int, cursor: Optional[str] = None
+    ) -> Tuple[List[T], Optional[str]]:
+        with observe_storage(self.backend, "list_page"):
+            return self.inner.list_page(limit, cursor)
+
+    def iter_all(self, page_size: int = 500) -> Iterator[T]:
+        return self.inner.iter_all(page_size)
+
+    def update(self, obj_id: str, obj: T) -> None:
+        with observe_storage(self.backend, "update"):
+            self.inner.update(obj_id, obj)
+
+    def delete(self, obj_id: str) -> None:
+        with observe_storage(self.backend, "delete"):
+            self.inner.delete(obj_id)
+
+    def delete_many(self, obj_ids: List[str]) -> List[bool]:
+        with observe_storage(self.backend, "delete_many"):
+            return self.inner.delete_many(obj_ids)
+
+    def search(self, query: Dict[str, Any]) -> List[T]:
+        with observe_storage(self.backend, "search"):
+            return self.inner.search(query)
+
+    def search_sources(self, query: Dict[str, Any]) -> List[Dict[str, Any]]:
+        with observe_storage(self.backend, "search_sources"):
+            return self.inner.search_sources(query)
+
+
+class InstrumentedVideoStorage(InstrumentedStorage[T], VideoStorage[T]):
+    """:class:`InstrumentedStorage` of a :class:`VideoStorage`, timing the video-only calls too."""
+
+    inner: VideoStorage[T]
+
+    def __init__(self, inner: VideoStorage[T], backend: str) -> None:
+        super().__init__(inner, backend)
+
+    def content_hashes(self, obj_ids: List[str]) -> Dict[str, str]:
+        with observe_storage(self.backend, "content_hashes"):
+            return self.inner.content_hashes(obj_ids)
+
+    def partial_update(
+        self,
+        obj_id: str,
+        fields: Dict[str, Any],
+        append: Optional[Dict[str, List[Any]]] = None,
+    ) -> Optional[T]:
+        with observe_storage(self.backend, "partial_update"):
+            return self.inner.partial_update(obj_id, fields, append)
+
+    def delete_by_query(self, query: Dict[str, Any]) -> int:
+        with observe_storage(self.backend, "delete_by_query"):
+            return self.inner.delete_by_query(query)
+
+    def filter_sources(
+        self,
+        filters: Dict[str, Any],
+        fields: Optional[List[str]],
+        size: int,
+    ) -> List[Dict[str, Any]]:
+        with observe_storage(self.backend, "filter_sources"):
+            return self.inner.filter_sources(filters, fields, size)
+
+    def aggregate(self, query: Dict[str, Any], aggs: Dict[str, Any]) -> Dict[str, Any]:
+        with observe_storage(self.backend, "aggregate"):
+            return self.inner.aggregate(query, aggs)
+
+    def frames_page(
+        self,
+        obj_id: str,
+        filters: Dict[str, Any],
+        limit: int,
+        cursor: Optional[str] = None,
+    ) -> Optional[Tuple[List[Dict[str, Any]], Optional[str]]]:
+        with observe_storage(self.backend, "frames_page"):
+            return self.inner.frames_page(obj_id, filters, limit, cursor)
+
+
+class AsyncInstrumentedStorage(AsyncStorage[T], Generic[T]):
+    """Asynchronous counterpart of :class:`InstrumentedStorage`."""
+
+    def __init__(self, inner: AsyncStorage[T], backend: str) -> None:
+        self.inner = inner
+        self.backend = backend
+
+    async def ping(self) -> None:
+        with observe_storage(self.backend, "ping"):
+            await self.inner.ping()
+
+    async def create(self, obj: T) -> None:
+        with observe_storage(self.backend, "create"):
+            await self.inner.create(obj)
+
+    async def create_many(self, objs: List[T]) -> List[bool]:
+        with observe_storage(self.backend, "create_many"):
+            return await self.inner.create_many(objs)
+
+    async def get(self, obj_id: str) -> Optional[T]:
+        with observe_storage(self.backend, "get"):
+            return await self.inner.get(obj_id)
+
+    async def get_source(self, obj_id: str) -> Optional[Dict[str, Any]]:
+        with observe_storage(self.backend, "get_source"):
+            return await self.inner.get_source(obj_id)
+
+    async def get_many(
+        self, obj_ids: List[str], fields: Optional[List[str]] = None
+    ) -> Dict[str, T]:
+        with observe_storage(self.backend, "get_many"):
+            return await self.inner.get_many(obj_ids, fields)
+
+    async def get_sources(self, obj_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        with observe_storage(self.backend, "get_sources"):
+            return await self.inner.get_sources(obj_ids)
+
+    async def list(self) -> List[T]:
+        with observe_storage(self.backend, "list"):
+            return await self.inner.list()
+
+    async def list_page(
+        self, limit: int, cursor: Optional[str] = None
+    ) -> Tuple[List[T], Optional[str]]:
+        with observe_storage(self.backend, "list_page"):
+            return await self.inner.list_page(limit, cursor)
+
+    def iter_all(self, page_size: int = 500) -> AsyncIterator[T]:
+        return self.inner.iter_all(page_size)
+
+    async def update(self, obj_id: str, obj: T) -> None:
+        with observe_storage(self.backend, "update"):
+            await self.inner.update(obj_id, obj)
+
+    async def delete(self, obj_id: str) -> None:
+        with observe_storage(self.backend, "delete"):
+            await self.inner.delete(obj_id)
+
+    async def delete_many(self, obj_ids: List[str]) -> List[bool]:
+        with observe_storage(self.backend, "delete_many"):
+            return await self.inner.delete_many(obj_ids)
+
+    async def search(self, query: Dict[str, Any]) -> List[T]:
+        with observe_storage(self.backend, "search"):
+            return await self.inner.search(query)
+
+    async def search_sources(self, query: Dict[str, Any]) -> List[Dict[str, Any]]:
+        with observe_storage(self.backend, "search_sources"):
+            return await self.inner.search_sources(query)
+
+    async def close(self) -> None:
+        await self.inner.close()
+
+
+class AsyncInstrumentedVideoStorage(AsyncInstrumentedStorage[T], AsyncVideoStorage[T]):
+    """Asynchronous counterpart of :class:`InstrumentedVideoStorage`."""
+
+    inner: AsyncVideoStorage[T]
+
+    def __init__(self, inner: AsyncVideoStorage[T], backend: str) -> None:
+        super().__init__(inner, backend)
+
+    async def partial_update(
+        self,
+        obj_id: str,
+        fields: Dict[str, Any],
+        append: Optional[Dict[str, List[Any]]] = None,
+    ) -> Optional[T]:
+        with observe_storage(self.backend, "partial_update"):
+            return await self.inner.partial_update(obj_id, fields, append)
+
+    async def delete_by_query(self, query: Dict[str, Any]) -> int:
+        with observe_storage(self.backend, "delete_by_query"):
+            return await self.inner.delete_by_query(query)
+
+    async def filter_sources(
+        self,
+        filters: Dict[str, Any],
+        fields: Optional[List[str]],
+        size: int,
+    ) -> List[Dict[str, Any]]:
+        with observe_storage(self.backend, "filter_sources"):
+            return await self.inner.filter_sources(filters, fields, size)
+
+    async def aggregate(self, query: Dict[str, Any], aggs: Dict[str, Any]) -> Dict[str, Any]:
+        with observe_storage(self.backend, "aggregate"):
+            return await self.inner.aggregate(query, aggs)
+
+    async def frames_page(
+        self,
+        obj_id: str,
+        filters: Dict[str, Any],
+        limit: int,
+        cursor: Optional[str] = None,
+    ) -> Optional[Tuple[List[Dict[str, Any]], Optional[str]]]:
+        with observe_storage(self.backend, "frames_page"):
+            return await self.inner.frames_page(obj_id, filters, limit, cursor)
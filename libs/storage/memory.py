@@ -0,0 +1,249 @@
+"""In-memory storage backends for tests and local runs without infrastructure."""
+
+import dataclasses
+from typing import Any, Callable, Dict, Generic, List, Optional, TypeVar
+
+from .base import AsyncStorage, AsyncVideoStorage, Storage, VideoStorage
+from .filters import filter_sources
+from .frames import FramePage, page_frames
+
+
+T = TypeVar("T")
+
+
+def _field(obj: Any, name: str) -> Any:
+    if isinstance(obj, dict):
+        return obj.get(name)
+    return getattr(obj, name, None)
+
+
+def _replace(obj: Any, fields: Dict[str, Any]) -> Any:
+    if isinstance(obj, dict):
+        return {**obj, **fields}
+    return dataclasses.replace(obj, **fields)
+
+
+def _source(obj: Any) -> Dict[str, Any]:
+    return dict(obj) if isinstance(obj, dict) else dataclasses.asdict(obj)
+
+
+def _matches(obj: Any, query: Dict[str, Any]) -> bool:
+    """Evaluate the small subset of query DSL the fakes understand.
+
+    Supports ``match_all`` plus ``term``/``match`` on top-level fields and
+    ``ids``; anything else matches every object.
+    """
+    clause = query.get("query", query)
+    if "term" in clause or "match" in clause:
+        ((name, value),) = (clause.get("term") or clause["match"]).items()
+        if isinstance(value, dict):
+            value = value.get("value", value.get("query"))
+        return _field(obj, name) == value
+    return True
+
+
+def _updated(obj: Any, fields: Dict[str, Any], append: Optional[Dict[str, List[Any]]]) -> Any:
+    changes = dict(fields)
+    for name, values in (append or {}).items():
+        changes[name] = list(_field(obj, name) or []) + list(values)
+    return _replace(obj, changes)
+
+
+def _select(items: Dict[str, T], query: Dict[str, Any]) -> List[T]:
+    """Objects matching *query*, honouring ``ids`` and a top-level ``size``."""
+    ids = query.get("query", query).get("ids", {}).get("values")
+    if ids is not None:
+        found = [items[i] for i in ids if i in items]
+    else:
+        found = [obj for obj in items.values() if _matches(obj, query)]
+    size = query.get("size")
+    return found if size is None else found[:size]
+
+
+class InMemoryStorage(Storage[T], Generic[T]):
+    """Dict-backed :class:`Storage` keyed by ``key(obj)``."""
+
+    def __init__(self, key: Callable[[T], str] = lambda obj: _field(obj, "video_id")) -> None:
+        self._key = key
+        self._items: Dict[str, T] = {}
+
+    def create(self, obj: T) -> None:
+        self._items[self._key(obj)] = obj
+
+    def get(self, obj_id: str) -> Optional[T]:
+        return self._items.get(obj_id)
+
+    def get_source(self, obj_id: str) -> Optional[Dict[str, Any]]:
+        obj = self._items.get(obj_id)
+        return None if obj is None else _source(obj)
+
+    def list(self) -> List[T]:
+        return list(self._items.values())
+
+    def update(self, obj_id: str, obj: T) -> None:
+        if obj_id in self._items:
+            self._items[obj_id] = obj
+
+    def delete(self, obj_id: str) -> None:
+        self._items.pop(obj_id, None)
+
+    def delete_many(self, obj_ids: List[str]) -> List[bool]:
+        return [self._items.pop(obj_id, None) is not None for obj_id in obj_ids]
+
+    def search(self, query: Dict[str, Any]) -> List[T]:
+        return _select(self._items, query)
+
+    def search_sources(self, query: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return [_source(obj) for obj in self.search(query)]
+
+
+class InMemoryVideoStorage(InMemoryStorage[T], VideoStorage[T]):
+    """Dict-backed :class:`VideoStorage`; aggregations are not supported.
+
+    With *hasher*, ``create`` stores ``hasher(obj)`` as the object's content
+    hash and any other write drops it, like the Elasticsearch backend.
+    """
+
+    def __init__(
+        self,
+        key: Callable[[T], str] = lambda obj: _field(obj, "video_id"),
+        hasher: Optional[Callable[[T], str]] = None,
+    ) -> None:
+        super().__init__(key)
+        self._hasher = hasher
+        self._hashes: Dict[str, str] = {}
+
+    def create(self, obj: T) -> None:
+        super().create(obj)
+        if self._hasher is not None:
+            self._hashes[self._key(obj)] = self._hasher(obj)
+
+    def content_hashes(self, obj_ids: List[str]) -> Dict[str, str]:
+        return {obj_id: self._hashes[obj_id] for obj_id in obj_ids if obj_id in self._hashes}
+
+    def update(self, obj_id: str, obj: T) -> None:
+        super().update(obj_id, obj)
+        self._hashes.pop(obj_id, None)
+
+    def partial_update(
+        self,
+        obj_id: str,
+        fields: Dict[str, Any],
+        append: Optional[Dict[str, List[Any]]] = None,
+    ) -> Optional[T]:
+        obj = self._items.get(obj_id)
+        if obj is None:
+            return None
+        obj = self._items[obj_id] = _updated(obj, fields, append)
+        self._hashes.pop(obj_id, None)
+        return obj
+
+    def delete(self, obj_id: str) -> None:
+        super().delete(obj_id)
+        self._hashes.pop(obj_id, None)
+
+    def delete_many(self, obj_ids: List[str]) -> List[bool]:
+        for obj_id in obj_ids:
+            self._hashes.pop(obj_id, None)
+        return super().delete_many(obj_ids)
+
+    def delete_by_query(self, query: Dict[str, Any]) -> int:
+        return sum(self.delete_many([self._key(obj) for obj in _select(self._items, query)]))
+
+    def filter_sources(
+        self,
+        filters: Dict[str, Any],
+        fields: Optional[List[str]],
+        size: int,
+    ) -> List[Dict[str, Any]]:
+        return filter_sources([_source(obj) for obj in self._items.values()], filters, fields, size)
+
+    def aggregate(self, query: Dict[str, Any], aggs: Dict[str, Any]) -> Dict[str, Any]:
+        raise NotImplementedError("aggregations need Elasticsearch")
+
+    def frames_page(
+        self,
+        obj_id: str,
+        filters: Dict[str, Any],
+        limit: int,
+        cursor: Optional[str] = None,
+    ) -> Optional[FramePage]:
+        source = self.get_source(obj_id)
+        return None if source is None else page_frames(source, filters, limit, cursor)
+
+
+class AsyncInMemoryStorage(AsyncStorage[T], Generic[T]):
+    """Dict-backed :class:`AsyncStorage` keyed by ``key(obj)``."""
+
+    def __init__(self, key: Callable[[T], str] = lambda obj: _field(obj, "video_id")) -> None:
+        self._key = key
+        self._items: Dict[str, T] = {}
+
+    async def create(self, obj: T) -> None:
+        self._items[self._key(obj)] = obj
+
+    async def get(self, obj_id: str) -> Optional[T]:
+        return self._items.get(obj_id)
+
+    async def get_source(self, obj_id: str) -> Optional[Dict[str, Any]]:
+        obj = self._items.get(obj_id)
+        return None if obj is None else _source(obj)
+
+    async def list(self) -> List[T]:
+        return list(self._items.values())
+
+    async def update(self, obj_id: str, obj: T) -> None:
+        if obj_id in self._items:
+            self._items[obj_id] = obj
+
+    async def delete(self, obj_id: str) -> None:
+        self._items.pop(obj_id, None)
+
+    async def delete_many(self, obj_ids: List[str]) -> List[bool]:
+        return [self._items.pop(obj_id, None) is not None for obj_id in obj_ids]
+
+    async def search(self, query: Dict[str, Any]) -> List[T]:
+        return _select(self._items, query)
+
+    async def search_sources(self, query: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return [_source(obj) for obj in await self.search(query)]
+
+
+class AsyncInMemoryVideoStorage(AsyncInMemoryStorage[T], AsyncVideoStorage[T]):
+    """Dict-backed :class:`AsyncVideoStorage`; aggregations are not supported."""
+
+    async def partial_update(
+        self,
+        obj_id: str,
+        fields: Dict[str, Any],
+        append: Optional[Dict[str, List[Any]]] = None,
+    ) -> Optional[T]:
+        obj = self._items.get(obj_id)
+        if obj is None:
+            return None
+        obj = self._items[obj_id] = _updated(obj, fields, append)
+        return obj
+
+    async def delete_by_query(self, query: Dict[str, Any]) -> int:
+        return sum(await self.delete_many([self._key(obj) for obj in _select(self._items, query)]))
+
+    async def filter_sources(
+        self,
+        filters: Dict[str, Any],
+        fields: Optional[List[str]],
+        size: int,
+    ) -> List[Dict[str, Any]]:
+        return filter_sources([_source(obj) for obj in self._items.values()], filters, fields, size)
+
+    async def aggregate(self, query: Dict[str, Any], aggs: Dict[str, Any]) -> Dict[str, Any]:
+        raise NotImplementedError("aggregations need Elasticsearch")
+
+    async def frames_page(
+        self,
+        obj_id: str,
+        filters: Dict[str, Any],
+        limit: int,
+        cursor: Optional[str] = None,
+    ) -> Optional[FramePage]:
+        source = await self.get_source(obj_id)
+        return None if source is None else page_frames(source, filters, limit, cursor)
@@ -1,25 +1,67 @@
 """MongoDB storage implementation."""
 
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, TypeVar
 
 from pymongo import MongoClient
+from pymongo.errors import ConnectionFailure
 
-from .base import Storage
+from libs.clients import RetryPolicy
+
+from .base import Storage, StorageUnavailableError
+
+R = TypeVar("R")
 
 
 class MongoStorage(Storage[Dict[str, Any]]):
-    def __init__(self, url: str, db: str, collection: str) -> None:
-        self.client = MongoClient(url)
+    """MongoDB-backed storage.
+
+    Reads are retried with *retry* on connection failures and then raised as
+    :class:`StorageUnavailableError`; a missing document is still ``None``.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        db: str,
+        collection: str,
+        client: Optional["MongoClient[Dict[str, Any]]"] = None,
+        retry: Optional[RetryPolicy] = None,
+    ) -> None:
+        self.client = client if client is not None else MongoClient(url)
         self.collection = self.client[db][collection]
+        self.retry = retry or RetryPolicy(transient=(ConnectionFailure,))
+
+    def _read(self, call: Callable[[], R]) -> R:
+        try:
+            return self.retry.call(call)
+        except ConnectionFailure as exc:
+            raise StorageUnavailableError(str(exc)) from exc
+
+    def ping(self) -> None:
+        self.client.admin.command("ping")
 
     def create(self, obj: Dict[str, Any]) -> None:
         self.collection.insert_one(obj)
 
     def get(self, obj_id: str) -> Optional[Dict[str, Any]]:
-        return self.collection.find_one({"_id": obj_id})
+        return self._read(lambda: self.collection.find_one({"_id": obj_id}))
+
+    def get_many(
+        self, obj_ids: List[str], fields: Optional[List[str]] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """Fetch all *obj_ids* with a single ``$in`` query, optionally projected to *fields*."""
+        if not obj_ids:
+            return {}
+        projection = {field: 1 for field in fields} if fields else None
+        return self._read(
+            lambda: {
+                doc["_id"]: doc
+                for doc in self.collection.find({"_id": {"$in": obj_ids}}, projection)
+            }
+        )
 
     def list(self) -> List[Dict[str, Any]]:
-        return list(self.collection.find())
+        return self._read(lambda: list(self.collection.find()))
 
     def update(self, obj_id: str, obj: Dict[str, Any]) -> None:
         self.collection.update_one({"_id": obj_id}, {"$set": obj}, upsert=False)
@@ -28,4 +70,4 @@ class MongoStorage(Storage[Dict[str, Any]]):
         self.collection.delete_one({"_id": obj_id})
 
     def search(self, query: Dict[str, Any]) -> List[Dict[str, Any]]:
-        return list(self.collection.find(query))
+        return self._read(lambda: list(self.collection.find(query)))
@@ -0,0 +1,74 @@
+"""Asynchronous MongoDB storage implementation."""
+
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import ConnectionFailure
+
+from libs.clients import RetryPolicy
+
+from .base import AsyncStorage, StorageUnavailableError
+
+R = TypeVar("R")
+
+
+class AsyncMongoStorage(AsyncStorage[Dict[str, Any]]):
+    """Motor-backed counterpart of ``MongoStorage``, with the same read retries."""
+
+    def __init__(
+        self,
+        url: str,
+        db: str,
+        collection: str,
+        client: Optional[AsyncIOMotorClient] = None,
+        retry: Optional[RetryPolicy] = None,
+    ) -> None:
+        self._owns_client = client is None
+        self.client = client if client is not None else AsyncIOMotorClient(url)
+        self.collection = self.client[db][collection]
+        self.retry = retry or RetryPolicy(transient=(ConnectionFailure,))
+
+    async def _read(self, call: Callable[[], Awaitable[R]]) -> R:
+        try:
+            return await self.retry.acall(call)
+        except ConnectionFailure as exc:
+            raise StorageUnavailableError(str(exc)) from exc
+
+    async def ping(self) -> None:
+        await self.client.admin.command("ping")
+
+    async def create(self, obj: Dict[str, Any]) -> None:
+        await self.collection.insert_one(obj)
+
+    async def get(self, obj_id: str) -> Optional[Dict[str, Any]]:
+        return await self._read(lambda: self.collection.find_one({"_id": obj_id}))
+
+    async def get_many(
+        self, obj_ids: List[str], fields: Optional[List[str]] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """Fetch all *obj_ids* with a single ``$in`` query, optionally projected to *fields*."""
+        if not obj_ids:
+            return {}
+        projection = {field: 1 for field in fields} if fields else None
+
+        async def fetch() -> Dict[str, Dict[str, Any]]:
+            cursor = self.collection.find({"_id": {"$in": obj_ids}}, projection)
+            return {doc["_id"]: doc async for doc in cursor}
+
+        return await self._read(fetch)
+
+    async def list(self) -> List[Dict[str, Any]]:
+        return await self._read(lambda: self.collection.find().to_list(length=None))
+
+    async def update(self, obj_id: str, obj: Dict[str, Any]) -> None:
+        await self.collection.update_one({"_id": obj_id}, {"$set": obj}, upsert=False)
+
+    async def delete(self, obj_id: str) -> None:
+        await self.collection.delete_one({"_id": obj_id})
+
+    async def search(self, query: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return await self._read(lambda: self.collection.find(query).to_list(length=None))
+
+    async def close(self) -> None:
+        if self._owns_client:
+            self.client.close()
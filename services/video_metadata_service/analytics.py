@@ -0,0 +1,127 @@
+"""Elasticsearch aggregation builders for action analytics.
+
+Frame results are mapped as ``nested`` documents (see
+``libs/storage/elasticsearch_index.py``), so frame-level conditions are
+evaluated per frame and the aggregations count frames, not videos.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+from libs.models.analytics import (
+    ActionBucketDTO,
+    ActionHistogramDTO,
+    ActionTimelineDTO,
+    ConfidencePercentilesDTO,
+    DateBucketDTO,
+)
+from libs.storage.elasticsearch_index import RESULTS_PATH
+
+ACTION_FIELD = f"{RESULTS_PATH}.action"
+CONFIDENCE_FIELD = f"{RESULTS_PATH}.confidence"
+TIMESTAMP_FIELD = "timestamp"
+
+DEFAULT_PERCENTS = (50.0, 90.0, 95.0, 99.0)
+
+
+def frame_filter(
+    action: Optional[str] = None, min_confidence: Optional[float] = None
+) -> Dict[str, Any]:
+    """Filter on individual frame results, for use inside the nested context."""
+    filters: List[Dict[str, Any]] = []
+    if action is not None:
+        filters.append({"term": {ACTION_FIELD: action}})
+    if min_confidence is not None:
+        filters.append({"range": {CONFIDENCE_FIELD: {"gte": min_confidence}}})
+    return {"bool": {"filter": filters}}
+
+
+def filter_query(
+    action: Optional[str] = None,
+    min_confidence: Optional[float] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    """Select videos in the time range that contain at least one matching frame."""
+    filters: List[Dict[str, Any]] = []
+    if action is not None or min_confidence is not None:
+        filters.append(
+            {
+                "nested": {
+                    "path": RESULTS_PATH,
+                    "query": frame_filter(action, min_confidence),
+                }
+            }
+        )
+    if start is not None or end is not None:
+        bounds: Dict[str, str] = {}
+        if start is not None:
+            bounds["gte"] = start.isoformat()
+        if end is not None:
+            bounds["lt"] = end.isoformat()
+        filters.append({"range": {TIMESTAMP_FIELD: bounds}})
+    return {"bool": {"filter": filters}}
+
+
+def _frames(filter_: Dict[str, Any], aggs: Dict[str, Any]) -> Dict[str, Any]:
+    matching: Dict[str, Any] = {"filter": filter_}
+    if aggs:
+        matching["aggs"] = aggs
+    return {"frames": {"nested": {"path": RESULTS_PATH}, "aggs": {"matching": matching}}}
+
+
+def action_histogram_aggs(min_confidence: Optional[float], size: int) -> Dict[str, Any]:
+    return _frames(
+        frame_filter(None, min_confidence),
+        {"actions": {"terms": {"field": ACTION_FIELD, "size": size}}},
+    )
+
+
+def parse_action_histogram(aggs: Mapping[str, Any]) -> ActionHistogramDTO:
+    return ActionHistogramDTO(
+        buckets=[
+            ActionBucketDTO(action=b["key"], count=b["doc_count"])
+            for b in aggs["frames"]["matching"]["actions"]["buckets"]
+        ]
+    )
+
+
+def confidence_percentiles_aggs(
+    action: Optional[str], percents: Sequence[float]
+) -> Dict[str, Any]:
+    return _frames(
+        frame_filter(action, None),
+        {
+            "confidence": {
+                "percentiles": {"field": CONFIDENCE_FIELD, "percents": list(percents)}
+            }
+        },
+    )
+
+
+def parse_confidence_percentiles(aggs: Mapping[str, Any]) -> ConfidencePercentilesDTO:
+    values = aggs["frames"]["matching"]["confidence"]["values"]
+    return ConfidencePercentilesDTO(
+        percentiles={k: v for k, v in values.items() if v is not None}
+    )
+
+
+def timeline_aggs(
+    interval: str, action: Optional[str], min_confidence: Optional[float]
+) -> Dict[str, Any]:
+    return {
+        "timeline": {
+            "date_histogram": {"field": TIMESTAMP_FIELD, "calendar_interval": interval},
+            "aggs": _frames(frame_filter(action, min_confidence), {}),
+        }
+    }
+
+
+def parse_timeline(aggs: Mapping[str, Any], interval: str) -> ActionTimelineDTO:
+    return ActionTimelineDTO(
+        interval=interval,
+        buckets=[
+            DateBucketDTO(date=b["key_as_string"], count=b["frames"]["matching"]["doc_count"])
+            for b in aggs["timeline"]["buckets"]
+        ],
+    )
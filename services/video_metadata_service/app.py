@@ -1,58 +1,126 @@
-import logging
+"""FastAPI application factory for the video metadata service.
 
-from fastapi import FastAPI
+Importing this module has no side effects: settings are read and clients are
+created by :func:`create_app` and its lifespan. Run the service with::
 
-from libs.config import settings
-from libs.logging import ElasticsearchLogHandler
-from libs.messaging.base import MessageBroker
-from libs.messaging.rabbitmq import RabbitMQBroker
-from libs.models.video_metadata import VideoMetadata, VideoMetadataDTO
-from libs.storage.base import Storage
-from libs.storage.elasticsearch import ElasticsearchStorage
-from libs.storage.mongo import MongoStorage
+    uvicorn --factory services.video_metadata_service.app:create_app
+
+``create_app(import_only=True)`` returns the app with its routes but without
+settings, middleware or lifespan, for OpenAPI generation and tests that
+install their own services.
+"""
+
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import ORJSONResponse
+
+from libs.config import Settings, get_settings
+from libs.metrics import MetricsMiddleware
+from libs.storage.base import StorageThrottledError, StorageUnavailableError
 
 from .controller import router
-from .service import VideoMetadataService, set_service
-
-logger = logging.getLogger("video_metadata_service")
-logger.setLevel(logging.INFO)
-
-console_handler = logging.StreamHandler()
-console_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
-logger.addHandler(console_handler)
-
-es_handler = ElasticsearchLogHandler(
-    settings.log_elasticsearch_url, settings.log_elasticsearch_index
-)
-es_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
-logger.addHandler(es_handler)
-
-app = FastAPI(title="Video Metadata Service")
-
-storage_backend: Storage[VideoMetadata] = ElasticsearchStorage(
-    host=settings.elasticsearch_url,
-    index=settings.elasticsearch_index,
-)
-mongo_backend = MongoStorage(
-    settings.mongodb_url, settings.mongodb_db, settings.mongodb_collection
-)
-service = VideoMetadataService(storage_backend, mongo_backend, logger)
-set_service(service)
-
-message_broker: MessageBroker[VideoMetadataDTO] = RabbitMQBroker(
-    VideoMetadataDTO,
-    url=settings.rabbitmq_url,
-    queue_name=settings.video_metadata_queue,
-)
-
-
-@app.on_event("startup")
-def startup_event() -> None:
-    logger.info(
-        "Starting message consumption from RabbitMQ queue %s",
-        settings.video_metadata_queue,
+from .health import healthy, run_checks
+from .service import set_async_service, set_service
+
+TITLE = "Video Metadata Service"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    # Client libraries are imported here, not at module level, so that
+    # import-only use does not pay for them.
+    from .bootstrap import (
+        build_async_service,
+        build_broker,
+        build_cache,
+        build_content_hash_cache,
+        build_query_cache,
+        build_registry,
+        build_service,
+        configure_logger,
+        start_consumers,
+    )
+
+    settings: Settings = app.state.settings
+    # One pooled client per backend URL, shared by the logger, the consumer and the API.
+    registry = build_registry(settings)
+    logger = configure_logger(settings, registry)
+
+    # Caches shared by the API and the in-process consumer, so consumer writes
+    # invalidate entries served by the API. A standalone worker cannot reach these
+    # caches; there VIDEO_CACHE_TTL_SECONDS / SEARCH_CACHE_TTL_SECONDS bound staleness.
+    video_cache = build_cache(settings)
+    query_cache = build_query_cache(settings)
+    content_hashes = build_content_hash_cache(settings)
+    service = build_service(
+        settings, logger, video_cache, query_cache, registry, content_hashes
     )
-    message_broker.start_consuming(service.create_from_message)
+    set_service(service)
+    api_service = build_async_service(
+        settings, logger, video_cache, query_cache, registry, content_hashes
+    )
+    set_async_service(api_service)
+    message_broker = build_broker(settings)
+
+    # Install index templates and open every connection concurrently instead of
+    # paying for each round trip in turn; failures are reported, not fatal, and
+    # the clients reconnect on first use.
+    checks: Dict[str, Callable[[], Any]] = {"setup": service.setup}
+    checks.update({f"sync_{name}": check for name, check in service.health_checks().items()})
+    checks.update(api_service.health_checks())
+    results = await run_checks(checks, settings.startup_warmup_timeout)
+    if healthy(results):
+        logger.info("Backends ready: %s", ", ".join(results))
+    else:
+        logger.error("Backend warm-up failed: %s", results)
+
+    if settings.api_consumer_enabled:
+        logger.info(
+            "Starting message consumption from RabbitMQ queue %s",
+            settings.video_metadata_queue,
+        )
+        start_consumers(message_broker, service, settings)
+    else:
+        logger.info("In-process consumer disabled; run the ingestion worker separately")
+
+    try:
+        yield
+    finally:
+        message_broker.stop(timeout=settings.worker_shutdown_timeout)
+        await api_service.close()
+        await registry.aclose()
+        # Ship pending log records while the shared Elasticsearch client is still open.
+        for handler in logger.handlers:
+            handler.flush()
+        registry.close()
+
+
+async def backend_unavailable(request: Request, exc: Exception) -> ORJSONResponse:
+    """Report outages and throttling as 503 so clients retry instead of treating them as 404."""
+    return ORJSONResponse(
+        {"detail": "Storage backend unavailable, retry later"},
+        status_code=503,
+        headers={"Retry-After": "1"},
+    )
+
+
+def create_app(settings: Optional[Settings] = None, import_only: bool = False) -> FastAPI:
+    """Build the API; backends are created when the lifespan starts, not here."""
+    if import_only:
+        app = FastAPI(title=TITLE, default_response_class=ORJSONResponse)
+        app.include_router(router)
+        return app
 
+    from .bootstrap import build_profiler
 
-app.include_router(router)
+    settings = settings or get_settings()
+    app = FastAPI(title=TITLE, default_response_class=ORJSONResponse, lifespan=lifespan)
+    app.state.settings = settings
+    app.add_exception_handler(StorageUnavailableError, backend_unavailable)
+    app.add_exception_handler(StorageThrottledError, backend_unavailable)
+    if settings.metrics_enabled:
+        app.add_middleware(MetricsMiddleware, profiler=build_profiler(settings))
+    app.include_router(router)
+    return app
@@ -0,0 +1,221 @@
+"""Construction of the backends shared by the API and the ingestion worker."""
+
+import logging
+from typing import Any, Dict, Optional
+
+from libs.clients import ClientOptions, ClientRegistry
+from libs.config import Settings
+from libs.logging import ElasticsearchLogHandler
+from libs.messaging.base import MessageBroker
+from libs.messaging.instrumented import InstrumentedBroker
+from libs.messaging.rabbitmq import RabbitMQBroker
+from libs.metrics import SlowRequestProfiler
+from libs.models.video_metadata import VideoMetadata, VideoMetadataDTO
+from libs.storage.base import AsyncStorage, AsyncVideoStorage, Storage, VideoStorage
+from libs.storage.cache import (
+    AsyncCachingVideoStorage,
+    CachingVideoStorage,
+    LRUCache,
+    QueryCache,
+)
+from libs.storage.elasticsearch import ElasticsearchStorage
+from libs.storage.elasticsearch_async import AsyncElasticsearchStorage
+from libs.storage.instrumented import (
+    AsyncInstrumentedStorage,
+    AsyncInstrumentedVideoStorage,
+    InstrumentedStorage,
+    InstrumentedVideoStorage,
+)
+from libs.storage.mongo import MongoStorage
+from libs.storage.mongo_async import AsyncMongoStorage
+
+from .service import AsyncVideoMetadataService, VideoMetadataService
+
+
+def build_registry(settings: Settings) -> ClientRegistry:
+    """One registry per process, so every component shares a pool per backend URL."""
+    return ClientRegistry(
+        ClientOptions(
+            pool_size=settings.client_pool_size,
+            connect_timeout=settings.client_connect_timeout,
+            request_timeout=settings.client_request_timeout,
+            keepalive_seconds=settings.client_keepalive_seconds,
+            max_retries=settings.client_max_retries,
+            retry_backoff_base=settings.client_retry_backoff_base,
+            retry_backoff_cap=settings.client_retry_backoff_cap,
+        )
+    )
+
+
+def configure_logger(
+    settings: Settings, registry: Optional[ClientRegistry] = None
+) -> logging.Logger:
+    logger = logging.getLogger("video_metadata_service")
+    logger.setLevel(logging.INFO)
+    if logger.handlers:
+        return logger
+
+    formatter = logging.Formatter("%(asctime)s %(levelname)s %(message)s")
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(formatter)
+    logger.addHandler(console_handler)
+
+    es_handler = ElasticsearchLogHandler(
+        settings.log_elasticsearch_url,
+        settings.log_elasticsearch_index,
+        buffer_size=settings.log_buffer_size,
+        batch_size=settings.log_batch_size,
+        flush_interval=settings.log_flush_interval_seconds,
+        drop_policy=settings.log_drop_policy,
+        close_timeout=settings.log_close_timeout_seconds,
+        client=registry.elasticsearch(settings.log_elasticsearch_url) if registry else None,
+    )
+    es_handler.setFormatter(formatter)
+    logger.addHandler(es_handler)
+    return logger
+
+
+def build_cache(settings: Settings) -> Optional[LRUCache]:
+    if not settings.video_cache_enabled:
+        return None
+    return LRUCache(
+        max_entries=settings.video_cache_max_entries,
+        ttl=settings.video_cache_ttl_seconds,
+        negative_ttl=settings.video_cache_negative_ttl_seconds,
+    )
+
+
+def build_content_hash_cache(settings: Settings) -> Optional[LRUCache]:
+    """Last ingested content hash per video, used to skip unchanged messages."""
+    if not settings.ingest_dedup_enabled:
+        return None
+    return LRUCache(
+        max_entries=settings.ingest_dedup_max_entries,
+        ttl=settings.ingest_dedup_ttl_seconds,
+        negative_ttl=0,
+    )
+
+
+def build_query_cache(settings: Settings) -> Optional[QueryCache]:
+    if not settings.search_cache_enabled:
+        return None
+    return QueryCache(
+        max_bytes=settings.search_cache_max_bytes, ttl=settings.search_cache_ttl_seconds
+    )
+
+
+def build_service(
+    settings: Settings,
+    logger: logging.Logger,
+    cache: Optional[LRUCache] = None,
+    query_cache: Optional[QueryCache] = None,
+    registry: Optional[ClientRegistry] = None,
+    content_hashes: Optional[LRUCache] = None,
+) -> VideoMetadataService:
+    registry = registry or build_registry(settings)
+    storage_backend: VideoStorage[VideoMetadata] = ElasticsearchStorage(
+        host=settings.elasticsearch_url,
+        index=settings.elasticsearch_index,
+        retry_on_conflict=settings.elasticsearch_retry_on_conflict,
+        partitioned=settings.elasticsearch_partitioned,
+        split_frames=settings.elasticsearch_split_frames,
+        client=registry.elasticsearch(settings.elasticsearch_url),
+    )
+    mongo_backend: Storage[Dict[str, Any]] = MongoStorage(
+        settings.mongodb_url,
+        settings.mongodb_db,
+        settings.mongodb_collection,
+        client=registry.mongo(settings.mongodb_url),
+        retry=registry.mongo_retry(),
+    )
+    if settings.metrics_enabled:
+        storage_backend = InstrumentedVideoStorage(storage_backend, "elasticsearch")
+        mongo_backend = InstrumentedStorage(mongo_backend, "mongodb")
+    if cache is not None:
+        storage_backend = CachingVideoStorage(storage_backend, cache)
+    return VideoMetadataService(
+        storage_backend, mongo_backend, logger, query_cache, content_hashes
+    )
+
+
+def build_async_service(
+    settings: Settings,
+    logger: logging.Logger,
+    cache: Optional[LRUCache] = None,
+    query_cache: Optional[QueryCache] = None,
+    registry: Optional[ClientRegistry] = None,
+    content_hashes: Optional[LRUCache] = None,
+) -> AsyncVideoMetadataService:
+    """Build the API service; with a *registry*, its shared clients outlive the service."""
+    if registry is None:
+        es_client, mongo_client, retry = None, None, None
+    else:
+        es_client = registry.async_elasticsearch(settings.elasticsearch_url)
+        mongo_client = registry.async_mongo(settings.mongodb_url)
+        retry = registry.mongo_retry()
+    storage_backend: AsyncVideoStorage[VideoMetadata] = AsyncElasticsearchStorage(
+        host=settings.elasticsearch_url,
+        index=settings.elasticsearch_index,
+        retry_on_conflict=settings.elasticsearch_retry_on_conflict,
+        partitioned=settings.elasticsearch_partitioned,
+        split_frames=settings.elasticsearch_split_frames,
+        client=es_client,
+    )
+    mongo_backend: AsyncStorage[Dict[str, Any]] = AsyncMongoStorage(
+        settings.mongodb_url,
+        settings.mongodb_db,
+        settings.mongodb_collection,
+        client=mongo_client,
+        retry=retry,
+    )
+    if settings.metrics_enabled:
+        storage_backend = AsyncInstrumentedVideoStorage(storage_backend, "elasticsearch")
+        mongo_backend = AsyncInstrumentedStorage(mongo_backend, "mongodb")
+    if cache is not None:
+        storage_backend = AsyncCachingVideoStorage(storage_backend, cache)
+    return AsyncVideoMetadataService(
+        storage_backend, mongo_backend, logger, cache, query_cache, content_hashes
+    )
+
+
+def build_broker(
+    settings: Settings, prefetch_count: Optional[int] = None
+) -> MessageBroker[VideoMetadataDTO]:
+    broker: MessageBroker[VideoMetadataDTO] = RabbitMQBroker(
+        VideoMetadataDTO,
+        url=settings.rabbitmq_url,
+        queue_name=settings.video_metadata_queue,
+        batch_size=settings.consumer_batch_size,
+        batch_timeout_ms=settings.consumer_batch_timeout_ms,
+        prefetch_count=prefetch_count or settings.consumer_prefetch,
+        decode_workers=settings.consumer_decode_workers,
+        decode_max_in_flight=settings.consumer_decode_max_in_flight or None,
+    )
+    if settings.metrics_enabled:
+        broker = InstrumentedBroker(broker, settings.video_metadata_queue)
+    return broker
+
+
+def build_profiler(settings: Settings) -> Optional[SlowRequestProfiler]:
+    if settings.profile_sample_rate <= 0:
+        return None
+    return SlowRequestProfiler(
+        settings.profile_sample_rate, settings.profile_slow_ms, settings.profile_dir
+    )
+
+
+def start_consumers(
+    broker: MessageBroker[VideoMetadataDTO],
+    service: VideoMetadataService,
+    settings: Settings,
+    concurrency: int = 1,
+    batching: Optional[bool] = None,
+) -> None:
+    """Start *concurrency* consumer threads, each with its own channel."""
+    if batching is None:
+        batching = settings.consumer_batching
+    for _ in range(concurrency):
+        if batching:
+            broker.start_consuming_batches(service.create_many_from_messages)
+        else:
+            broker.start_consuming(service.create_from_message)
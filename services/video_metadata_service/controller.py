@@ -1,73 +1,415 @@
 import json
-from typing import Dict, List
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Literal, Optional, Union
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
 
+from libs.models.analytics import (
+    ActionHistogramDTO,
+    ActionTimelineDTO,
+    ConfidencePercentilesDTO,
+)
 from libs.models.video_metadata import (
+    AlgorithmResultDTO,
+    AlgorithmType,
+    BatchDeleteRequestDTO,
+    BatchDeleteResponseDTO,
+    BatchGetRequestDTO,
+    BatchGetResponseDTO,
     EnrichedVideoMetadataDTO,
+    FramePageDTO,
     VideoMetadataDTO,
+    VideoMetadataPageDTO,
     VideoMetadataUpdateDTO,
+    VideoSourceDTO,
 )
+from libs.config import Settings
+from libs.metrics import CONTENT_TYPE_LATEST, render
+from libs.storage.base import InvalidCursorError, StorageConflictError
+from libs.storage.filters import FILTER_FIELDS
 
-from .service import VideoMetadataService, get_service
+from .health import healthy, run_checks
+from .service import (
+    AsyncVideoMetadataService,
+    VideoMetadataService,
+    get_async_service,
+    get_service,
+)
 
 router = APIRouter()
 
 
+def _parse_query(query: str) -> dict:
+    try:
+        return json.loads(query)
+    except json.JSONDecodeError as exc:  # pragma: no cover - validation
+        raise HTTPException(status_code=400, detail="Invalid JSON query") from exc
+
+
+def _use_cache(cache_control: Optional[str]) -> bool:
+    """``Cache-Control: no-cache`` (or ``no-store``) bypasses the search cache."""
+    if not cache_control:
+        return True
+    directives = {d.strip().lower() for d in cache_control.split(",")}
+    return not directives & {"no-cache", "no-store"}
+
+
+def _clauses(value: Any) -> List[Any]:
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _matches_everything(query: Any) -> bool:
+    """Whether the query clause *query* matches every document, e.g. ``match_all``."""
+    if not query:
+        return True
+    if not isinstance(query, dict) or len(query) != 1:
+        return False
+    (kind, body), = query.items()
+    if kind == "match_all":
+        return True
+    if kind != "bool" or not isinstance(body, dict) or body.get("must_not"):
+        return False
+    required = _clauses(body.get("must")) + _clauses(body.get("filter"))
+    if not all(_matches_everything(clause) for clause in required):
+        return False
+    should = _clauses(body.get("should"))
+    if should and (not required or "minimum_should_match" in body):
+        return any(_matches_everything(clause) for clause in should)
+    return True
+
+
+def _setting(request: Request, name: str) -> Any:
+    """Setting *name* of the app, or its default for ``create_app(import_only=True)`` apps."""
+    settings = getattr(request.app.state, "settings", None)
+    if settings is None:
+        return Settings.__fields__[name].default
+    return getattr(settings, name)
+
+
+def _check_batch_size(request: Request, ids: List[str]) -> None:
+    limit = _setting(request, "batch_max_size")
+    if len(ids) > limit:
+        raise HTTPException(status_code=413, detail=f"At most {limit} ids per batch")
+
+
+def _cached_response(body: bytes, status: str) -> Response:
+    return Response(content=body, media_type="application/json", headers={"X-Cache": status})
+
+
+@router.get("/videos", response_model=VideoMetadataPageDTO)
+async def list_videos(
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    service: AsyncVideoMetadataService = Depends(get_async_service),
+) -> Union[VideoMetadataPageDTO, StreamingResponse]:
+    """List videos a page at a time, or stream all of them as NDJSON.
+
+    With ``format=ndjson`` every document is streamed, ``limit`` documents per
+    backend fetch, and ``cursor`` is ignored.
+    """
+    if format == "ndjson":
+        return StreamingResponse(
+            service.stream_ndjson(limit), media_type="application/x-ndjson"
+        )
+    try:
+        return await service.list_page(limit, cursor)
+    except InvalidCursorError as exc:
+        raise HTTPException(status_code=400, detail="Invalid or expired cursor") from exc
+
+
+# The static /videos/search* and /videos/filter routes must be registered before
+# /videos/{video_id}, otherwise "search" or "filter" is captured as a video id.
+@router.get("/videos/search", response_model=List[VideoSourceDTO])
+async def search_videos(
+    query: str,
+    cache_control: Optional[str] = Header(None),
+    service: AsyncVideoMetadataService = Depends(get_async_service),
+) -> Response:
+    # Stored documents are already validated; serialize them without
+    # round-tripping through DTOs or response_model validation.
+    body, status = await service.search_json(_parse_query(query), _use_cache(cache_control))
+    return _cached_response(body, status)
+
+
+@router.get("/videos/filter", response_model=List[VideoSourceDTO])
+async def filter_videos(
+    request: Request,
+    action: Optional[str] = None,
+    min_confidence: Optional[float] = Query(None, ge=0.0, le=1.0),
+    algorithm_type: Optional[AlgorithmType] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    fields: Optional[str] = Query(
+        None, description="Comma-separated top-level fields to return (default: all)"
+    ),
+    size: Optional[int] = Query(
+        None, ge=1, description="Most videos to return (default: 100, at most SEARCH_MAX_SIZE)"
+    ),
+    cache_control: Optional[str] = Header(None),
+    service: AsyncVideoMetadataService = Depends(get_async_service),
+) -> Response:
+    """Newest videos matching typed filters, without scoring.
+
+    ``action`` and ``min_confidence`` must hold for the same frame. Omitted
+    ``fields`` are absent from the returned documents; ``video_id`` is
+    always returned.
+    """
+    max_size = _setting(request, "search_max_size")
+    if size is None:
+        size = min(100, max_size)
+    elif size > max_size:
+        raise HTTPException(status_code=400, detail=f"size must be at most {max_size}")
+    projection = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    unknown = set(projection or ()) - set(FILTER_FIELDS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    filters = {
+        name: value
+        for name, value in (
+            ("action", action),
+            ("min_confidence", min_confidence),
+            ("algorithm_type", algorithm_type and algorithm_type.value),
+            ("start", start),
+            ("end", end),
+        )
+        if value is not None
+    }
+    body, status = await service.filter_json(filters, projection, size, _use_cache(cache_control))
+    return _cached_response(body, status)
+
+
+@router.get("/videos/search_with_mongo", response_model=List[EnrichedVideoMetadataDTO])
+async def search_videos_with_mongo(
+    query: str,
+    fields: Optional[str] = Query(
+        None, description="Comma-separated MongoDB fields to return (default: all)"
+    ),
+    cache_control: Optional[str] = Header(None),
+    service: AsyncVideoMetadataService = Depends(get_async_service),
+) -> Response:
+    projection = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    body, status = await service.search_with_mongo_json(
+        _parse_query(query), projection, _use_cache(cache_control)
+    )
+    return _cached_response(body, status)
+
+
+@router.post("/videos/batch_get", response_model=BatchGetResponseDTO)
+async def batch_get_videos(
+    batch: BatchGetRequestDTO,
+    request: Request,
+    service: AsyncVideoMetadataService = Depends(get_async_service),
+) -> ORJSONResponse:
+    """Fetch up to ``BATCH_MAX_SIZE`` videos in one backend round trip.
+
+    Results follow the order of ``ids``, with ``status`` ``not_found`` and a
+    null ``doc`` for unknown ids.
+    """
+    _check_batch_size(request, batch.ids)
+    found = await service.get_sources(list(dict.fromkeys(batch.ids)))
+    docs = [
+        {"video_id": video_id, "status": "found", "doc": found[video_id]}
+        if video_id in found
+        else {"video_id": video_id, "status": "not_found", "doc": None}
+        for video_id in batch.ids
+    ]
+    return ORJSONResponse({"docs": docs})
+
+
+@router.post("/videos/batch_delete", response_model=BatchDeleteResponseDTO)
+async def batch_delete_videos(
+    batch: BatchDeleteRequestDTO,
+    request: Request,
+    service: AsyncVideoMetadataService = Depends(get_async_service),
+) -> BatchDeleteResponseDTO:
+    """Delete the listed ``ids`` with one bulk request, or every video matching ``query``.
+
+    For ``ids`` the status of each id is reported in request order; a query
+    delete only reports the number of deleted videos. Queries matching every
+    video, such as ``match_all`` or an empty ``bool``, are rejected.
+    """
+    if batch.query is not None:
+        if _matches_everything(batch.query):
+            raise HTTPException(
+                status_code=400, detail="Query matches every video; refusing to delete them all"
+            )
+        return BatchDeleteResponseDTO(deleted=await service.delete_by_query(batch.query))
+    _check_batch_size(request, batch.ids)
+    ids = list(dict.fromkeys(batch.ids))
+    deleted = dict(zip(ids, await service.delete_many(ids)))
+    results = [
+        {"video_id": video_id, "status": "deleted" if deleted[video_id] else "not_found"}
+        for video_id in batch.ids
+    ]
+    return BatchDeleteResponseDTO(results=results, deleted=sum(deleted.values()))
+
+
 @router.get("/videos/{video_id}", response_model=VideoMetadataDTO)
-def read_video(
-    video_id: str, service: VideoMetadataService = Depends(get_service)
-) -> VideoMetadataDTO:
-    data = service.get(video_id)
+async def read_video(
+    video_id: str, service: AsyncVideoMetadataService = Depends(get_async_service)
+) -> ORJSONResponse:
+    data = await service.get_source(video_id)
     if not data:
         raise HTTPException(status_code=404, detail="Video metadata not found")
-    return data
-
-
-@router.get("/videos", response_model=List[VideoMetadataDTO])
-def list_videos(
-    service: VideoMetadataService = Depends(get_service),
-) -> List[VideoMetadataDTO]:
-    return service.list()
+    return ORJSONResponse(data)
 
 
 @router.put("/videos/{video_id}", response_model=VideoMetadataDTO)
-def update_video(
+async def update_video(
     video_id: str,
     updates: VideoMetadataUpdateDTO,
-    service: VideoMetadataService = Depends(get_service),
+    service: AsyncVideoMetadataService = Depends(get_async_service),
 ) -> VideoMetadataDTO:
-    updated = service.update(video_id, updates)
+    try:
+        updated = await service.update(video_id, updates)
+    except StorageConflictError as exc:
+        raise HTTPException(status_code=409, detail="Concurrent update, retry") from exc
     if not updated:
         raise HTTPException(status_code=404, detail="Video metadata not found")
     return updated
 
 
+@router.post("/videos/{video_id}/algorithms", response_model=VideoMetadataDTO)
+async def append_algorithms(
+    video_id: str,
+    algorithms: List[AlgorithmResultDTO],
+    service: AsyncVideoMetadataService = Depends(get_async_service),
+) -> VideoMetadataDTO:
+    """Append algorithm results without rewriting the ones already stored."""
+    try:
+        updated = await service.append_algorithms(video_id, algorithms)
+    except StorageConflictError as exc:
+        raise HTTPException(status_code=409, detail="Concurrent update, retry") from exc
+    if not updated:
+        raise HTTPException(status_code=404, detail="Video metadata not found")
+    return updated
+
+
+@router.get("/videos/{video_id}/frames", response_model=FramePageDTO)
+async def read_frames(
+    video_id: str,
+    start_frame: Optional[int] = Query(None, ge=0, description="First frame_num, inclusive"),
+    end_frame: Optional[int] = Query(None, ge=0, description="Last frame_num, exclusive"),
+    start_time: Optional[str] = Query(None, description="First frame timestamp (HH:MM:SS.s), inclusive"),
+    end_time: Optional[str] = Query(None, description="Last frame timestamp (HH:MM:SS.s), exclusive"),
+    action: Optional[str] = None,
+    min_confidence: Optional[float] = Query(None, ge=0.0, le=1.0),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    service: AsyncVideoMetadataService = Depends(get_async_service),
+) -> ORJSONResponse:
+    """Frame results of one video in ``frame_num`` order, a page at a time."""
+    filters = {
+        name: value
+        for name, value in (
+            ("start_frame", start_frame),
+            ("end_frame", end_frame),
+            ("start_time", start_time),
+            ("end_time", end_time),
+            ("action", action),
+            ("min_confidence", min_confidence),
+        )
+        if value is not None
+    }
+    try:
+        page = await service.frames_page(video_id, filters, limit, cursor)
+    except InvalidCursorError as exc:
+        raise HTTPException(status_code=400, detail="Invalid or expired cursor") from exc
+    if page is None:
+        raise HTTPException(status_code=404, detail="Video metadata not found")
+    return ORJSONResponse(page)
+
+
 @router.delete("/videos/{video_id}")
-def delete_video(
-    video_id: str, service: VideoMetadataService = Depends(get_service)
+async def delete_video(
+    video_id: str, service: AsyncVideoMetadataService = Depends(get_async_service)
 ) -> Dict[str, str]:
-    service.delete(video_id)
+    await service.delete(video_id)
     return {"status": "deleted"}
 
 
-@router.get("/videos/search", response_model=List[VideoMetadataDTO])
-def search_videos(
-    query: str, service: VideoMetadataService = Depends(get_service)
-) -> List[VideoMetadataDTO]:
-    try:
-        query_dict = json.loads(query)
-    except json.JSONDecodeError as exc:  # pragma: no cover - validation
-        raise HTTPException(status_code=400, detail="Invalid JSON query") from exc
-    return service.search(query_dict)
+@router.get("/cache/stats")
+async def cache_stats(
+    service: AsyncVideoMetadataService = Depends(get_async_service),
+) -> Dict[str, int]:
+    """Hit/miss/eviction counters of the single-video read cache."""
+    return service.cache_stats()
 
 
-@router.get("/videos/search_with_mongo", response_model=List[EnrichedVideoMetadataDTO])
-def search_videos_with_mongo(
-    query: str, service: VideoMetadataService = Depends(get_service)
-) -> List[EnrichedVideoMetadataDTO]:
-    try:
-        query_dict = json.loads(query)
-    except json.JSONDecodeError as exc:  # pragma: no cover - validation
-        raise HTTPException(status_code=400, detail="Invalid JSON query") from exc
-    return service.search_with_mongo(query_dict)
+@router.get("/cache/search/stats")
+async def query_cache_stats(
+    service: AsyncVideoMetadataService = Depends(get_async_service),
+) -> Dict[str, int]:
+    """Counters, memory use and generation of the search result cache."""
+    return service.query_cache_stats()
+
+
+@router.get("/health")
+async def health(
+    request: Request,
+    service: VideoMetadataService = Depends(get_service),
+    api_service: AsyncVideoMetadataService = Depends(get_async_service),
+) -> ORJSONResponse:
+    """Ping every backend; 503 if any of them is unreachable."""
+    checks: Dict[str, Callable[[], Any]] = {
+        f"sync_{name}": check for name, check in service.health_checks().items()
+    }
+    checks.update(api_service.health_checks())
+    results = await run_checks(checks, request.app.state.settings.health_check_timeout)
+    ok = healthy(results)
+    return ORJSONResponse(
+        {"status": "ok" if ok else "unavailable", "checks": results},
+        status_code=200 if ok else 503,
+    )
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics() -> Response:
+    """Prometheus metrics of this process."""
+    return Response(content=render(), media_type=CONTENT_TYPE_LATEST)
+
+
+@router.get("/analytics/actions", response_model=ActionHistogramDTO)
+async def action_histogram(
+    min_confidence: Optional[float] = Query(None, ge=0.0, le=1.0),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    size: int = Query(20, ge=1, le=500),
+    service: AsyncVideoMetadataService = Depends(get_async_service),
+) -> ActionHistogramDTO:
+    """Number of frames per action, computed server-side."""
+    return await service.action_histogram(min_confidence, start, end, size)
+
+
+@router.get("/analytics/confidence", response_model=ConfidencePercentilesDTO)
+async def confidence_percentiles(
+    action: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    percents: List[float] = Query([50.0, 90.0, 95.0, 99.0]),
+    service: AsyncVideoMetadataService = Depends(get_async_service),
+) -> ConfidencePercentilesDTO:
+    """Percentiles of frame-level confidence scores; ``percents`` must lie in 0-100."""
+    invalid = [p for p in percents if not 0.0 <= p <= 100.0]
+    if invalid:
+        raise HTTPException(
+            status_code=400, detail=f"percents must be between 0 and 100, got {invalid}"
+        )
+    return await service.confidence_percentiles(action, start, end, percents)
+
+
+@router.get("/analytics/timeline", response_model=ActionTimelineDTO)
+async def action_timeline(
+    interval: Literal["hour", "day", "week", "month"] = "day",
+    action: Optional[str] = None,
+    min_confidence: Optional[float] = Query(None, ge=0.0, le=1.0),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    service: AsyncVideoMetadataService = Depends(get_async_service),
+) -> ActionTimelineDTO:
+    """Number of matching frames per ``timestamp`` bucket."""
+    return await service.action_timeline(interval, action, min_confidence, start, end)
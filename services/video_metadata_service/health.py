@@ -0,0 +1,35 @@
+"""Backend connectivity checks shared by startup warm-up and ``GET /health``."""
+
+import asyncio
+from typing import Any, Callable, Dict, Mapping
+
+OK = "ok"
+
+
+async def _run(check: Callable[[], Any], timeout: float) -> str:
+    try:
+        if asyncio.iscoroutinefunction(check):
+            await asyncio.wait_for(check(), timeout)
+        else:
+            loop = asyncio.get_running_loop()
+            await asyncio.wait_for(loop.run_in_executor(None, check), timeout)
+    except asyncio.TimeoutError:
+        return f"timed out after {timeout:g}s"
+    except Exception as exc:
+        return f"{type(exc).__name__}: {exc}"
+    return OK
+
+
+async def run_checks(checks: Mapping[str, Callable[[], Any]], timeout: float) -> Dict[str, str]:
+    """Run sync and async *checks* concurrently; map each name to ``"ok"`` or the failure.
+
+    Blocking checks run in the default executor so they overlap with each
+    other and with the async ones.
+    """
+    names = list(checks)
+    results = await asyncio.gather(*(_run(checks[name], timeout) for name in names))
+    return dict(zip(names, results))
+
+
+def healthy(results: Mapping[str, str]) -> bool:
+    return all(result == OK for result in results.values())
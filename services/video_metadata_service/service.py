@@ -1,33 +1,162 @@
 import logging
-from typing import List, Optional
+from datetime import datetime
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+import orjson
 
+from libs.metrics.collectors import INGEST_MESSAGES
+from libs.models.analytics import (
+    ActionHistogramDTO,
+    ActionTimelineDTO,
+    ConfidencePercentilesDTO,
+)
 from libs.models.video_metadata import (
+    AlgorithmResultDTO,
     EnrichedVideoMetadataDTO,
     VideoMetadata,
     VideoMetadataDTO,
+    VideoMetadataPageDTO,
     VideoMetadataUpdateDTO,
 )
-from libs.storage.base import Storage
-from libs.storage.mongo import MongoStorage
+from libs.storage.base import AsyncStorage, AsyncVideoStorage, Storage, VideoStorage
+from libs.storage.cache import LRUCache, QueryCache, canonical_key, content_hash
+
+from . import analytics
+
+# Values of the X-Cache header on cached search responses.
+CACHE_HIT = "HIT"
+CACHE_MISS = "MISS"
+CACHE_BYPASS = "BYPASS"
+
+# Outcomes of ingest_messages_total.
+WRITTEN = "written"
+DEDUPLICATED = "deduplicated"
+
+
+def _bump(query_cache: Optional[QueryCache]) -> None:
+    if query_cache is not None:
+        query_cache.bump()
+
+
+def _forget(content_hashes: Optional[LRUCache], video_id: str) -> None:
+    """Drop the remembered hash of a video changed outside the ingestion path."""
+    if content_hashes is not None:
+        content_hashes.invalidate(video_id)
 
 
 class VideoMetadataService:
-    """Business logic for handling video metadata operations."""
+    """Business logic for handling video metadata operations.
+
+    With *content_hashes*, ingestion skips messages whose content equals what
+    is already stored. The cache maps video ids to the hash of their last
+    ingested content. It is only a hint: a cached hash that differs from the
+    message's proves the message changed, but a message is skipped only after
+    the hash stored in the document confirms it, since the video may have
+    been updated or deleted by another process since.
+    """
 
     def __init__(
         self,
-        storage: Storage[VideoMetadata],
-        mongo: MongoStorage,
+        storage: VideoStorage[VideoMetadata],
+        mongo: Storage[Dict[str, Any]],
         logger: logging.Logger,
+        query_cache: Optional[QueryCache] = None,
+        content_hashes: Optional[LRUCache] = None,
     ) -> None:
         self._storage = storage
         self._mongo = mongo
         self._logger = logger
+        self._query_cache = query_cache
+        self._content_hashes = content_hashes
+
+    def setup(self) -> None:
+        """Prepare storage (index templates, mappings) before serving traffic."""
+        self._storage.setup()
+
+    def health_checks(self) -> Dict[str, Callable[[], None]]:
+        """Connectivity checks of the backends, keyed by name."""
+        return {"storage": self._storage.ping, "mongo": self._mongo.ping}
+
+    def _changed(self, dtos: List[VideoMetadataDTO]) -> Tuple[List[bool], List[str]]:
+        """Whether each of *dtos* (distinct videos) differs from what is stored, and their hashes."""
+        if self._content_hashes is None:
+            return [True] * len(dtos), []
+        hashes = [content_hash(dto.dict()) for dto in dtos]
+        changed = [True] * len(dtos)
+        candidates: List[int] = []
+        for i, (dto, digest) in enumerate(zip(dtos, hashes)):
+            found, cached = self._content_hashes.lookup(dto.video_id)
+            if not found or cached == digest:
+                candidates.append(i)
+        if candidates:
+            stored = self._storage.content_hashes([dtos[i].video_id for i in candidates])
+            for i in candidates:
+                changed[i] = stored.get(dtos[i].video_id) != hashes[i]
+        return changed, hashes
+
+    def _remember(self, video_id: str, hashes: List[str], position: int) -> None:
+        if self._content_hashes is not None:
+            self._content_hashes.store(video_id, hashes[position])
 
     def create_from_message(self, dto: VideoMetadataDTO) -> None:
-        """Persist metadata received from the message broker."""
+        """Persist metadata received from the message broker unless it is unchanged."""
+        changed, hashes = self._changed([dto])
+        if not changed[0]:
+            self._logger.debug("Skipping unchanged video metadata for video_id=%s", dto.video_id)
+            self._remember(dto.video_id, hashes, 0)
+            INGEST_MESSAGES.labels(DEDUPLICATED).inc()
+            return
         self._logger.info("Creating video metadata for video_id=%s", dto.video_id)
-        self._storage.create(dto.to_domain())
+        try:
+            self._storage.create(dto.to_domain())
+        finally:
+            _bump(self._query_cache)
+        self._remember(dto.video_id, hashes, 0)
+        INGEST_MESSAGES.labels(WRITTEN).inc()
+
+    def create_many_from_messages(self, dtos: List[VideoMetadataDTO]) -> List[bool]:
+        """Persist the changed messages of a batch with a single storage call.
+
+        Only the last message per video is considered, as it would win the
+        bulk write anyway; earlier ones share its result. Unchanged messages
+        are reported as successful without being written.
+        """
+        last = {dto.video_id: dto for dto in dtos}
+        latest = list(last.values())
+        changed, hashes = self._changed(latest)
+        pending = [i for i, is_changed in enumerate(changed) if is_changed]
+        outcome = {dto.video_id: True for dto in latest}
+        for i, is_changed in enumerate(changed):
+            if not is_changed:
+                self._remember(latest[i].video_id, hashes, i)
+        if pending:
+            self._logger.info(
+                "Creating video metadata for %d videos (%d messages unchanged)",
+                len(pending),
+                len(dtos) - len(pending),
+            )
+            try:
+                written = self._storage.create_many([latest[i].to_domain() for i in pending])
+            finally:
+                _bump(self._query_cache)
+            for i, ok in zip(pending, written):
+                outcome[latest[i].video_id] = ok
+                if ok:
+                    self._remember(latest[i].video_id, hashes, i)
+            INGEST_MESSAGES.labels(WRITTEN).inc(sum(written))
+        if len(dtos) > len(pending):
+            INGEST_MESSAGES.labels(DEDUPLICATED).inc(len(dtos) - len(pending))
+        return [outcome[dto.video_id] for dto in dtos]
 
     def get(self, video_id: str) -> Optional[VideoMetadataDTO]:
         data = self._storage.get(video_id)
@@ -35,41 +164,331 @@ class VideoMetadataService:
             return None
         return VideoMetadataDTO.from_domain(data)
 
+    def get_source(self, video_id: str) -> Optional[Dict[str, Any]]:
+        """Stored document for *video_id*, skipping DTO/domain conversion."""
+        return self._storage.get_source(video_id)
+
     def list(self) -> List[VideoMetadataDTO]:
         return [VideoMetadataDTO.from_domain(v) for v in self._storage.list()]
 
+    def list_page(self, limit: int, cursor: Optional[str] = None) -> VideoMetadataPageDTO:
+        items, next_cursor = self._storage.list_page(limit, cursor)
+        return VideoMetadataPageDTO(
+            items=[VideoMetadataDTO.from_domain(v) for v in items], next_cursor=next_cursor
+        )
+
     def update(
         self, video_id: str, updates: VideoMetadataUpdateDTO
     ) -> Optional[VideoMetadataDTO]:
-        existing = self._storage.get(video_id)
-        if not existing:
+        try:
+            updated = self._storage.partial_update(video_id, updates.changes())
+        finally:
+            _forget(self._content_hashes, video_id)
+            _bump(self._query_cache)
+        if not updated:
+            return None
+        return VideoMetadataDTO.from_domain(updated)
+
+    def append_algorithms(
+        self, video_id: str, algorithms: List[AlgorithmResultDTO]
+    ) -> Optional[VideoMetadataDTO]:
+        """Add *algorithms* to the video without rewriting the existing results."""
+        try:
+            updated = self._storage.partial_update(
+                video_id, {}, append={"algorithms": [a.to_domain() for a in algorithms]}
+            )
+        finally:
+            _forget(self._content_hashes, video_id)
+            _bump(self._query_cache)
+        if not updated:
             return None
-        updated = updates.apply(existing)
-        self._storage.update(video_id, updated)
         return VideoMetadataDTO.from_domain(updated)
 
     def delete(self, video_id: str) -> None:
         self._logger.info("Deleting video metadata for video_id=%s", video_id)
-        self._storage.delete(video_id)
+        try:
+            self._storage.delete(video_id)
+        finally:
+            _forget(self._content_hashes, video_id)
+            _bump(self._query_cache)
 
     def search(self, query: dict) -> List[VideoMetadataDTO]:
         results = self._storage.search(query)
         return [VideoMetadataDTO.from_domain(v) for v in results]
 
-    def search_with_mongo(self, query: dict) -> List[EnrichedVideoMetadataDTO]:
+    def search_sources(self, query: dict) -> List[Dict[str, Any]]:
+        return self._storage.search_sources(query)
+
+    def search_with_mongo(
+        self, query: dict, fields: Optional[List[str]] = None
+    ) -> List[EnrichedVideoMetadataDTO]:
         results = self._storage.search(query)
-        enriched: List[EnrichedVideoMetadataDTO] = []
-        for meta in results:
-            mongo_doc = self._mongo.get(meta.video_id)
-            enriched.append(
-                EnrichedVideoMetadataDTO(
-                    metadata=VideoMetadataDTO.from_domain(meta), mongo=mongo_doc
-                )
+        mongo_docs = self._mongo.get_many([meta.video_id for meta in results], fields)
+        return [
+            EnrichedVideoMetadataDTO(
+                metadata=VideoMetadataDTO.from_domain(meta),
+                mongo=mongo_docs.get(meta.video_id),
             )
-        return enriched
+            for meta in results
+        ]
+
+
+class AsyncVideoMetadataService:
+    """Asynchronous counterpart of :class:`VideoMetadataService` used by the API."""
+
+    def __init__(
+        self,
+        storage: AsyncVideoStorage[VideoMetadata],
+        mongo: AsyncStorage[Dict[str, Any]],
+        logger: logging.Logger,
+        cache: Optional[LRUCache] = None,
+        query_cache: Optional[QueryCache] = None,
+        content_hashes: Optional[LRUCache] = None,
+    ) -> None:
+        self._storage = storage
+        self._mongo = mongo
+        self._logger = logger
+        self._cache = cache
+        self._query_cache = query_cache
+        # Shared with the consumer's service; writes here invalidate its entries.
+        self._content_hashes = content_hashes
+
+    def health_checks(self) -> Dict[str, Callable[[], Awaitable[None]]]:
+        """Connectivity checks of the backends, keyed by name."""
+        return {"storage": self._storage.ping, "mongo": self._mongo.ping}
+
+    async def create_from_message(self, dto: VideoMetadataDTO) -> None:
+        self._logger.info("Creating video metadata for video_id=%s", dto.video_id)
+        try:
+            await self._storage.create(dto.to_domain())
+        finally:
+            _forget(self._content_hashes, dto.video_id)
+            _bump(self._query_cache)
+
+    async def get(self, video_id: str) -> Optional[VideoMetadataDTO]:
+        data = await self._storage.get(video_id)
+        if not data:
+            return None
+        return VideoMetadataDTO.from_domain(data)
+
+    async def get_source(self, video_id: str) -> Optional[Dict[str, Any]]:
+        """Stored document for *video_id*, skipping DTO/domain conversion.
+
+        Documents are validated by ``VideoMetadataDTO`` before they are
+        written, so reads can hand them to the response as-is.
+        """
+        return await self._storage.get_source(video_id)
+
+    async def get_sources(self, video_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Stored documents of *video_ids* fetched in one round trip; missing ids are absent."""
+        return await self._storage.get_sources(video_ids)
+
+    async def frames_page(
+        self,
+        video_id: str,
+        filters: Dict[str, Any],
+        limit: int,
+        cursor: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """One page of the frame results of *video_id*; ``None`` if the video does not exist.
+
+        Rows come straight from storage, like :meth:`get_source`.
+        """
+        page = await self._storage.frames_page(video_id, filters, limit, cursor)
+        if page is None:
+            return None
+        items, next_cursor = page
+        return {"items": items, "next_cursor": next_cursor}
+
+    async def list(self) -> List[VideoMetadataDTO]:
+        return [VideoMetadataDTO.from_domain(v) for v in await self._storage.list()]
+
+    async def list_page(
+        self, limit: int, cursor: Optional[str] = None
+    ) -> VideoMetadataPageDTO:
+        items, next_cursor = await self._storage.list_page(limit, cursor)
+        return VideoMetadataPageDTO(
+            items=[VideoMetadataDTO.from_domain(v) for v in items], next_cursor=next_cursor
+        )
+
+    async def stream_ndjson(self, page_size: int) -> AsyncIterator[bytes]:
+        """Yield every video as one JSON line, *page_size* documents per backend fetch."""
+        async for meta in self._storage.iter_all(page_size):
+            yield VideoMetadataDTO.from_domain(meta).json().encode() + b"\n"
+
+    async def update(
+        self, video_id: str, updates: VideoMetadataUpdateDTO
+    ) -> Optional[VideoMetadataDTO]:
+        try:
+            updated = await self._storage.partial_update(video_id, updates.changes())
+        finally:
+            _forget(self._content_hashes, video_id)
+            _bump(self._query_cache)
+        if not updated:
+            return None
+        return VideoMetadataDTO.from_domain(updated)
+
+    async def append_algorithms(
+        self, video_id: str, algorithms: List[AlgorithmResultDTO]
+    ) -> Optional[VideoMetadataDTO]:
+        try:
+            updated = await self._storage.partial_update(
+                video_id, {}, append={"algorithms": [a.to_domain() for a in algorithms]}
+            )
+        finally:
+            _forget(self._content_hashes, video_id)
+            _bump(self._query_cache)
+        if not updated:
+            return None
+        return VideoMetadataDTO.from_domain(updated)
+
+    async def delete(self, video_id: str) -> None:
+        self._logger.info("Deleting video metadata for video_id=%s", video_id)
+        try:
+            await self._storage.delete(video_id)
+        finally:
+            _forget(self._content_hashes, video_id)
+            _bump(self._query_cache)
+
+    async def delete_many(self, video_ids: List[str]) -> List[bool]:
+        """Delete *video_ids* in one round trip; whether each existed, in input order."""
+        self._logger.info("Deleting video metadata for %d video ids", len(video_ids))
+        try:
+            return await self._storage.delete_many(video_ids)
+        finally:
+            for video_id in video_ids:
+                _forget(self._content_hashes, video_id)
+            _bump(self._query_cache)
+
+    async def delete_by_query(self, query: Dict[str, Any]) -> int:
+        """Delete every video matching *query* and return how many were deleted."""
+        self._logger.info("Deleting video metadata matching %s", query)
+        try:
+            return await self._storage.delete_by_query(query)
+        finally:
+            if self._content_hashes is not None:
+                self._content_hashes.clear()
+            _bump(self._query_cache)
+
+    async def search(self, query: dict) -> List[VideoMetadataDTO]:
+        results = await self._storage.search(query)
+        return [VideoMetadataDTO.from_domain(v) for v in results]
+
+    async def search_sources(self, query: dict) -> List[Dict[str, Any]]:
+        return await self._storage.search_sources(query)
+
+    async def search_with_mongo(
+        self, query: dict, fields: Optional[List[str]] = None
+    ) -> List[EnrichedVideoMetadataDTO]:
+        results = await self._storage.search(query)
+        mongo_docs = await self._mongo.get_many(
+            [meta.video_id for meta in results], fields
+        )
+        return [
+            EnrichedVideoMetadataDTO(
+                metadata=VideoMetadataDTO.from_domain(meta),
+                mongo=mongo_docs.get(meta.video_id),
+            )
+            for meta in results
+        ]
+
+    async def _cached_json(
+        self, key: bytes, compute: Callable[[], Awaitable[Any]], use_cache: bool
+    ) -> Tuple[bytes, str]:
+        """Serialized result of *compute* plus its cache status, via the query cache."""
+        if self._query_cache is None or not use_cache:
+            return orjson.dumps(await compute(), default=str), CACHE_BYPASS
+        body = self._query_cache.lookup(key)
+        if body is not None:
+            return body, CACHE_HIT
+        generation = self._query_cache.generation
+        body = orjson.dumps(await compute(), default=str)
+        self._query_cache.store(key, body, generation)
+        return body, CACHE_MISS
+
+    async def search_json(self, query: dict, use_cache: bool = True) -> Tuple[bytes, str]:
+        """JSON-encoded ``search_sources`` result and its X-Cache status."""
+        return await self._cached_json(
+            canonical_key("search", query), lambda: self.search_sources(query), use_cache
+        )
+
+    async def filter_json(
+        self,
+        filters: Dict[str, Any],
+        fields: Optional[List[str]] = None,
+        size: int = 100,
+        use_cache: bool = True,
+    ) -> Tuple[bytes, str]:
+        """JSON-encoded newest *size* videos matching typed *filters* and the X-Cache status."""
+        key = canonical_key("filter", filters, fields, size)
+        return await self._cached_json(
+            key, lambda: self._storage.filter_sources(filters, fields, size), use_cache
+        )
+
+    async def search_with_mongo_json(
+        self, query: dict, fields: Optional[List[str]] = None, use_cache: bool = True
+    ) -> Tuple[bytes, str]:
+        """JSON-encoded ``search_with_mongo`` result and its X-Cache status."""
+
+        async def compute() -> List[Dict[str, Any]]:
+            return [item.dict() for item in await self.search_with_mongo(query, fields)]
+
+        key = canonical_key("search_with_mongo", query, sorted(fields) if fields else None)
+        return await self._cached_json(key, compute, use_cache)
+
+    async def action_histogram(
+        self,
+        min_confidence: Optional[float] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        size: int = 20,
+    ) -> ActionHistogramDTO:
+        aggs = await self._storage.aggregate(
+            analytics.filter_query(None, min_confidence, start, end),
+            analytics.action_histogram_aggs(min_confidence, size),
+        )
+        return analytics.parse_action_histogram(aggs)
+
+    async def confidence_percentiles(
+        self,
+        action: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        percents: Sequence[float] = analytics.DEFAULT_PERCENTS,
+    ) -> ConfidencePercentilesDTO:
+        aggs = await self._storage.aggregate(
+            analytics.filter_query(action, None, start, end),
+            analytics.confidence_percentiles_aggs(action, percents),
+        )
+        return analytics.parse_confidence_percentiles(aggs)
+
+    async def action_timeline(
+        self,
+        interval: str,
+        action: Optional[str] = None,
+        min_confidence: Optional[float] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> ActionTimelineDTO:
+        aggs = await self._storage.aggregate(
+            analytics.filter_query(action, min_confidence, start, end),
+            analytics.timeline_aggs(interval, action, min_confidence),
+        )
+        return analytics.parse_timeline(aggs, interval)
+
+    def cache_stats(self) -> Dict[str, int]:
+        return self._cache.stats() if self._cache is not None else {}
+
+    def query_cache_stats(self) -> Dict[str, int]:
+        return self._query_cache.stats() if self._query_cache is not None else {}
+
+    async def close(self) -> None:
+        await self._storage.close()
+        await self._mongo.close()
 
 
 _service: Optional[VideoMetadataService] = None
+_async_service: Optional[AsyncVideoMetadataService] = None
 
 
 def set_service(service: VideoMetadataService) -> None:
@@ -81,3 +500,14 @@ def get_service() -> VideoMetadataService:
     if _service is None:  # pragma: no cover - defensive
         raise RuntimeError("Service not initialized")
     return _service
+
+
+def set_async_service(service: AsyncVideoMetadataService) -> None:
+    global _async_service
+    _async_service = service
+
+
+def get_async_service() -> AsyncVideoMetadataService:
+    if _async_service is None:  # pragma: no cover - defensive
+        raise RuntimeError("Service not initialized")
+    return _async_service
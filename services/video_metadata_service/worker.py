@@ -0,0 +1,106 @@
+"""Standalone ingestion worker.
+
+Run with ``python -m services.video_metadata_service.worker --concurrency N``
+to consume ``VIDEO_METADATA_QUEUE`` on N channels without serving HTTP. On
+SIGTERM/SIGINT the worker stops taking new deliveries, finishes the messages
+it is processing and requeues anything still prefetched before exiting. If
+a consumer dies (e.g. RabbitMQ is unreachable), the worker exits with status 1.
+"""
+
+import argparse
+import signal
+import sys
+import threading
+from types import FrameType
+from typing import Optional
+
+from prometheus_client import start_http_server
+
+from libs.config import get_settings
+
+from .bootstrap import (
+    build_broker,
+    build_content_hash_cache,
+    build_registry,
+    build_service,
+    configure_logger,
+    start_consumers,
+)
+
+
+def main() -> None:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Video metadata ingestion worker")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=settings.worker_concurrency,
+        help="Number of consumer channels/threads",
+    )
+    parser.add_argument(
+        "--prefetch",
+        type=int,
+        default=settings.consumer_prefetch,
+        help="Per-channel prefetch count",
+    )
+    parser.add_argument(
+        "--batching",
+        action=argparse.BooleanOptionalAction,
+        default=settings.consumer_batching,
+        help="Index messages with bulk requests (see CONSUMER_BATCH_SIZE)",
+    )
+    parser.add_argument(
+        "--shutdown-timeout",
+        type=float,
+        default=settings.worker_shutdown_timeout,
+        help="Seconds to wait for in-flight messages on shutdown",
+    )
+    args = parser.parse_args()
+
+    registry = build_registry(settings)
+    logger = configure_logger(settings, registry)
+    if settings.metrics_enabled and settings.worker_metrics_port:
+        start_http_server(settings.worker_metrics_port)
+        logger.info("Serving Prometheus metrics on port %d", settings.worker_metrics_port)
+    # API writes in the API process cannot invalidate this cache; it is only a
+    # hint, and skips are confirmed against the hash stored in Elasticsearch.
+    service = build_service(
+        settings,
+        logger,
+        registry=registry,
+        content_hashes=build_content_hash_cache(settings),
+    )
+    service.setup()
+    broker = build_broker(settings, prefetch_count=args.prefetch)
+
+    stop_requested = threading.Event()
+
+    def _request_stop(signum: int, _frame: Optional[FrameType]) -> None:
+        logger.info("Received signal %d, draining consumers", signum)
+        stop_requested.set()
+
+    signal.signal(signal.SIGTERM, _request_stop)
+    signal.signal(signal.SIGINT, _request_stop)
+
+    logger.info(
+        "Starting %d consumer(s) on RabbitMQ queue %s",
+        args.concurrency,
+        settings.video_metadata_queue,
+    )
+    start_consumers(
+        broker, service, settings, concurrency=args.concurrency, batching=args.batching
+    )
+
+    while not stop_requested.wait(1.0):
+        if not broker.alive():
+            # e.g. RabbitMQ unreachable or the connection dropped; let the
+            # orchestrator restart us rather than idle with no consumers.
+            logger.error("A consumer stopped unexpectedly, shutting down")
+            broker.stop(timeout=args.shutdown_timeout)
+            sys.exit(1)
+    broker.stop(timeout=args.shutdown_timeout)
+    logger.info("Ingestion worker stopped")
+
+
+if __name__ == "__main__":
+    main()
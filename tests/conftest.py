@@ -0,0 +1,42 @@
+import asyncio
+import logging
+from typing import Any, Callable, Dict, Iterator
+
+import pytest
+from fastapi.testclient import TestClient
+
+from libs.models.video_metadata import VideoMetadataDTO
+from libs.storage.cache import LRUCache, QueryCache
+from libs.storage.memory import AsyncInMemoryStorage, AsyncInMemoryVideoStorage
+from services.video_metadata_service.app import create_app
+from services.video_metadata_service.service import AsyncVideoMetadataService, get_async_service
+
+logger = logging.getLogger("tests")
+
+
+@pytest.fixture
+def service() -> AsyncVideoMetadataService:
+    return AsyncVideoMetadataService(
+        AsyncInMemoryVideoStorage(),
+        AsyncInMemoryStorage(key=lambda doc: doc["_id"]),
+        logger,
+        cache=LRUCache(max_entries=100, ttl=60, negative_ttl=5),
+        query_cache=QueryCache(max_bytes=1024 * 1024, ttl=60),
+    )
+
+
+@pytest.fixture
+def seed(service: AsyncVideoMetadataService) -> Callable[..., None]:
+    def _seed(*videos: Dict[str, Any]) -> None:
+        for video in videos:
+            asyncio.run(service.create_from_message(VideoMetadataDTO(**video)))
+
+    return _seed
+
+
+@pytest.fixture
+def client(service: AsyncVideoMetadataService) -> Iterator[TestClient]:
+    app = create_app(import_only=True)
+    app.dependency_overrides[get_async_service] = lambda: service
+    with TestClient(app) as test_client:
+        yield test_client
@@ -0,0 +1,44 @@
+from typing import Any, Dict, Sequence, Type
+
+from elastic_transport import ApiResponseMeta, HttpHeaders, NodeConfig
+from elasticsearch import ApiError
+
+
+def make_video(
+    video_id: str,
+    timestamp: str = "2024-05-01T12:00:00",
+    frames: Sequence[Dict[str, Any]] = (),
+) -> Dict[str, Any]:
+    """A message body with one action recognition algorithm holding *frames*."""
+    return {
+        "video_id": video_id,
+        "timestamp": timestamp,
+        "algorithms": [
+            {
+                "type": "actionRecognition",
+                "results": [
+                    {
+                        "frame_num": frame["frame_num"],
+                        "timestamp": f"00:00:{frame['frame_num']:02d}.0",
+                        "action": frame.get("action", "walking"),
+                        "confidence": frame.get("confidence", 0.5),
+                        "clip_length": 16,
+                    }
+                    for frame in frames
+                ],
+            }
+        ],
+        "extra": {},
+    }
+
+
+def api_error(error: Type[ApiError], status: int) -> ApiError:
+    """An Elasticsearch client error as raised for an HTTP *status* response."""
+    meta = ApiResponseMeta(
+        status=status,
+        http_version="1.1",
+        headers=HttpHeaders(),
+        duration=0.0,
+        node=NodeConfig("http", "localhost", 9200),
+    )
+    return error(str(status), meta, {"error": {"type": error.__name__}})
@@ -0,0 +1,9 @@
+import pytest
+
+
+@pytest.mark.parametrize("percents", [[-1], [50, 100.5], ["nan"]])
+def test_confidence_percentiles_rejects_out_of_range_percents(client, percents):
+    res = client.get("/analytics/confidence", params={"percents": percents})
+
+    assert res.status_code == 400
+    assert "between 0 and 100" in res.json()["detail"]
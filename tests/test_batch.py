@@ -0,0 +1,92 @@
+import pytest
+
+from .factories import make_video
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        {},
+        {"match_all": {}},
+        {"bool": {}},
+        {"bool": {"must": [{"match_all": {}}], "filter": []}},
+        {"bool": {"should": [{"match_all": {}}]}},
+    ],
+)
+def test_batch_delete_refuses_queries_matching_everything(client, seed, query):
+    seed(make_video("a"))
+
+    res = client.post("/videos/batch_delete", json={"query": query})
+
+    assert res.status_code == 400
+    assert client.get("/videos/a").status_code == 200
+
+
+def test_batch_delete_by_query(client, seed):
+    seed(make_video("a"), make_video("b"))
+
+    res = client.post("/videos/batch_delete", json={"query": {"term": {"video_id": "a"}}})
+
+    assert res.status_code == 200
+    assert res.json()["deleted"] == 1
+    assert client.get("/videos/a").status_code == 404
+    assert client.get("/videos/b").status_code == 200
+
+
+def test_batch_delete_allows_restricted_bool(client, seed):
+    seed(make_video("a"))
+
+    res = client.post(
+        "/videos/batch_delete",
+        json={"query": {"bool": {"must": [{"match_all": {}}], "must_not": [{"term": {"video_id": "b"}}]}}},
+    )
+
+    assert res.status_code == 200
+
+
+def test_batch_get_follows_request_order(client, seed):
+    seed(make_video("a"), make_video("b"))
+
+    res = client.post("/videos/batch_get", json={"ids": ["b", "missing", "a", "b"]})
+
+    assert res.status_code == 200
+    docs = res.json()["docs"]
+    assert [(doc["video_id"], doc["status"]) for doc in docs] == [
+        ("b", "found"),
+        ("missing", "not_found"),
+        ("a", "found"),
+        ("b", "found"),
+    ]
+    assert docs[0]["doc"]["video_id"] == "b"
+    assert docs[1]["doc"] is None
+
+
+def test_batch_get_limits_batch_size(client):
+    res = client.post("/videos/batch_get", json={"ids": [str(i) for i in range(501)]})
+
+    assert res.status_code == 413
+
+
+def test_batch_delete_by_ids(client, seed):
+    seed(make_video("a"), make_video("b"))
+
+    res = client.post("/videos/batch_delete", json={"ids": ["a", "missing"]})
+
+    assert res.status_code == 200
+    assert res.json() == {
+        "results": [
+            {"video_id": "a", "status": "deleted"},
+            {"video_id": "missing", "status": "not_found"},
+        ],
+        "deleted": 1,
+    }
+    assert client.get("/videos/a").status_code == 404
+    assert client.get("/videos/b").status_code == 200
+
+
+def test_batch_delete_requires_exactly_one_of_ids_and_query(client):
+    assert client.post("/videos/batch_delete", json={}).status_code == 422
+    res = client.post(
+        "/videos/batch_delete", json={"ids": ["a"], "query": {"term": {"video_id": "a"}}}
+    )
+    assert res.status_code == 422
@@ -0,0 +1,109 @@
+import pytest
+
+from libs.storage import cache as cache_module
+from libs.storage.cache import CachingStorage, LRUCache
+from libs.storage.memory import InMemoryStorage
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(cache_module.time, "monotonic", clock)
+    return clock
+
+
+def test_entries_expire_after_their_ttl(clock):
+    cache = LRUCache(max_entries=10, ttl=30, negative_ttl=5)
+    cache.store("a", {"v": 1})
+
+    clock.now += 29
+    assert cache.lookup("a") == (True, {"v": 1})
+    clock.now += 2
+    assert cache.lookup("a") == (False, None)
+    assert cache.stats()["size"] == 0
+
+
+def test_negative_entries_use_their_own_ttl(clock):
+    cache = LRUCache(max_entries=10, ttl=30, negative_ttl=5)
+    cache.store("missing", None)
+
+    assert cache.lookup("missing") == (True, None)
+    clock.now += 6
+    assert cache.lookup("missing") == (False, None)
+
+
+def test_disabled_negative_entries_are_not_stored():
+    cache = LRUCache(max_entries=10, ttl=30, negative_ttl=0)
+    cache.store("missing", None)
+
+    assert cache.lookup("missing") == (False, None)
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = LRUCache(max_entries=2, ttl=30, negative_ttl=5)
+    cache.store("a", 1)
+    cache.store("b", 2)
+    cache.lookup("a")
+
+    cache.store("c", 3)
+
+    assert cache.lookup("b") == (False, None)
+    assert cache.lookup("a") == (True, 1)
+    assert cache.lookup("c") == (True, 3)
+    assert cache.stats()["evictions"] == 1
+
+
+def test_a_fill_racing_an_invalidation_of_its_key_is_dropped():
+    cache = LRUCache(max_entries=10, ttl=30, negative_ttl=5)
+    token = cache.token()
+    cache.invalidate("a")  # a write lands while "a" is being fetched
+
+    cache.store("a", "old", token)
+    cache.store("b", "fresh", token)
+
+    assert cache.lookup("a") == (False, None)
+    assert cache.lookup("b") == (True, "fresh")
+    cache.store("a", "new", cache.token())
+    assert cache.lookup("a") == (True, "new")
+
+
+def test_fills_older_than_dropped_tombstones_or_a_clear_are_dropped():
+    cache = LRUCache(max_entries=2, ttl=30, negative_ttl=5)
+    token = cache.token()
+    for key in ("a", "b", "c"):
+        cache.invalidate(key)
+
+    cache.store("a", "old", token)
+    assert cache.lookup("a") == (False, None)
+
+    token = cache.token()
+    cache.clear()
+    cache.store("d", "old", token)
+    assert cache.lookup("d") == (False, None)
+
+
+def test_caching_storage_does_not_cache_a_read_overtaken_by_a_write():
+    cache = LRUCache(max_entries=10, ttl=30, negative_ttl=5)
+    inner = InMemoryStorage(key=lambda doc: doc["id"])
+    storage = CachingStorage(inner, cache, key=lambda doc: doc["id"])
+    storage.create({"id": "a", "v": 1})
+    original_get = inner.get
+
+    def get_then_write(obj_id):
+        value = original_get(obj_id)
+        storage.update(obj_id, {"id": obj_id, "v": 2})
+        return value
+
+    inner.get = get_then_write
+    assert storage.get("a") == {"id": "a", "v": 1}
+    inner.get = original_get
+
+    assert storage.get("a") == {"id": "a", "v": 2}
@@ -0,0 +1,137 @@
+import asyncio
+from typing import Any, Dict, List
+
+import pytest
+import urllib3
+
+from libs.clients import ClientOptions, ClientRegistry, RetryPolicy
+from libs.clients import registry as registry_module
+
+
+class Transient(Exception):
+    pass
+
+
+class Fatal(Transient):
+    pass
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    async def asleep(_delay: float) -> None:
+        pass
+
+    monkeypatch.setattr(registry_module.time, "sleep", lambda _delay: None)
+    monkeypatch.setattr(registry_module.asyncio, "sleep", asleep)
+
+
+def flaky(failures: int, error: Exception = Transient()):
+    calls: List[int] = []
+
+    def call() -> str:
+        calls.append(1)
+        if len(calls) <= failures:
+            raise error
+        return "ok"
+
+    return call, calls
+
+
+def test_retry_policy_retries_transient_errors():
+    call, calls = flaky(2)
+
+    assert RetryPolicy(max_retries=2, transient=(Transient,)).call(call) == "ok"
+    assert len(calls) == 3
+
+
+def test_retry_policy_gives_up_after_max_retries():
+    call, calls = flaky(3)
+
+    with pytest.raises(Transient):
+        RetryPolicy(max_retries=2, transient=(Transient,)).call(call)
+    assert len(calls) == 3
+
+
+def test_retry_policy_raises_giveup_errors_at_once():
+    call, calls = flaky(1, Fatal())
+
+    with pytest.raises(Fatal):
+        RetryPolicy(max_retries=5, transient=(Transient,), giveup=(Fatal,)).call(call)
+    assert len(calls) == 1
+
+
+def test_retry_policy_retries_coroutines():
+    call, calls = flaky(1)
+
+    async def acall() -> str:
+        return call()
+
+    assert asyncio.run(RetryPolicy(max_retries=1, transient=(Transient,)).acall(acall)) == "ok"
+    assert len(calls) == 2
+
+
+def test_backoff_delay_is_capped():
+    assert all(0 <= registry_module.backoff_delay(n, 0.2, 1.0) <= 1.0 for n in range(1, 20))
+
+
+def test_registry_shares_one_client_per_url():
+    registry = ClientRegistry()
+
+    es = registry.elasticsearch("http://es:9200")
+
+    assert registry.elasticsearch("http://es:9200") is es
+    assert registry.elasticsearch("http://other:9200") is not es
+    registry.close()
+    assert registry.elasticsearch("http://es:9200") is not es
+    registry.close()
+
+
+def test_registry_applies_pool_and_retry_options():
+    options = ClientOptions(
+        pool_size=7, request_timeout=3.0, max_retries=4, retry_backoff_base=0.5, retry_backoff_cap=2.0
+    )
+    es_options = ClientRegistry(options)._es_options()
+    mongo_options = ClientRegistry(ClientOptions(connect_timeout=1.5, keepalive_seconds=60))._mongo_options()
+
+    assert es_options["connections_per_node"] == 7
+    assert es_options["request_timeout"] == 3.0
+    assert es_options["max_retries"] == 4
+    assert (es_options["retry_backoff_base"], es_options["retry_backoff_cap"]) == (0.5, 2.0)
+    assert mongo_options["connectTimeoutMS"] == 1500
+    assert mongo_options["maxIdleTimeMS"] == 60000
+
+
+def test_elasticsearch_connects_within_connect_timeout():
+    registry = ClientRegistry(ClientOptions(connect_timeout=1.5, request_timeout=8.0, max_retries=0))
+    es = registry.elasticsearch("http://es:9200")
+    node = next(iter(es.transport.node_pool.all()))
+    timeouts: List[Any] = []
+
+    def urlopen(*_args: Any, timeout: Any = None, **_kwargs: Any) -> Any:
+        timeouts.append(timeout)
+        raise urllib3.exceptions.NewConnectionError(None, "unreachable")
+
+    node.pool.urlopen = urlopen
+    with pytest.raises(Exception):
+        es.info()
+    registry.close()
+
+    assert len(timeouts) == 1
+    assert (timeouts[0].connect_timeout, timeouts[0].read_timeout) == (1.5, 8.0)
+
+
+def test_aclose_only_closes_async_clients():
+    registry = ClientRegistry()
+    es = registry.elasticsearch("http://es:9200")
+    closed: Dict[str, bool] = {}
+
+    class AsyncClient:
+        async def close(self) -> None:
+            closed["es-async"] = True
+
+    registry._clients[("es-async", "http://es:9200")] = AsyncClient()
+    asyncio.run(registry.aclose())
+
+    assert closed == {"es-async": True}
+    assert registry.elasticsearch("http://es:9200") is es
+    registry.close()
@@ -0,0 +1,71 @@
+from libs.models.columnar import ActionRecognitionColumns
+from libs.models.video_metadata import ActionRecognitionResult, ActionRecognitionResultDTO
+
+
+def _dto(frame_num: int, action: str, confidence: float) -> ActionRecognitionResultDTO:
+    return ActionRecognitionResultDTO(
+        frame_num=frame_num,
+        timestamp=f"00:00:{frame_num:02d}.0",
+        action=action,
+        confidence=confidence,
+        clip_length=16,
+    )
+
+
+DTOS = [
+    _dto(0, "walk", 0.9),
+    _dto(1, "run", 0.4),
+    _dto(2, "walk", 0.6),
+    _dto(3, "sit", 0.95),
+]
+
+
+def test_dto_round_trip():
+    columns = ActionRecognitionColumns.from_dtos(DTOS)
+
+    assert len(columns) == 4
+    assert columns.actions == ("walk", "run", "sit")
+    assert columns.to_dtos() == DTOS
+
+
+def test_result_round_trip():
+    results = [dto.to_domain() for dto in DTOS]
+
+    assert ActionRecognitionColumns.from_results(results).to_results() == results
+
+
+def test_filter_combines_conditions_with_inclusive_bounds():
+    columns = ActionRecognitionColumns.from_dtos(DTOS)
+
+    selected = columns.filter(min_confidence=0.6, start_frame=1, end_frame=3)
+
+    assert [dto.frame_num for dto in selected.to_dtos()] == [2, 3]
+    assert columns.filter(max_confidence=0.6).to_dtos() == [DTOS[1], DTOS[2]]
+    assert columns.filter(actions=["walk"]).to_dtos() == [DTOS[0], DTOS[2]]
+    assert len(columns) == 4
+
+
+def test_filter_on_unknown_action_is_empty():
+    columns = ActionRecognitionColumns.from_dtos(DTOS)
+
+    assert columns.filter(actions=["jump"]).to_dtos() == []
+
+
+def test_action_counts_skip_filtered_out_actions():
+    columns = ActionRecognitionColumns.from_dtos(DTOS).filter(min_confidence=0.5)
+
+    assert columns.action_counts() == {"walk": 2, "sit": 1}
+
+
+def test_empty_inputs():
+    columns = ActionRecognitionColumns.from_dtos([])
+
+    assert len(columns) == 0
+    assert columns.actions == ()
+    assert columns.to_dtos() == []
+    assert columns.to_results() == []
+    assert columns.filter(min_confidence=0.5, actions=["walk"]).to_dtos() == []
+    assert columns.action_counts() == {}
+    assert ActionRecognitionColumns.from_results(
+        [ActionRecognitionResult(0, "00:00:00.0", "walk", 0.5, 16)]
+    ).filter(actions=[]).to_results() == []
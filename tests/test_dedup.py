@@ -0,0 +1,107 @@
+import logging
+from typing import List
+
+import pytest
+
+from libs.messaging.memory import InMemoryBroker
+from libs.models.video_metadata import VideoMetadata, VideoMetadataDTO, VideoMetadataUpdateDTO
+from libs.storage.cache import LRUCache, content_hash
+from libs.storage.memory import InMemoryStorage, InMemoryVideoStorage
+from services.video_metadata_service.service import VideoMetadataService
+
+from .factories import make_video
+
+
+class CountingStorage(InMemoryVideoStorage[VideoMetadata]):
+    """Records the video ids of every write; ``create_many`` goes through ``create``."""
+
+    def __init__(self) -> None:
+        super().__init__(hasher=lambda meta: content_hash(VideoMetadataDTO.from_domain(meta).dict()))
+        self.written: List[str] = []
+
+    def create(self, obj: VideoMetadata) -> None:
+        self.written.append(obj.video_id)
+        super().create(obj)
+
+
+@pytest.fixture
+def storage() -> CountingStorage:
+    return CountingStorage()
+
+
+@pytest.fixture
+def service(storage: CountingStorage) -> VideoMetadataService:
+    return VideoMetadataService(
+        storage,
+        InMemoryStorage(key=lambda doc: doc["_id"]),
+        logging.getLogger("tests"),
+        content_hashes=LRUCache(max_entries=100, ttl=60, negative_ttl=0),
+    )
+
+
+def message(video_id: str, action: str = "walking") -> VideoMetadataDTO:
+    return VideoMetadataDTO(**make_video(video_id, frames=[{"frame_num": 1, "action": action}]))
+
+
+def test_unchanged_messages_are_skipped(service, storage):
+    service.create_from_message(message("a"))
+    service.create_from_message(message("a"))
+    service.create_from_message(message("a", action="running"))
+
+    assert storage.written == ["a", "a"]
+    assert service.get("a").algorithms[0].results[0].action == "running"
+
+
+@pytest.mark.parametrize(
+    "change",
+    [
+        lambda service: service.update("a", VideoMetadataUpdateDTO(extra={"k": 1})),
+        lambda service: service.delete("a"),
+    ],
+    ids=["update", "delete"],
+)
+def test_api_writes_forget_the_ingested_hash(service, storage, change):
+    service.create_from_message(message("a"))
+    change(service)
+
+    service.create_from_message(message("a"))
+
+    assert storage.written == ["a", "a"]
+    assert service.get("a").extra == {}
+
+
+def test_skips_are_confirmed_against_storage(service, storage):
+    service.create_from_message(message("a"))
+    # Another process deleted the video; the cached hash is now stale.
+    storage.delete("a")
+
+    service.create_from_message(message("a"))
+
+    assert storage.written == ["a", "a"]
+    assert service.get("a") is not None
+
+
+def test_batches_write_only_changed_videos(service, storage):
+    service.create_from_message(message("a"))
+
+    results = service.create_many_from_messages(
+        [message("a"), message("b"), message("b", action="running")]
+    )
+
+    assert results == [True, True, True]
+    assert storage.written == ["a", "b"]
+    assert service.get("b").algorithms[0].results[0].action == "running"
+
+
+def test_consumer_skips_redelivered_messages(service, storage):
+    broker = InMemoryBroker(VideoMetadataDTO, batch_size=10, batch_timeout_ms=50, poll_interval=0.01)
+    for video_id in ("a", "b", "a"):
+        broker.publish(make_video(video_id))
+    broker.publish(b"not json")
+
+    broker.start_consuming(service.create_from_message)
+    broker.join()
+    broker.stop(timeout=1)
+
+    assert storage.written == ["a", "b"]
+    assert (broker.acked, broker.rejected) == (4, 0)
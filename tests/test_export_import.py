@@ -0,0 +1,257 @@
+import copy
+import gzip
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import orjson
+import pytest
+
+from libs.models.video_metadata import VideoMetadataDTO
+from libs.storage.elasticsearch_frames import FrameScheme
+from libs.storage.elasticsearch_index import FRAME_COUNTS_FIELD
+from libs.storage.elasticsearch_partitions import PartitionScheme
+from tools import export_videos, import_videos
+
+from .factories import make_video
+
+
+class FakeElasticsearch:
+    """Documents per index with the search, mget and bulk calls the tools make.
+
+    A point-in-time is a copy of the index taken when it is opened; hits are
+    sorted by id. Ids in *throttle* are rejected with 429 the first time
+    they are written.
+    """
+
+    def __init__(self, throttle: Iterable[str] = ()) -> None:
+        self.indices: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.pits: Dict[str, List[Dict[str, Any]]] = {}
+        self.bulks: List[List[Any]] = []
+        self.throttle: Set[str] = set(throttle)
+
+    def open_point_in_time(self, index: str, keep_alive: str) -> Dict[str, Any]:
+        pit_id = f"pit-{len(self.pits)}"
+        docs = self.indices.get(index, {})
+        self.pits[pit_id] = [copy.deepcopy(docs[doc_id]) for doc_id in sorted(docs)]
+        return {"id": pit_id}
+
+    def search(
+        self,
+        query: Dict[str, Any],
+        size: int,
+        pit: Dict[str, Any],
+        search_after: Optional[List[Any]] = None,
+        slice: Optional[Dict[str, int]] = None,
+        **_: Any,
+    ) -> Dict[str, Any]:
+        hits = []
+        for position, source in enumerate(self.pits[pit["id"]]):
+            since = query.get("range", {}).get("timestamp", {}).get("gte")
+            if since is not None and source["timestamp"] < since:
+                continue
+            if slice is not None and position % slice["max"] != slice["id"]:
+                continue
+            if search_after is not None and position <= search_after[0]:
+                continue
+            hits.append({"_source": copy.deepcopy(source), "sort": [position]})
+        return {"hits": {"hits": hits[:size]}}
+
+    def mget(
+        self,
+        index: str,
+        ids: List[str],
+        source_includes: Optional[List[str]] = None,
+        **_: Any,
+    ) -> Dict[str, Any]:
+        docs = []
+        for doc_id in ids:
+            source = self.indices.get(index, {}).get(doc_id)
+            doc: Dict[str, Any] = {"_index": index, "_id": doc_id, "found": source is not None}
+            if source is not None:
+                doc["_source"] = (
+                    {k: v for k, v in source.items() if k in source_includes}
+                    if source_includes
+                    else source
+                )
+            docs.append(doc)
+        return {"docs": docs}
+
+    def bulk(self, operations: List[Any]) -> Dict[str, Any]:
+        self.bulks.append(operations)
+        items = []
+        ops = iter(operations)
+        for action in ops:
+            (kind, meta), = action.items()
+            docs = self.indices.setdefault(meta["_index"], {})
+            if kind == "delete":
+                found = docs.pop(meta["_id"], None) is not None
+                items.append({kind: {"status": 200 if found else 404}})
+                continue
+            source = next(ops)
+            if isinstance(source, bytes):
+                source = orjson.loads(source)
+            if source.get("video_id", meta["_id"]) in self.throttle:
+                self.throttle.discard(source.get("video_id", meta["_id"]))
+                items.append({kind: {"status": 429, "error": {"type": "es_rejected"}}})
+                continue
+            docs[meta["_id"]] = source
+            items.append({kind: {"status": 201}})
+        return {"errors": False, "items": items}
+
+    def close(self) -> None:
+        pass
+
+
+def video(video_id: str, timestamp: str = "2024-05-01T12:00:00", frames: int = 0) -> Dict[str, Any]:
+    body = make_video(
+        video_id, timestamp=timestamp, frames=[{"frame_num": n} for n in range(frames)]
+    )
+    return orjson.loads(VideoMetadataDTO(**body).json())
+
+
+def holding(*videos: Dict[str, Any]) -> FakeElasticsearch:
+    client = FakeElasticsearch()
+    client.indices["videos"] = {v["video_id"]: v for v in videos}
+    return client
+
+
+def export(
+    client: FakeElasticsearch,
+    path,
+    query: Optional[Dict[str, Any]] = None,
+    split_frames: bool = False,
+    slices: int = 1,
+    batch_size: int = 2,
+) -> int:
+    pit_id = client.open_point_in_time(index="videos", keep_alive="1m")["id"]
+    return sum(
+        export_videos.export_slice(
+            "http://es",
+            "videos",
+            split_frames,
+            pit_id,
+            query or {"match_all": {}},
+            export_videos.slice_path(str(path), i, slices),
+            i,
+            slices,
+            batch_size,
+            "1m",
+            1,
+        )
+        for i in range(slices)
+    )
+
+
+def exported(*paths) -> List[Dict[str, Any]]:
+    lines: List[Dict[str, Any]] = []
+    for path in paths:
+        with gzip.open(path, "rb") as fh:
+            lines.extend(orjson.loads(line) for line in fh)
+    return lines
+
+
+def load(loader: import_videos.Loader, paths, chunk_size: int = 2) -> int:
+    loaded = 0
+    for chunk in import_videos.read_chunks([str(p) for p in paths], chunk_size, 1 << 20):
+        count, errors = loader.load(chunk)
+        assert errors == []
+        loaded += count
+    return loaded
+
+
+@pytest.fixture
+def source(monkeypatch) -> FakeElasticsearch:
+    client = holding(*(video(f"v{i}", frames=i) for i in range(5)))
+    monkeypatch.setattr(export_videos, "_client", lambda url: client)
+    return client
+
+
+def test_export_then_import_copies_every_document(source, tmp_path):
+    path = tmp_path / "videos.ndjson.gz"
+
+    assert export(source, path) == 5
+
+    dest = FakeElasticsearch()
+    assert load(import_videos.Loader(dest, "videos", None), [path]) == 5
+    assert dest.indices["videos"] == source.indices["videos"]
+    assert [len(ops) for ops in dest.bulks] == [4, 4, 2]
+
+
+def test_sliced_exports_split_the_documents_between_files(source, tmp_path):
+    path = tmp_path / "videos.ndjson.gz"
+
+    assert export(source, path, slices=2) == 5
+
+    first, second = tmp_path / "videos.000.ndjson.gz", tmp_path / "videos.001.ndjson.gz"
+    ids = [[doc["video_id"] for doc in exported(p)] for p in (first, second)]
+    assert ids == [["v0", "v2", "v4"], ["v1", "v3"]]
+
+
+def test_since_only_exports_newer_videos(tmp_path, monkeypatch):
+    client = holding(video("old", "2024-01-01T00:00:00"), video("new", "2024-03-01T00:00:00"))
+    monkeypatch.setattr(export_videos, "_client", lambda url: client)
+    path = tmp_path / "delta.ndjson.gz"
+
+    export(client, path, query={"range": {"timestamp": {"gte": "2024-02-01T00:00:00"}}})
+
+    assert [doc["video_id"] for doc in exported(path)] == ["new"]
+
+
+def test_split_frames_round_trip_stores_frames_apart_and_exports_whole_videos(
+    source, tmp_path, monkeypatch
+):
+    path = tmp_path / "videos.ndjson.gz"
+    export(source, path)
+    frames = FrameScheme("videos")
+
+    split = FakeElasticsearch()
+    assert load(import_videos.Loader(split, "videos", None, frames), [path]) == 5
+
+    header = split.indices["videos"]["v3"]
+    assert header[FRAME_COUNTS_FIELD] == [3]
+    assert header["algorithms"][0]["results"] == []
+    assert len(split.indices["videos-frames"]) == 0 + 1 + 2 + 3 + 4
+
+    monkeypatch.setattr(export_videos, "_client", lambda url: split)
+    again = tmp_path / "again.ndjson.gz"
+    export(split, again, split_frames=True)
+    assert exported(again) == exported(path)
+
+
+def test_reimporting_a_shorter_video_deletes_its_stale_frames(tmp_path):
+    frames = FrameScheme("videos")
+    dest = FakeElasticsearch()
+    loader = import_videos.Loader(dest, "videos", None, frames)
+    for name, frame_count in (("long", 3), ("short", 1)):
+        path = tmp_path / f"{name}.ndjson"
+        path.write_bytes(orjson.dumps(video("a", frames=frame_count)) + b"\n")
+        load(loader, [path])
+
+    assert sorted(dest.indices["videos-frames"]) == ["a:0:0"]
+    assert dest.indices["videos"]["a"][FRAME_COUNTS_FIELD] == [1]
+
+
+def test_partitioned_import_moves_videos_to_their_month(tmp_path):
+    dest = FakeElasticsearch()
+    dest.indices["videos-2023.12"] = {"a": video("a", "2023-12-31T00:00:00")}
+    dest.indices["videos-ids"] = {"a": {"partition": "videos-2023.12"}}
+    path = tmp_path / "videos.ndjson"
+    path.write_bytes(orjson.dumps(video("a", "2024-01-02T00:00:00")) + b"\n")
+
+    load(import_videos.Loader(dest, "videos", PartitionScheme("videos")), [path])
+
+    assert dest.indices["videos-2023.12"] == {}
+    assert dest.indices["videos-2024.01"]["a"]["timestamp"] == "2024-01-02T00:00:00"
+    assert dest.indices["videos-ids"]["a"] == {"partition": "videos-2024.01"}
+
+
+def test_throttled_documents_are_retried_alone(source, tmp_path, monkeypatch):
+    path = tmp_path / "videos.ndjson.gz"
+    export(source, path)
+    monkeypatch.setattr(import_videos.time, "sleep", lambda seconds: None)
+
+    dest = FakeElasticsearch(throttle=["v1"])
+    assert load(import_videos.Loader(dest, "videos", None), [path], chunk_size=5) == 5
+
+    assert [len(ops) for ops in dest.bulks] == [10, 2]
+    assert dest.bulks[1][0] == {"index": {"_index": "videos", "_id": "v1"}}
+    assert dest.indices["videos"] == source.indices["videos"]
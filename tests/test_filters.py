@@ -0,0 +1,103 @@
+from datetime import datetime
+from typing import List
+
+from pydantic import parse_obj_as
+
+from libs.models.video_metadata import EnrichedVideoMetadataDTO, VideoSourceDTO
+from libs.storage.elasticsearch_filters import filter_body
+
+from .factories import make_video
+
+
+def test_filter_body_compiles_filters_to_unscored_clauses():
+    body = filter_body(
+        {
+            "action": "running",
+            "min_confidence": 0.8,
+            "algorithm_type": "actionRecognition",
+            "start": datetime(2024, 5, 1),
+            "end": datetime(2024, 6, 1),
+        },
+        ["timestamp"],
+        10,
+    )
+
+    assert body["query"] == {
+        "bool": {
+            "filter": [
+                {
+                    "nested": {
+                        "path": "algorithms.results",
+                        "query": {
+                            "bool": {
+                                "filter": [
+                                    {"term": {"algorithms.results.action": "running"}},
+                                    {"range": {"algorithms.results.confidence": {"gte": 0.8}}},
+                                ]
+                            }
+                        },
+                    }
+                },
+                {"term": {"algorithms.type": "actionRecognition"}},
+                {"range": {"timestamp": {"gte": "2024-05-01T00:00:00", "lt": "2024-06-01T00:00:00"}}},
+            ]
+        }
+    }
+    assert body["size"] == 10
+    assert body["sort"] == [{"timestamp": "desc"}]
+    assert body["_source"] == {"includes": ["video_id", "timestamp"]}
+
+
+def test_filter_body_without_filters_matches_everything():
+    body = filter_body({}, None, 5)
+
+    assert body["query"] == {"bool": {"filter": []}}
+    assert "includes" not in body["_source"]
+
+
+def test_filter_matches_action_and_confidence_on_the_same_frame(client, seed):
+    seed(
+        make_video(
+            "same-frame",
+            timestamp="2024-05-02T00:00:00",
+            frames=[{"frame_num": 1, "action": "running", "confidence": 0.9}],
+        ),
+        make_video(
+            "split-frames",
+            timestamp="2024-05-03T00:00:00",
+            frames=[
+                {"frame_num": 1, "action": "running", "confidence": 0.2},
+                {"frame_num": 2, "action": "walking", "confidence": 0.9},
+            ],
+        ),
+    )
+
+    res = client.get(
+        "/videos/filter",
+        params={"action": "running", "min_confidence": 0.8, "fields": "timestamp"},
+    )
+
+    assert res.status_code == 200
+    assert res.json() == [{"video_id": "same-frame", "timestamp": "2024-05-02T00:00:00"}]
+
+
+def test_filter_rejects_oversized_requests_and_unknown_fields(client):
+    assert client.get("/videos/filter", params={"size": 1001}).status_code == 400
+    assert client.get("/videos/filter", params={"fields": "timestamp,secret"}).status_code == 400
+
+
+def test_search_and_filter_responses_match_their_declared_models(client, seed):
+    seed(make_video("a", frames=[{"frame_num": 1}]))
+    search = {"query": '{"match_all": {}}'}
+
+    filtered = client.get("/videos/filter", params={"fields": "timestamp"}).json()
+    searched = client.get("/videos/search", params=search).json()
+    enriched = client.get("/videos/search_with_mongo", params=search).json()
+
+    assert parse_obj_as(List[VideoSourceDTO], filtered)[0].algorithms is None
+    assert parse_obj_as(List[VideoSourceDTO], searched)[0].video_id == "a"
+    assert parse_obj_as(List[EnrichedVideoMetadataDTO], enriched)[0].metadata.video_id == "a"
+    paths = client.app.openapi()["paths"]
+    for path in ("/videos/search", "/videos/filter"):
+        schema = paths[path]["get"]["responses"]["200"]["content"]["application/json"]["schema"]
+        assert schema["items"]["$ref"].endswith("/VideoSourceDTO")
@@ -0,0 +1,19 @@
+from .factories import make_video
+
+
+def test_frames_page_through_results(client, seed):
+    seed(make_video("a", frames=[{"frame_num": n} for n in range(5)]))
+
+    res = client.get("/videos/a/frames", params={"limit": 3}).json()
+    assert [item["frame_num"] for item in res["items"]] == [0, 1, 2]
+    res = client.get("/videos/a/frames", params={"limit": 3, "cursor": res["next_cursor"]}).json()
+
+    assert [item["frame_num"] for item in res["items"]] == [3, 4]
+    assert res["next_cursor"] is None
+
+
+def test_frames_rejects_invalid_cursor_and_unknown_video(client, seed):
+    seed(make_video("a", frames=[{"frame_num": 1}]))
+
+    assert client.get("/videos/a/frames", params={"cursor": "abc"}).status_code == 400
+    assert client.get("/videos/missing/frames").status_code == 404
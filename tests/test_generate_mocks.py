@@ -0,0 +1,98 @@
+import argparse
+from types import SimpleNamespace
+from typing import Any, Callable, List, Tuple
+
+from pika.spec import Basic
+
+from tools.generate_mocks import Publisher
+
+
+class FakeIOLoop:
+    def __init__(self) -> None:
+        self.timers: List[Tuple[float, Callable[[], None]]] = []
+
+    def call_later(self, delay: float, callback: Callable[[], None]) -> object:
+        self.timers.append((delay, callback))
+        return object()
+
+
+class FakeConnection:
+    def __init__(self) -> None:
+        self.ioloop = FakeIOLoop()
+        self.is_closing = False
+        self.is_closed = False
+
+    def close(self) -> None:
+        self.is_closing = True
+
+
+class FakeChannel:
+    def __init__(self) -> None:
+        self.bodies: List[bytes] = []
+
+    def basic_publish(self, exchange: str, routing_key: str, body: bytes, properties: Any) -> None:
+        self.bodies.append(body)
+
+
+def publisher(count: int, max_in_flight: int, **overrides: Any) -> Publisher:
+    args = argparse.Namespace(
+        url="amqp://localhost",
+        queue="videos",
+        processes=1,
+        rate=0,
+        burst=0,
+        burst_interval=1.0,
+        algorithms=1,
+        frames=1,
+        duplicate_ratio=0.0,
+        invalid_ratio=0.0,
+        seed=1,
+        max_in_flight=max_in_flight,
+    )
+    vars(args).update(overrides)
+    pub = Publisher(args, 0, count)
+    pub.connection = FakeConnection()
+    pub.channel = FakeChannel()
+    return pub
+
+
+def confirm(pub: Publisher, tag: int, multiple: bool = False, ack: bool = True) -> None:
+    method = Basic.Ack(tag, multiple) if ack else Basic.Nack(tag, multiple)
+    pub.on_confirm(SimpleNamespace(method=method))
+
+
+def test_publishes_up_to_the_confirm_window():
+    pub = publisher(count=10, max_in_flight=4)
+
+    pub._on_confirm_selected(None)
+
+    assert pub.sent == 4
+    assert len(pub.channel.bodies) == 4
+
+
+def test_confirms_refill_the_window_and_count_outcomes():
+    pub = publisher(count=6, max_in_flight=4)
+    pub._on_confirm_selected(None)
+
+    confirm(pub, 3, multiple=True)
+    assert pub.sent == 6
+    confirm(pub, 4, ack=False)
+    assert not pub.connection.is_closing
+    confirm(pub, 6, multiple=True)
+
+    assert (pub.stats.published, pub.stats.failed) == (5, 1)
+    assert len(pub.stats.confirm_seconds) == 6
+    assert pub.done
+    assert pub.connection.is_closing
+    assert pub.stats.ended > 0
+
+
+def test_rate_limited_publishing_waits_on_the_ioloop():
+    pub = publisher(count=3, max_in_flight=10, rate=10)
+    pub._on_confirm_selected(None)
+
+    assert pub.sent == 1
+    delay, callback = pub.connection.ioloop.timers[-1]
+    assert 0 < delay <= 0.1
+    confirm(pub, 1)
+    assert pub.sent == 1
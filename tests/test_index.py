@@ -0,0 +1,248 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+import pytest
+from elasticsearch import BadRequestError
+
+from libs.storage.base import StorageThrottledError
+from libs.storage.elasticsearch_index import (
+    MAPPING_VERSION,
+    VIDEO_METADATA_MAPPINGS,
+    bulk_load,
+    ensure_index,
+)
+from libs.storage.elasticsearch_requests import bulk_results
+from tools import reindex as reindex_tool
+
+from .factories import api_error
+
+Call = Tuple[str, Dict[str, Any]]
+
+RESTORED = {"index.refresh_interval": "1s", "index.number_of_replicas": "1"}
+
+
+class FakeIndices:
+    def __init__(self, client: "FakeClient") -> None:
+        self.client = client
+
+    def __getattr__(self, name: str) -> Any:
+        def call(**kwargs: Any) -> Any:
+            self.client.calls.append((f"indices.{name}", kwargs))
+            handler = getattr(self.client, f"indices_{name}", None)
+            return handler(**kwargs) if handler else {}
+
+        return call
+
+
+class FakeClient:
+    """Records every call; existing indices and aliases are plain sets/dicts."""
+
+    def __init__(
+        self,
+        indices: Optional[Dict[str, List[str]]] = None,
+        aliases: Optional[Dict[str, List[str]]] = None,
+    ) -> None:
+        self.calls: List[Call] = []
+        # Document versions by id, per index.
+        self.docs = {name: {doc_id: 1 for doc_id in ids} for name, ids in (indices or {}).items()}
+        self.aliases = aliases or {}
+        self.indices = FakeIndices(self)
+
+    def names(self) -> List[str]:
+        return [name for name, _ in self.calls]
+
+    def indices_exists(self, index: str) -> bool:
+        return index in self.docs
+
+    def indices_exists_alias(self, name: str) -> bool:
+        return name in self.aliases
+
+    def indices_get_alias(self, name: str) -> Dict[str, Any]:
+        return {index: {} for index in self.aliases[name]}
+
+    def indices_create(self, index: str, **_kwargs: Any) -> None:
+        self.docs[index] = {}
+
+    def indices_get_settings(self, index: str, **_kwargs: Any) -> Dict[str, Any]:
+        return {index: {"settings": RESTORED}}
+
+    def reindex(
+        self, source: Dict[str, Any], dest: Dict[str, Any], **kwargs: Any
+    ) -> Dict[str, Any]:
+        self.calls.append(("reindex", {"source": source, "dest": dest, **kwargs}))
+        target = self.docs[dest["index"]]
+        total = conflicts = 0
+        for name in source["index"].split(","):
+            for doc_id, version in self.docs[name].items():
+                total += 1
+                if target.get(doc_id, 0) >= version:
+                    conflicts += 1
+                else:
+                    target[doc_id] = version
+        return {"total": total, "version_conflicts": conflicts, "failures": []}
+
+    def open_point_in_time(self, index: str, keep_alive: str) -> Dict[str, Any]:
+        self.calls.append(("open_point_in_time", {"index": index}))
+        return {"id": index}
+
+    def close_point_in_time(self, id: str) -> None:
+        self.calls.append(("close_point_in_time", {"id": id}))
+
+    def search(
+        self, pit: Dict[str, Any], size: int, search_after: Optional[List[Any]], **_kwargs: Any
+    ) -> Dict[str, Any]:
+        hits = [{"_id": i, "sort": [n]} for n, i in enumerate(sorted(self.docs[pit["id"]]))]
+        start = 0 if search_after is None else search_after[0] + 1
+        return {"hits": {"hits": hits[start : start + size]}}
+
+    def mget(self, docs: List[Dict[str, str]], **_kwargs: Any) -> Dict[str, Any]:
+        return {
+            "docs": [
+                {"_id": doc["_id"], "found": doc["_id"] in self.docs[doc["_index"]]} for doc in docs
+            ]
+        }
+
+    def bulk(self, operations: List[Dict[str, Any]]) -> Dict[str, Any]:
+        self.calls.append(("bulk", {"operations": operations}))
+        for op in operations:
+            meta = op["delete"]
+            self.docs[meta["_index"]].pop(meta["_id"], None)
+        return {"errors": False, "items": []}
+
+
+def test_ensure_index_creates_the_versioned_index_behind_the_alias():
+    client = FakeClient()
+
+    ensure_index(client, "videos")
+
+    template = client.calls[0][1]
+    assert client.calls[0][0] == "indices.put_index_template"
+    assert template["index_patterns"] == ["videos-v*"]
+    assert template["template"]["mappings"] == VIDEO_METADATA_MAPPINGS
+    assert client.calls[-1] == (
+        "indices.create",
+        {"index": f"videos-v{MAPPING_VERSION}", "aliases": {"videos": {"is_write_index": True}}},
+    )
+
+
+def test_ensure_index_adds_new_fields_to_an_existing_alias():
+    client = FakeClient({"videos-v2": []}, {"videos": ["videos-v2"]})
+
+    ensure_index(client, "videos")
+
+    assert "indices.create" not in client.names()
+    assert client.calls[-1] == (
+        "indices.put_mapping",
+        {"index": "videos", "properties": VIDEO_METADATA_MAPPINGS["properties"]},
+    )
+
+
+def test_ensure_index_logs_mappings_that_need_a_reindex(caplog):
+    client = FakeClient({"videos-v1": []}, {"videos": ["videos-v1"]})
+
+    def put_mapping(**_kwargs: Any) -> None:
+        raise api_error(BadRequestError, 400)
+
+    client.indices_put_mapping = put_mapping
+    ensure_index(client, "videos")
+
+    assert "run tools/reindex.py" in caplog.text
+
+
+def test_bulk_load_restores_refresh_and_replicas():
+    client = FakeClient({"videos-v3": []})
+
+    with bulk_load(client, "videos-v3"):
+        assert client.calls[-1][1]["settings"] == {
+            "index.refresh_interval": "-1",
+            "index.number_of_replicas": 0,
+        }
+
+    assert client.calls[-2] == (
+        "indices.put_settings",
+        {"index": "videos-v3", "settings": RESTORED},
+    )
+    assert client.calls[-1] == ("indices.refresh", {"index": "videos-v3"})
+
+
+def test_reindex_catches_up_writes_and_deletes_made_during_the_copy(monkeypatch):
+    client = FakeClient({"videos-v2": ["a", "b", "c"]}, {"videos": ["videos-v2"]})
+    first_copy = reindex_tool.copy
+    copies: List[str] = []
+
+    def copy_while_writing(client_: Any, source: str, dest: str) -> Dict[str, Any]:
+        res = first_copy(client_, source, dest)
+        copies.append(source)
+        if len(copies) == 1:
+            # Writes landing on the old index while the first copy runs.
+            client.docs["videos-v2"]["b"] = 2
+            client.docs["videos-v2"]["d"] = 1
+            del client.docs["videos-v2"]["c"]
+        return res
+
+    monkeypatch.setattr(reindex_tool, "copy", copy_while_writing)
+    new_index = reindex_tool.reindex(client, "videos", delete_old=False)
+
+    assert client.docs[new_index] == {"a": 1, "b": 2, "d": 1}
+    assert copies == ["videos-v2", "videos-v2"]
+    assert all(c["dest"]["version_type"] == "external" for n, c in client.calls if n == "reindex")
+    blocks = [
+        (i, c["settings"]["index.blocks.write"])
+        for i, (n, c) in enumerate(client.calls)
+        if "index.blocks.write" in c.get("settings", {})
+    ]
+    assert [blocked for _, blocked in blocks] == [True, None]
+    assert blocks[0][0] < client.names().index("indices.update_aliases") < blocks[1][0]
+
+
+def test_reindex_unblocks_the_old_index_when_the_catch_up_fails(monkeypatch):
+    client = FakeClient({"videos-v2": ["a"]}, {"videos": ["videos-v2"]})
+    copies: List[int] = []
+
+    def failing_copy(client_: Any, source: str, dest: str) -> Dict[str, Any]:
+        copies.append(1)
+        failures = ["boom"] if len(copies) == 2 else []
+        return {"total": 1, "version_conflicts": 0, "failures": failures}
+
+    monkeypatch.setattr(reindex_tool, "copy", failing_copy)
+    with pytest.raises(SystemExit):
+        reindex_tool.reindex(client, "videos", delete_old=False)
+
+    assert "indices.update_aliases" not in client.names()
+    blocks = [
+        c["settings"]["index.blocks.write"]
+        for n, c in client.calls
+        if "index.blocks.write" in c.get("settings", {})
+    ]
+    assert blocks == [True, None]
+
+
+@pytest.mark.parametrize(
+    "companion, layout",
+    [("videos-ids", "time-partitioned"), ("videos-frames", "split-frames")],
+)
+def test_reindex_refuses_multi_index_layouts(monkeypatch, companion, layout):
+    monkeypatch.delenv("ELASTICSEARCH_PARTITIONED", raising=False)
+    monkeypatch.delenv("ELASTICSEARCH_SPLIT_FRAMES", raising=False)
+    client = FakeClient({companion: []})
+
+    assert reindex_tool.unsupported_layout(client, "videos") == layout
+
+
+def test_reindex_accepts_the_single_index_layout(monkeypatch):
+    monkeypatch.delenv("ELASTICSEARCH_PARTITIONED", raising=False)
+    monkeypatch.delenv("ELASTICSEARCH_SPLIT_FRAMES", raising=False)
+
+    assert reindex_tool.unsupported_layout(FakeClient({"videos-v3": []}), "videos") is None
+
+
+def test_writes_blocked_by_the_catch_up_are_retried_later():
+    blocked = {
+        "status": 403,
+        "error": {"type": "cluster_block_exception", "reason": "index [videos-v2] blocked"},
+    }
+    res = {"errors": True, "items": [{"index": {"status": 201}}, {"index": blocked}]}
+
+    with pytest.raises(StorageThrottledError):
+        bulk_results(res, [0, 1])
+    rejected = {"status": 403, "error": {"type": "security_exception"}}
+    assert bulk_results({"errors": True, "items": [{"index": rejected}]}, [0]) == [False]
@@ -0,0 +1,111 @@
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from libs.logging.es import DROP_OLDEST, ElasticsearchLogHandler
+from libs.metrics.collectors import LOG_RECORDS_DROPPED
+
+
+class FakeClient:
+    """Records bulk requests; ``bulk`` blocks while *gate* is cleared."""
+
+    def __init__(self, timeout: Optional[float] = None, parent: Optional["FakeClient"] = None) -> None:
+        self.timeout = timeout
+        self.parent = parent or self
+        if parent is None:
+            self.requests: List[List[Dict[str, Any]]] = []
+            self.timeouts: List[Optional[float]] = []
+            self.entered = threading.Event()
+            self.gate = threading.Event()
+            self.gate.set()
+
+    def options(self, request_timeout: float, max_retries: int) -> "FakeClient":
+        return FakeClient(request_timeout, self.parent)
+
+    def bulk(self, operations: List[Dict[str, Any]]) -> None:
+        parent = self.parent
+        parent.timeouts.append(self.timeout)
+        parent.entered.set()
+        if not parent.gate.wait(self.timeout):
+            raise TimeoutError("bulk timed out")
+        parent.requests.append(operations)
+
+
+def record(message: str) -> logging.LogRecord:
+    return logging.LogRecord("tests", logging.INFO, __file__, 1, message, None, None)
+
+
+def messages(client: FakeClient) -> List[str]:
+    return [op["message"] for ops in client.requests for op in ops[1::2]]
+
+
+def stalled_handler(client: FakeClient, **kwargs: Any) -> ElasticsearchLogHandler:
+    """A handler whose flusher is stuck sending ``first``, with *buffer_size* queued slots."""
+    client.gate.clear()
+    handler = ElasticsearchLogHandler(
+        "http://es:9200", "logs", batch_size=1, flush_interval=0.01, client=client, **kwargs
+    )
+    handler.emit(record("first"))
+    assert client.entered.wait(1)
+    return handler
+
+
+def test_records_are_shipped_in_bulk_batches():
+    client = FakeClient()
+    handler = ElasticsearchLogHandler(
+        "http://es:9200", "logs", batch_size=2, flush_interval=0.01, client=client
+    )
+    for n in range(3):
+        handler.emit(record(f"m{n}"))
+    handler.close()
+
+    assert messages(client) == ["m0", "m1", "m2"]
+    assert all(ops[0] == {"index": {"_index": "logs"}} for ops in client.requests)
+    assert max(len(ops) for ops in client.requests) <= 4
+
+
+def test_dropped_records_are_counted_across_threads():
+    client = FakeClient()
+    handler = stalled_handler(client, buffer_size=2)
+    before = LOG_RECORDS_DROPPED.labels("logs")._value.get()
+
+    threads = [
+        threading.Thread(target=lambda: [handler.emit(record("x")) for _ in range(50)])
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    client.gate.set()
+    handler.close()
+
+    assert handler.dropped == 198
+    assert LOG_RECORDS_DROPPED.labels("logs")._value.get() - before == 198
+
+
+def test_drop_oldest_keeps_the_newest_records():
+    client = FakeClient()
+    handler = stalled_handler(client, buffer_size=2, drop_policy=DROP_OLDEST)
+    for n in range(5):
+        handler.emit(record(f"m{n}"))
+    client.gate.set()
+    handler.close()
+
+    assert messages(client) == ["first", "m3", "m4"]
+    assert handler.dropped == 3
+
+
+def test_close_gives_up_on_an_unreachable_cluster():
+    client = FakeClient()
+    handler = stalled_handler(client, buffer_size=10, close_timeout=0.2)
+    for n in range(5):
+        handler.emit(record(f"m{n}"))
+
+    started = time.monotonic()
+    handler.close()
+
+    assert time.monotonic() - started < 2
+    assert 0 < client.timeouts[-1] <= 0.2
+    client.gate.set()
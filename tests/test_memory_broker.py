@@ -0,0 +1,46 @@
+from typing import List
+
+from pydantic import BaseModel
+
+from libs.messaging.memory import InMemoryBroker
+
+
+class Message(BaseModel):
+    value: int
+
+
+def test_batches_ack_invalid_payloads_and_reject_refused_messages():
+    broker = InMemoryBroker(Message, batch_size=10, batch_timeout_ms=50, poll_interval=0.01)
+    seen: List[int] = []
+
+    def callback(messages: List[Message]) -> List[bool]:
+        seen.extend(message.value for message in messages)
+        return [message.value != 2 for message in messages]
+
+    for body in ({"value": 1}, b"not json", {"value": "x"}, {"value": 2}):
+        broker.publish(body)
+    broker.start_consuming_batches(callback)
+    broker.join()
+    broker.stop(timeout=1)
+
+    assert seen == [1, 2]
+    assert (broker.acked, broker.rejected, broker.requeued) == (3, 1, 0)
+
+
+def test_failed_callback_requeues_single_messages():
+    broker = InMemoryBroker(Message, poll_interval=0.01)
+    attempts: List[int] = []
+
+    def callback(message: Message) -> None:
+        attempts.append(message.value)
+        if len(attempts) == 1:
+            raise RuntimeError("transient")
+
+    broker.publish({"value": 7})
+    broker.start_consuming(callback)
+    broker.join()
+    broker.stop(timeout=1)
+
+    assert attempts == [7, 7]
+    assert (broker.acked, broker.requeued) == (1, 1)
+    assert broker.alive()
@@ -0,0 +1,96 @@
+import os
+from typing import Dict, Iterator, Optional
+
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from libs.metrics import MetricsMiddleware, SlowRequestProfiler
+from libs.metrics.middleware import UNMATCHED_ROUTE
+from services.video_metadata_service.app import create_app
+from services.video_metadata_service.service import AsyncVideoMetadataService, get_async_service
+
+from .factories import make_video
+
+
+def sample(name: str, **labels: str) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def requests_served(method: str, route: str, status: str) -> float:
+    return sample("http_request_seconds_count", method=method, route=route, status=status)
+
+
+def metered(
+    service: AsyncVideoMetadataService, profiler: Optional[SlowRequestProfiler] = None
+) -> Iterator[TestClient]:
+    app = create_app(import_only=True)
+    app.add_middleware(MetricsMiddleware, profiler=profiler)
+    app.dependency_overrides[get_async_service] = lambda: service
+    with TestClient(app, raise_server_exceptions=False) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def metered_client(service: AsyncVideoMetadataService) -> Iterator[TestClient]:
+    yield from metered(service)
+
+
+def test_requests_are_labelled_with_the_route_template(metered_client, seed):
+    seed(make_video("a"))
+    before: Dict[str, float] = {
+        "found": requests_served("GET", "/videos/{video_id}", "200"),
+        "missing": requests_served("GET", "/videos/{video_id}", "404"),
+        "unmatched": requests_served("GET", UNMATCHED_ROUTE, "404"),
+    }
+
+    assert metered_client.get("/videos/a").status_code == 200
+    assert metered_client.get("/videos/b").status_code == 404
+    assert metered_client.get("/no/such/route").status_code == 404
+
+    assert requests_served("GET", "/videos/{video_id}", "200") == before["found"] + 1
+    assert requests_served("GET", "/videos/{video_id}", "404") == before["missing"] + 1
+    assert requests_served("GET", UNMATCHED_ROUTE, "404") == before["unmatched"] + 1
+    # Concrete ids never become label values.
+    assert sample("http_request_seconds_count", method="GET", route="/videos/a", status="200") == 0
+    assert sample("http_requests_in_flight", method="GET", route="/videos/{video_id}") == 0
+
+
+def test_requests_that_raise_are_counted_as_500(metered_client, service, monkeypatch):
+    async def broken(video_id: str):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(service, "get_source", broken)
+    before = requests_served("GET", "/videos/{video_id}", "500")
+
+    assert metered_client.get("/videos/a").status_code == 500
+
+    assert requests_served("GET", "/videos/{video_id}", "500") == before + 1
+    assert sample("http_requests_in_flight", method="GET", route="/videos/{video_id}") == 0
+
+
+def test_metrics_endpoint_renders_the_collectors(metered_client):
+    metered_client.get("/videos/a")
+
+    res = metered_client.get("/metrics")
+
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/plain")
+    assert 'http_request_seconds_count{method="GET",route="/videos/{video_id}"' in res.text
+
+
+def test_slow_sampled_requests_are_profiled(service, tmp_path):
+    profiler = SlowRequestProfiler(sample_rate=1.0, slow_ms=0, output_dir=str(tmp_path))
+    for metered_client in metered(service, profiler):
+        metered_client.get("/videos/a")
+
+    (name,) = os.listdir(tmp_path)
+    assert name.endswith("-GET-videos_video_id.prof")
+
+
+def test_fast_requests_are_not_profiled(service, tmp_path):
+    profiler = SlowRequestProfiler(sample_rate=1.0, slow_ms=60_000, output_dir=str(tmp_path))
+    for metered_client in metered(service, profiler):
+        metered_client.get("/videos/a")
+
+    assert os.listdir(tmp_path) == []
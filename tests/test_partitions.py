@@ -0,0 +1,142 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import pytest
+from elasticsearch import NotFoundError
+
+from libs.models.video_metadata import VideoMetadataDTO
+from libs.storage.elasticsearch import ElasticsearchStorage
+from libs.storage.elasticsearch_partitions import PartitionScheme, timestamp_range
+
+from .factories import api_error, make_video
+
+
+class FakeElasticsearch:
+    """Documents per index, with just the calls partitioned writes and reads make."""
+
+    def __init__(self) -> None:
+        self.indices: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.mgets: List[Dict[str, Any]] = []
+
+    def bulk(self, operations: List[Any]) -> Dict[str, Any]:
+        items = []
+        ops = iter(operations)
+        for action in ops:
+            (kind, meta), = action.items()
+            docs = self.indices.setdefault(meta["_index"], {})
+            if kind == "index":
+                docs[meta["_id"]] = next(ops)
+                items.append({kind: {"status": 201}})
+            else:
+                found = docs.pop(meta["_id"], None) is not None
+                items.append({kind: {"status": 200 if found else 404}})
+        return {"errors": False, "items": items}
+
+    def mget(self, index: Optional[str] = None, ids=None, docs=None, **_: Any) -> Dict[str, Any]:
+        self.mgets.append({"index": index, "ids": ids, "docs": docs})
+        wanted = docs or [{"_index": index, "_id": doc_id} for doc_id in ids]
+        results = []
+        for doc in wanted:
+            source = self.indices.get(doc["_index"], {}).get(doc["_id"])
+            result = {"_index": doc["_index"], "_id": doc["_id"], "found": source is not None}
+            if source is not None:
+                result["_source"] = source
+            results.append(result)
+        return {"docs": results}
+
+    def get(self, index: str, id: str) -> Dict[str, Any]:
+        source = self.indices.get(index, {}).get(id)
+        if source is None:
+            raise api_error(NotFoundError, 404)
+        return {"_index": index, "_id": id, "_source": source}
+
+    def holding(self, video_id: str) -> List[str]:
+        return sorted(name for name, docs in self.indices.items() if video_id in docs)
+
+
+def video(video_id: str, timestamp: str):
+    return VideoMetadataDTO(**make_video(video_id, timestamp=timestamp)).to_domain()
+
+
+@pytest.fixture
+def client() -> FakeElasticsearch:
+    return FakeElasticsearch()
+
+
+def storage(client: FakeElasticsearch) -> ElasticsearchStorage:
+    return ElasticsearchStorage(index="videos", partitioned=True, client=client)
+
+
+def test_writes_are_routed_to_the_month_and_the_lookup_index(client):
+    store = storage(client)
+
+    assert store.create_many([video("a", "2024-01-31T23:00:00"), video("b", "2024-02-01T00:00:00")])
+
+    assert client.holding("a") == ["videos-2024.01", "videos-ids"]
+    assert client.holding("b") == ["videos-2024.02", "videos-ids"]
+    assert client.indices["videos-ids"]["a"] == {"partition": "videos-2024.01"}
+    assert store.get("b").video_id == "b"
+
+
+def test_moving_a_video_between_months_removes_the_old_copy(client):
+    store = storage(client)
+    store.create(video("a", "2024-01-15T00:00:00"))
+
+    store.create(video("a", "2024-03-15T00:00:00"))
+
+    assert client.holding("a") == ["videos-2024.03", "videos-ids"]
+
+
+def test_a_move_made_by_another_process_is_not_undone_by_a_stale_cache(client):
+    writer, stale = storage(client), storage(client)
+    writer.create(video("a", "2024-01-15T00:00:00"))
+    assert stale.get("a").timestamp == datetime(2024, 1, 15)  # caches January
+    writer.create(video("a", "2024-02-15T00:00:00"))
+
+    stale.create(video("a", "2024-03-15T00:00:00"))
+
+    assert client.holding("a") == ["videos-2024.03", "videos-ids"]
+    assert stale.partitions.cached("a") == "videos-2024.03"
+
+
+def test_deletes_read_the_partition_from_the_lookup_index(client):
+    writer, stale = storage(client), storage(client)
+    writer.create(video("a", "2024-01-15T00:00:00"))
+    stale.get("a")
+    writer.create(video("a", "2024-02-15T00:00:00"))
+
+    assert stale.delete_many(["a", "unknown"]) == [True, False]
+
+    assert client.holding("a") == []
+    assert stale.partitions.cached("a") is None
+
+
+@pytest.mark.parametrize(
+    "bounds, expected",
+    [
+        (
+            {"gte": "2024-01-10", "lt": "2024-03-01T00:00:00Z"},
+            "videos-2024.01,videos-2024.02,videos-2024.03",
+        ),
+        ({"gte": 1704067200000, "lte": 1706659200000}, "videos-2024.01"),
+        ({"gte": 1704067200000, "lte": "1706659200000"}, "videos"),
+        ({"gte": "now-1d", "lte": "now"}, "videos"),
+        ({"gte": "01/02/2024", "lte": "01/03/2024", "format": "dd/MM/yyyy"}, "videos"),
+        ({"gte": "2024", "lte": "2025"}, "videos"),
+        ({"gte": "2024-01-31T23:00", "lte": "2024-01-31T23:30", "time_zone": "-05:00"}, "videos"),
+        ({"gte": "2024-01"}, "videos"),
+    ],
+)
+def test_searches_target_only_the_months_a_range_covers(bounds, expected):
+    query = {"bool": {"filter": [{"range": {"timestamp": bounds}}]}}
+
+    assert PartitionScheme("videos").search_index(query) == expected
+
+
+def test_timestamp_range_reads_epoch_millis_and_iso_bounds():
+    bounds = {"gt": 1704067200000, "lt": "2024-02-01T01:00:00+02:00"}
+
+    assert timestamp_range({"query": {"range": {"timestamp": bounds}}}) == (
+        datetime(2024, 1, 1),
+        datetime(2024, 1, 31, 23),
+    )
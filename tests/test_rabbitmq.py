@@ -0,0 +1,183 @@
+import threading
+from concurrent.futures import Future
+from types import SimpleNamespace
+from typing import Any, List, Tuple
+
+import orjson
+
+from libs.messaging import rabbitmq
+from libs.messaging.rabbitmq import RabbitMQBroker
+from libs.storage.base import StorageThrottledError
+from libs.models.video_metadata import VideoMetadataDTO
+
+from .factories import make_video
+
+
+class FakeChannel:
+    """Hands out queued bodies as deliveries and records acks and nacks in order."""
+
+    def __init__(self, bodies: List[bytes], broker: RabbitMQBroker) -> None:
+        self.deliveries = [
+            (SimpleNamespace(delivery_tag=tag), None, body)
+            for tag, body in enumerate(bodies, start=1)
+        ]
+        self.broker = broker
+        # (ack or nack, delivery tag, multiple, requeue)
+        self.settled: List[Tuple[str, int, bool, bool]] = []
+
+    def consume(self, queue: str, inactivity_timeout: float):
+        while self.deliveries:
+            yield self.deliveries.pop(0)
+        while not self.broker._stopping.is_set():
+            yield None, None, None
+            self.broker._stopping.wait(0.01)
+        yield None, None, None
+
+    def get_waiting_message_count(self) -> int:
+        return len(self.deliveries)
+
+    def basic_ack(self, delivery_tag: int, multiple: bool = False) -> None:
+        self.settled.append(("ack", delivery_tag, multiple, False))
+
+    def basic_nack(self, delivery_tag: int, multiple: bool = False, requeue: bool = True) -> None:
+        self.settled.append(("nack", delivery_tag, multiple, requeue))
+
+    def cancel(self) -> int:
+        return 0
+
+
+class FakeConnection:
+    def sleep(self, seconds: float) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+def consume(
+    broker: RabbitMQBroker, bodies: List[bytes], callback: Any, batches: bool = False
+) -> FakeChannel:
+    channel = FakeChannel(bodies, broker)
+    broker._open_channel = lambda: (FakeConnection(), channel)
+    if batches:
+        broker.start_consuming_batches(callback)
+    else:
+        broker.start_consuming(callback)
+    return channel
+
+
+def wait_settled(channel: FakeChannel, count: int) -> None:
+    for _ in range(500):
+        if len(channel.settled) >= count:
+            return
+        threading.Event().wait(0.01)
+
+
+def body(video_id: str) -> bytes:
+    return orjson.dumps(make_video(video_id, frames=[{"frame_num": 1}, {"frame_num": 2}]))
+
+
+def test_decode_workers_hand_over_plain_dicts_rebuilt_into_models(monkeypatch):
+    monkeypatch.setattr(rabbitmq, "_worker_model", VideoMetadataDTO)
+    _, message = rabbitmq.decode(VideoMetadataDTO, body("a"))
+
+    decoded = rabbitmq._decode_in_worker(body("a"))
+
+    assert decoded == (True, message.dict())
+    assert type(decoded[1]["algorithms"][0]) is dict
+    rebuilt = rabbitmq.rebuild(VideoMetadataDTO, decoded[1])
+    assert rebuilt == message
+    assert rebuilt.to_domain() == message.to_domain()
+    assert rabbitmq._decode_in_worker(b'{"video_id": 1, "bogus": true}')[0] is False
+
+
+def test_pool_decoded_messages_are_handled_and_acked_in_delivery_order():
+    broker = RabbitMQBroker(VideoMetadataDTO, poll_interval=0.01, decode_workers=2)
+    seen: List[str] = []
+    bodies = [body(str(i)) for i in range(6)]
+    bodies.insert(3, b"not json")
+
+    channel = consume(broker, bodies, lambda dto: seen.append(dto.video_id))
+    try:
+        wait_settled(channel, len(bodies))
+    finally:
+        broker.stop(timeout=5)
+
+    assert seen == [str(i) for i in range(6)]
+    assert channel.settled == [("ack", tag, False, False) for tag in range(1, 8)]
+
+
+def test_out_of_order_decodes_keep_order_and_requeue_failures(monkeypatch):
+    broker = RabbitMQBroker(VideoMetadataDTO, poll_interval=0.01, decode_max_in_flight=10)
+    futures: List[Future] = []
+    bodies = [body(str(i)) for i in range(4)]
+
+    def submit(raw: bytes) -> Future:
+        futures.append(Future())
+        if len(futures) == len(bodies):
+            # The last delivery finishes decoding first.
+            for future, data in reversed(list(zip(futures, bodies))):
+                future.set_result(rabbitmq.decode(VideoMetadataDTO, data))
+        return futures[-1]
+
+    monkeypatch.setattr(broker, "_submit", submit)
+    seen: List[str] = []
+
+    def callback(dto: VideoMetadataDTO) -> None:
+        seen.append(dto.video_id)
+        if dto.video_id == "2":
+            raise RuntimeError("storage unavailable")
+
+    channel = consume(broker, bodies, callback)
+    wait_settled(channel, len(bodies))
+    broker.stop(timeout=5)
+
+    assert seen == ["0", "1", "2", "3"]
+    assert channel.settled == [
+        ("ack", 1, False, False),
+        ("ack", 2, False, False),
+        ("nack", 3, False, True),
+        ("ack", 4, False, False),
+    ]
+
+
+def test_batches_ack_valid_messages_at_once_and_reject_refused_ones():
+    broker = RabbitMQBroker(VideoMetadataDTO, batch_size=5, batch_timeout_ms=1000)
+    bodies = [body("0"), b"not json", body("2"), body("3"), body("4")]
+    batches: List[List[str]] = []
+
+    def callback(dtos: List[VideoMetadataDTO]) -> List[bool]:
+        batches.append([dto.video_id for dto in dtos])
+        return [dto.video_id != "2" for dto in dtos]
+
+    channel = consume(broker, bodies, callback, batches=True)
+    wait_settled(channel, 2)
+    broker.stop(timeout=5)
+
+    assert batches == [["0", "2", "3", "4"]]
+    assert channel.settled == [("nack", 3, False, False), ("ack", 5, True, False)]
+
+
+def test_failed_batches_are_requeued_and_the_batch_size_halved():
+    broker = RabbitMQBroker(VideoMetadataDTO, batch_size=4, batch_timeout_ms=1000)
+    bodies = [body(str(i)) for i in range(10)]
+    batches: List[List[str]] = []
+
+    def callback(dtos: List[VideoMetadataDTO]) -> List[bool]:
+        batches.append([dto.video_id for dto in dtos])
+        if len(batches) == 1:
+            raise StorageThrottledError("429")
+        return [True] * len(dtos)
+
+    channel = consume(broker, bodies, callback, batches=True)
+    wait_settled(channel, 4)
+    broker.stop(timeout=5)
+
+    # Halved to 2 after the failure, then grown back by a tenth (at least 1) per success.
+    assert [len(batch) for batch in batches] == [4, 2, 3, 1]
+    assert channel.settled == [
+        ("nack", 4, True, True),
+        ("ack", 6, True, False),
+        ("ack", 9, True, False),
+        ("ack", 10, True, False),
+    ]
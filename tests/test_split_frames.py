@@ -0,0 +1,169 @@
+import copy
+from typing import Any, Dict, List, Optional
+
+import pytest
+from elasticsearch import NotFoundError
+
+from libs.models.video_metadata import VideoMetadataDTO
+from libs.storage.base import StorageThrottledError
+from libs.storage.elasticsearch import ElasticsearchStorage
+from libs.storage.elasticsearch_frames import FrameScheme
+from libs.storage.elasticsearch_index import FRAME_COUNTS_FIELD
+
+from .factories import api_error, make_video
+
+
+class FakeElasticsearch:
+    """Documents per index; bulk items whose ``_id`` is in *failing* get that status."""
+
+    def __init__(self) -> None:
+        self.indices: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.bulks: List[List[Dict[str, Any]]] = []
+        self.failing: Dict[str, Dict[str, Any]] = {}
+
+    def bulk(self, operations: List[Dict[str, Any]]) -> Dict[str, Any]:
+        self.bulks.append(operations)
+        items = []
+        ops = iter(operations)
+        for action in ops:
+            (kind, meta), = action.items()
+            docs = self.indices.setdefault(meta["_index"], {})
+            source = next(ops) if kind == "index" else None
+            if meta["_id"] in self.failing:
+                items.append({kind: self.failing[meta["_id"]]})
+            elif kind == "index":
+                docs[meta["_id"]] = source
+                items.append({kind: {"status": 201}})
+            else:
+                found = docs.pop(meta["_id"], None) is not None
+                items.append({kind: {"status": 200 if found else 404}})
+        return {"errors": False, "items": items}
+
+    def mget(
+        self,
+        index: str,
+        ids: List[str],
+        source_includes: Optional[List[str]] = None,
+        source_excludes: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        docs = []
+        for doc_id in ids:
+            source = self.indices.get(index, {}).get(doc_id)
+            doc: Dict[str, Any] = {"_index": index, "_id": doc_id, "found": source is not None}
+            if source is not None:
+                doc["_source"] = {
+                    k: copy.deepcopy(v)
+                    for k, v in source.items()
+                    if (not source_includes or k in source_includes)
+                    and k not in (source_excludes or [])
+                }
+            docs.append(doc)
+        return {"docs": docs}
+
+    def get(self, index: str, id: str) -> Dict[str, Any]:
+        source = self.indices.get(index, {}).get(id)
+        if source is None:
+            raise api_error(NotFoundError, 404)
+        return {"_index": index, "_id": id, "_source": copy.deepcopy(source)}
+
+
+def video(video_id: str, frames: int):
+    body = make_video(video_id, frames=[{"frame_num": n} for n in range(frames)])
+    return VideoMetadataDTO(**body).to_domain()
+
+
+def targets(operations: List[Dict[str, Any]]) -> List[str]:
+    """``action index/id`` of each bulk item, skipping the document lines."""
+    actions = []
+    ops = iter(operations)
+    for action in ops:
+        (kind, meta), = action.items()
+        actions.append(f"{kind} {meta['_index']}/{meta['_id']}")
+        if kind == "index":
+            next(ops)
+    return actions
+
+
+@pytest.fixture
+def client() -> FakeElasticsearch:
+    return FakeElasticsearch()
+
+
+@pytest.fixture
+def store(client: FakeElasticsearch) -> ElasticsearchStorage:
+    return ElasticsearchStorage(index="videos", client=client, split_frames=True)
+
+
+def test_frames_are_written_before_their_header(client, store):
+    assert store.create_many([video("a", 2), video("b", 1)]) == [True, True]
+
+    (operations,) = client.bulks
+    assert targets(operations) == [
+        "index videos-frames/a:0:0",
+        "index videos-frames/a:0:1",
+        "index videos/a",
+        "index videos-frames/b:0:0",
+        "index videos/b",
+    ]
+    header = client.indices["videos"]["a"]
+    assert header[FRAME_COUNTS_FIELD] == [2]
+    assert header["algorithms"][0]["results"] == []
+    frame = client.indices["videos-frames"]["a:0:1"]
+    assert (frame["algorithm"], frame["position"]) == (0, 1)
+    assert frame["algorithms"]["results"][0]["frame_num"] == 1
+
+
+def test_rewriting_a_shorter_video_deletes_its_stale_frames(client, store):
+    store.create_many([video("a", 3)])
+
+    store.create_many([video("a", 1)])
+
+    assert targets(client.bulks[-1]) == [
+        "index videos-frames/a:0:0",
+        "delete videos-frames/a:0:1",
+        "delete videos-frames/a:0:2",
+        "index videos/a",
+    ]
+    assert sorted(client.indices["videos-frames"]) == ["a:0:0"]
+
+
+def test_a_failed_frame_fails_only_its_own_video(client, store):
+    client.failing["a:0:1"] = {"status": 400, "error": {"type": "mapper_parsing_exception"}}
+
+    assert store.create_many([video("a", 2), video("b", 2)]) == [False, True]
+
+
+def test_any_throttled_item_fails_the_whole_request(client, store):
+    client.failing["b:0:0"] = {"status": 429, "error": {"type": "es_rejected_execution_exception"}}
+
+    with pytest.raises(StorageThrottledError):
+        store.create_many([video("a", 1), video("b", 1)])
+
+
+def test_reads_reassemble_the_frames(client, store):
+    store.create_many([video("a", 3), video("b", 0)])
+
+    assert store.get("a") == video("a", 3)
+    assert store.get_many(["a", "b", "missing"]) == {"a": video("a", 3), "b": video("b", 0)}
+    assert store.get("missing") is None
+
+
+def test_deletes_remove_the_header_first_then_the_frames(client, store):
+    store.create_many([video("a", 2)])
+
+    assert store.delete_many(["a", "missing"]) == [True, False]
+
+    assert targets(client.bulks[-1]) == [
+        "delete videos/a",
+        "delete videos-frames/a:0:0",
+        "delete videos-frames/a:0:1",
+    ]
+    assert client.indices["videos-frames"] == {}
+
+
+def test_assemble_leaves_documents_written_before_the_split_alone():
+    legacy = {"video_id": "a", "algorithms": [{"type": "x", "results": [{"frame_num": 1}]}]}
+
+    FrameScheme("videos").assemble([legacy], {})
+
+    assert legacy["algorithms"][0]["results"] == [{"frame_num": 1}]
@@ -0,0 +1,111 @@
+import asyncio
+import copy
+from typing import Any, Dict, List, Optional
+
+import pytest
+from elasticsearch import ConflictError, NotFoundError
+
+from libs.models.video_metadata import AlgorithmResultDTO, VideoMetadataDTO
+from libs.storage.base import StorageConflictError
+from libs.storage.elasticsearch import ElasticsearchStorage
+from libs.storage.elasticsearch_async import AsyncElasticsearchStorage
+from libs.storage.elasticsearch_requests import CONTENT_HASH_FIELD, UPDATE_SCRIPT, document
+
+from .factories import api_error, make_video
+
+
+class FakeElasticsearch:
+    """One index whose ``update`` runs the painless script's logic in Python."""
+
+    def __init__(self, error: Optional[Exception] = None) -> None:
+        self.docs: Dict[str, Dict[str, Any]] = {}
+        self.updates: List[Dict[str, Any]] = []
+        self.error = error
+
+    def update(self, index: str, id: str, **params: Any) -> Dict[str, Any]:
+        self.updates.append({"index": index, "id": id, **params})
+        if self.error is not None:
+            raise self.error
+        if id not in self.docs:
+            raise api_error(NotFoundError, 404)
+        source = self.docs[id]
+        script = params["script"]["params"]
+        source.pop(script["hash_field"], None)
+        source.update(script["fields"])
+        for name, values in script["append"].items():
+            source.setdefault(name, []).extend(values)
+        return {"_id": id, "result": "updated", "get": {"_source": copy.deepcopy(source)}}
+
+
+class AsyncFakeElasticsearch(FakeElasticsearch):
+    async def update(self, index: str, id: str, **params: Any) -> Dict[str, Any]:
+        return super().update(index, id, **params)
+
+
+def stored(client: FakeElasticsearch, video_id: str) -> None:
+    metadata = VideoMetadataDTO(**make_video(video_id, frames=[{"frame_num": 1}])).to_domain()
+    client.docs[video_id] = document(metadata)
+
+
+def running_at(frame_num: int) -> AlgorithmResultDTO:
+    video = make_video("x", frames=[{"frame_num": frame_num, "action": "running"}])
+    return AlgorithmResultDTO(**video["algorithms"][0])
+
+
+def test_partial_update_is_one_scripted_update_call():
+    client = FakeElasticsearch()
+    stored(client, "a")
+    store = ElasticsearchStorage(index="videos", retry_on_conflict=5, client=client)
+
+    updated = store.partial_update(
+        "a", {"extra": {"camera": "north"}}, append={"algorithms": [running_at(2).to_domain()]}
+    )
+
+    (call,) = client.updates
+    assert call["index"] == "videos" and call["id"] == "a"
+    assert call["retry_on_conflict"] == 5
+    assert call["source"] is True
+    assert call["script"]["lang"] == "painless"
+    assert call["script"]["source"] == UPDATE_SCRIPT
+    params = call["script"]["params"]
+    assert params["hash_field"] == CONTENT_HASH_FIELD
+    assert params["fields"] == {"extra": {"camera": "north"}}
+    # Domain values are sent as JSON, the same shape the documents are indexed in.
+    assert params["append"] == {"algorithms": [running_at(2).dict()]}
+
+    assert updated.extra == {"camera": "north"}
+    assert [a.results[0].frame_num for a in updated.algorithms] == [1, 2]
+    assert CONTENT_HASH_FIELD not in client.docs["a"]
+
+
+def test_partial_update_of_unknown_video_returns_none():
+    store = ElasticsearchStorage(index="videos", client=FakeElasticsearch())
+
+    assert store.partial_update("missing", {"extra": {}}) is None
+
+
+def test_conflicts_left_after_the_retries_are_storage_conflicts():
+    client = FakeElasticsearch(error=api_error(ConflictError, 409))
+    stored(client, "a")
+    store = ElasticsearchStorage(index="videos", client=client)
+
+    with pytest.raises(StorageConflictError):
+        store.partial_update("a", {"extra": {}})
+    assert len(client.updates) == 1
+
+
+def test_async_partial_update_sends_the_same_request():
+    client = AsyncFakeElasticsearch()
+    stored(client, "a")
+    store = AsyncElasticsearchStorage(index="videos", retry_on_conflict=2, client=client)
+
+    updated = asyncio.run(store.partial_update("a", {}, append={"algorithms": []}))
+
+    (call,) = client.updates
+    assert call["retry_on_conflict"] == 2
+    assert call["script"]["params"] == {
+        "fields": {},
+        "append": {"algorithms": []},
+        "hash_field": CONTENT_HASH_FIELD,
+    }
+    assert updated.video_id == "a"
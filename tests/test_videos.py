@@ -0,0 +1,53 @@
+from .factories import make_video
+
+
+def test_create_get_update_delete(client, seed):
+    assert client.get("/videos/a").status_code == 404
+
+    seed(make_video("a", frames=[{"frame_num": 1}]))
+
+    res = client.get("/videos/a")
+    assert res.status_code == 200
+    assert res.json()["video_id"] == "a"
+    assert len(res.json()["algorithms"][0]["results"]) == 1
+
+    res = client.put("/videos/a", json={"extra": {"camera": "north"}})
+    assert res.status_code == 200
+    assert res.json()["extra"] == {"camera": "north"}
+    assert client.get("/videos/a").json()["extra"] == {"camera": "north"}
+
+    assert client.delete("/videos/a").json() == {"status": "deleted"}
+    assert client.get("/videos/a").status_code == 404
+
+
+def test_update_unknown_video_answers_404(client):
+    assert client.put("/videos/missing", json={"extra": {"k": 1}}).status_code == 404
+
+
+def test_update_rejects_unknown_fields(client, seed):
+    seed(make_video("a"))
+
+    assert client.put("/videos/a", json={"video_id": "b"}).status_code == 422
+
+
+
+def test_list_follows_cursor_to_the_last_page(client, seed):
+    seed(make_video("a"), make_video("b"), make_video("c"))
+
+    seen = []
+    res = client.get("/videos", params={"limit": 2}).json()
+    seen.extend(item["video_id"] for item in res["items"])
+    assert res["next_cursor"]
+    res = client.get("/videos", params={"limit": 2, "cursor": res["next_cursor"]}).json()
+    seen.extend(item["video_id"] for item in res["items"])
+
+    assert res["next_cursor"] is None
+    assert sorted(seen) == ["a", "b", "c"]
+
+
+def test_list_rejects_invalid_cursor(client, seed):
+    seed(make_video("a"))
+
+    res = client.get("/videos", params={"cursor": "abc"})
+
+    assert res.status_code == 400
@@ -0,0 +1,218 @@
+#!/usr/bin/env python
+"""Export the video metadata index to gzip-compressed NDJSON.
+
+Documents are read from a point-in-time with ``search_after``, so the export
+is a consistent snapshot however long it runs and memory stays flat. With
+``--slices N`` the PIT is split with sliced search and each slice is written
+to its own file by a separate process.
+
+``--checkpoint FILE`` makes the export incremental: only videos whose
+``timestamp`` is at or after the one recorded by the previous run are
+exported, and the newest exported ``timestamp`` is recorded on success.
+Videos at exactly the checkpoint are exported again, which is harmless as
+imports index by ``video_id``. Videos that arrive late with an older
+``timestamp`` are not picked up; run a full export for those.
+
+With ``--split-frames`` (defaults to ``ELASTICSEARCH_SPLIT_FRAMES``) each
+page of headers is reassembled from the frames index before it is written,
+so the file holds whole videos either way. Frames are read live with
+``_mget``, not from the point-in-time.
+
+    python tools/export_videos.py --output videos.ndjson.gz
+    python tools/export_videos.py --output videos.ndjson.gz --slices 4
+    python tools/export_videos.py --output delta.ndjson.gz --checkpoint export.checkpoint
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import multiprocessing
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import orjson
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(BASE_DIR))
+
+from elasticsearch import Elasticsearch
+
+from libs.storage.elasticsearch_frames import MGET_CHUNK, FrameScheme
+
+
+def _client(url: str) -> Elasticsearch:
+    return Elasticsearch(
+        url,
+        request_timeout=300,
+        max_retries=5,
+        retry_on_status=(429, 502, 503, 504),
+        retry_on_timeout=True,
+    )
+
+
+def slice_path(output: str, slice_id: int, slices: int) -> Path:
+    """``videos.ndjson.gz`` for a single slice, ``videos.002.ndjson.gz`` otherwise."""
+    path = Path(output)
+    if slices == 1:
+        return path
+    stem, dot, suffixes = path.name.partition(".")
+    return path.with_name(f"{stem}.{slice_id:03d}{dot}{suffixes}")
+
+
+def reassemble(client: Elasticsearch, frames: FrameScheme, sources: List[Dict[str, Any]]) -> None:
+    """Put the split frame results back into the headers in *sources*, in place."""
+    ids = frames.frame_ids(sources)
+    found: Dict[str, Dict[str, Any]] = {}
+    for start in range(0, len(ids), MGET_CHUNK):
+        res = client.mget(index=frames.index, ids=ids[start : start + MGET_CHUNK])
+        found.update(
+            {doc["_id"]: doc["_source"] for doc in res.get("docs", []) if doc.get("found")}
+        )
+    frames.assemble(sources, found)
+
+
+def export_slice(
+    url: str,
+    alias: str,
+    split_frames: bool,
+    pit_id: str,
+    query: Dict[str, Any],
+    path: Path,
+    slice_id: int,
+    slices: int,
+    batch_size: int,
+    keep_alive: str,
+    compress_level: int,
+) -> int:
+    """Write one slice of the PIT to *path*; returns the number of documents."""
+    client = _client(url)
+    frames = FrameScheme(alias) if split_frames else None
+    body: Dict[str, Any] = {
+        "query": query,
+        "size": batch_size,
+        "sort": ["_shard_doc"],
+        "track_total_hits": False,
+    }
+    if slices > 1:
+        body["slice"] = {"id": slice_id, "max": slices}
+    count = 0
+    search_after: Optional[List[Any]] = None
+    with gzip.open(path, "wb", compresslevel=compress_level) as fh:
+        while True:
+            res = client.search(
+                **body,
+                pit={"id": pit_id, "keep_alive": keep_alive},
+                search_after=search_after,
+                filter_path=["hits.hits._source", "hits.hits.sort"],
+            )
+            hits = res.get("hits", {}).get("hits", [])
+            if not hits:
+                break
+            sources = [hit["_source"] for hit in hits]
+            if frames is not None:
+                reassemble(client, frames, sources)
+            fh.write(b"".join(orjson.dumps(source) + b"\n" for source in sources))
+            count += len(hits)
+            if len(hits) < batch_size:
+                break
+            search_after = hits[-1]["sort"]
+    client.close()
+    return count
+
+
+def _export_slice(args: Tuple[Any, ...]) -> int:
+    return export_slice(*args)
+
+
+def read_checkpoint(path: Optional[str]) -> Optional[str]:
+    if path is None or not os.path.exists(path):
+        return None
+    with open(path) as fh:
+        return json.load(fh).get("timestamp")
+
+
+def write_checkpoint(path: str, timestamp: str) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as fh:
+        json.dump({"timestamp": timestamp}, fh)
+    os.replace(tmp, path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default=os.getenv("ELASTICSEARCH_URL", "http://localhost:9200"))
+    parser.add_argument("--alias", default=os.getenv("ELASTICSEARCH_INDEX", "videos"))
+    parser.add_argument(
+        "--split-frames",
+        action=argparse.BooleanOptionalAction,
+        default=os.getenv("ELASTICSEARCH_SPLIT_FRAMES", "false").lower() in ("1", "true", "yes"),
+        help="Reassemble videos whose frame results live in the frames index",
+    )
+    parser.add_argument("--output", default="videos.ndjson.gz", help="Output file; one per slice with --slices")
+    parser.add_argument("--slices", type=int, default=1, help="Export this many slices in parallel processes")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Documents per search request")
+    parser.add_argument("--since", help="Only export videos with timestamp >= this ISO timestamp")
+    parser.add_argument("--checkpoint", help="Read --since from and record the newest timestamp to this file")
+    parser.add_argument("--keep-alive", default="5m", help="Point-in-time keep-alive between requests")
+    parser.add_argument("--compress-level", type=int, default=6, choices=range(1, 10), metavar="1-9")
+    args = parser.parse_args()
+    if args.slices < 1:
+        parser.error("--slices must be at least 1")
+
+    since = args.since or read_checkpoint(args.checkpoint)
+    query: Dict[str, Any] = (
+        {"range": {"timestamp": {"gte": since}}} if since else {"match_all": {}}
+    )
+
+    client = _client(args.url)
+    pit_id = client.open_point_in_time(index=args.alias, keep_alive=args.keep_alive)["id"]
+    started = time.perf_counter()
+    try:
+        # Read from the same PIT, so it is exactly the newest exported timestamp.
+        newest = client.search(
+            query=query,
+            size=0,
+            pit={"id": pit_id, "keep_alive": args.keep_alive},
+            aggs={"newest": {"max": {"field": "timestamp"}}},
+        )["aggregations"]["newest"].get("value_as_string")
+        jobs = [
+            (
+                args.url,
+                args.alias,
+                args.split_frames,
+                pit_id,
+                query,
+                slice_path(args.output, i, args.slices),
+                i,
+                args.slices,
+                args.batch_size,
+                args.keep_alive,
+                args.compress_level,
+            )
+            for i in range(args.slices)
+        ]
+        if args.slices == 1:
+            counts = [_export_slice(jobs[0])]
+        else:
+            with multiprocessing.Pool(args.slices) as pool:
+                counts = pool.map(_export_slice, jobs)
+    finally:
+        client.close_point_in_time(id=pit_id)
+    elapsed = time.perf_counter() - started
+
+    for job, count in zip(jobs, counts):
+        print(f"{job[5]}: {count} documents")
+    total = sum(counts)
+    print(f"Exported {total} documents in {elapsed:.1f}s ({total / elapsed:.0f} docs/s)")
+    if args.checkpoint and newest:
+        write_checkpoint(args.checkpoint, newest)
+        print(f"Checkpoint {args.checkpoint} set to {newest}")
+
+
+if __name__ == "__main__":
+    main()
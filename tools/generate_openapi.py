@@ -7,12 +7,12 @@ from pathlib import Path
 BASE_DIR = Path(__file__).resolve().parent.parent
 sys.path.append(str(BASE_DIR))
 
-from services.video_metadata_service.app import app
+from services.video_metadata_service.app import create_app
 
 
 def main() -> None:
-    """Generate OpenAPI schema for the video metadata service."""
-    schema = app.openapi()
+    """Generate OpenAPI schema for the video metadata service (no backends needed)."""
+    schema = create_app(import_only=True).openapi()
     docs_dir = BASE_DIR / "docs"
     docs_dir.mkdir(exist_ok=True)
     out_file = docs_dir / "openapi.json"
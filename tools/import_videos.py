@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+"""Load NDJSON exports of the video metadata index back into Elasticsearch.
+
+Reads files written by ``tools/export_videos.py`` (gzip if the name ends in
+``.gz``) and indexes them by ``video_id`` with ``_bulk``. Lines are forwarded
+as-is; only ``video_id`` and ``timestamp`` are parsed. At most ``--workers``
+requests of ``--chunk-size`` documents are in flight, so memory stays bounded
+regardless of the file size. Items rejected with 429 are retried with
+backoff; other rejected documents are counted and the first few reported.
+
+The index (or, with ``--partitioned``, the partition template and lookup
+index) is created if needed, and refreshes and replicas are disabled for the
+duration of the load. With ``--split-frames`` each video is written as a
+header plus one document per frame result, like the service does, and stale
+frames of a previously longer video are deleted in the same request.
+
+    python tools/import_videos.py videos.ndjson.gz
+    python tools/import_videos.py videos.*.ndjson.gz --workers 8
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from datetime import datetime
+from pathlib import Path
+from typing import IO, Any, Dict, Iterator, List, Optional, Set, Tuple
+
+import orjson
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(BASE_DIR))
+
+from elasticsearch import Elasticsearch
+
+from libs.clients.registry import backoff_delay
+from libs.storage.elasticsearch_frames import FrameScheme, Span
+from libs.storage.elasticsearch_index import FRAME_COUNTS_FIELD, bulk_load, ensure_index
+from libs.storage.elasticsearch_partitions import PartitionScheme
+
+# (video_id, timestamp, raw JSON line)
+Document = Tuple[str, datetime, bytes]
+
+MAX_ATTEMPTS = 8
+REPORTED_ERRORS = 5
+
+
+def _open(path: str) -> IO[bytes]:
+    return gzip.open(path, "rb") if path.endswith(".gz") else open(path, "rb")
+
+
+def read_chunks(paths: List[str], chunk_size: int, chunk_bytes: int) -> Iterator[List[Document]]:
+    """Documents of *paths* in chunks of at most *chunk_size* docs / *chunk_bytes* bytes."""
+    chunk: List[Document] = []
+    size = 0
+    for path in paths:
+        with _open(path) as fh:
+            for line in fh:
+                line = line.rstrip(b"\n")
+                if not line:
+                    continue
+                doc = orjson.loads(line)
+                chunk.append((doc["video_id"], datetime.fromisoformat(doc["timestamp"]), line))
+                size += len(line)
+                if len(chunk) >= chunk_size or size >= chunk_bytes:
+                    yield chunk
+                    chunk, size = [], 0
+    if chunk:
+        yield chunk
+
+
+def _succeeded(action: str, result: Dict[str, Any]) -> bool:
+    # Deleting a stale frame that is already gone is fine.
+    status = result.get("status", 500)
+    return status < 300 or (action == "delete" and status == 404)
+
+
+class Loader:
+    def __init__(
+        self,
+        client: Elasticsearch,
+        alias: str,
+        partitions: Optional[PartitionScheme],
+        frames: Optional[FrameScheme] = None,
+    ) -> None:
+        self.client = client
+        self.alias = alias
+        self.partitions = partitions
+        self.frames = frames
+
+    def _operations(self, chunk: List[Document]) -> Tuple[List[Any], List[Span]]:
+        """Bulk operations for *chunk* and the span of bulk items of each document."""
+        ids = [doc[0] for doc in chunk]
+        if self.frames is not None:
+            res = self.client.mget(index=self.alias, ids=ids, source_includes=[FRAME_COUNTS_FIELD])
+            return self.frames.write_operations(
+                self.alias, (orjson.loads(line) for _, _, line in chunk), self.frames.parse_counts(res)
+            )
+        if self.partitions is None:
+            operations: List[Any] = []
+            for video_id, _, line in chunk:
+                operations.append({"index": {"_index": self.alias, "_id": video_id}})
+                operations.append(line)
+            return operations, [(i, i + 1) for i in range(len(chunk))]
+        res = self.client.mget(index=self.partitions.lookup_index, ids=ids)
+        operations, positions = self.partitions.write_operations(
+            chunk, self.partitions.parse_lookups(res)
+        )
+        # The lookup entry follows the document; deletes of moved copies are best-effort.
+        return operations, [(pos, pos + 2) for pos in positions]
+
+    def load(self, chunk: List[Document]) -> Tuple[int, List[str]]:
+        """Index *chunk*, retrying 429s; returns the loaded count and item errors."""
+        errors: List[str] = []
+        loaded = 0
+        for attempt in range(MAX_ATTEMPTS):
+            operations, spans = self._operations(chunk)
+            res = self.client.bulk(operations=operations)
+            items = [next(iter(item.items())) for item in res["items"]]
+            throttled: List[Document] = []
+            for doc, (start, end) in zip(chunk, spans):
+                results = [result for _, result in items[start:end]]
+                statuses = [result.get("status", 500) for result in results]
+                if all(_succeeded(action, result) for action, result in items[start:end]):
+                    loaded += 1
+                elif 429 in statuses:
+                    throttled.append(doc)
+                else:
+                    errors.append(f"{doc[0]}: {[r['error'] for r in results if 'error' in r]}")
+            if not throttled:
+                return loaded, errors
+            chunk = throttled
+            time.sleep(backoff_delay(attempt + 1, 0.5, 30.0))
+        errors.extend(f"{doc[0]}: still throttled after {MAX_ATTEMPTS} attempts" for doc in chunk)
+        return loaded, errors
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("paths", nargs="+", help="NDJSON files written by export_videos.py")
+    parser.add_argument("--url", default=os.getenv("ELASTICSEARCH_URL", "http://localhost:9200"))
+    parser.add_argument("--alias", default=os.getenv("ELASTICSEARCH_INDEX", "videos"))
+    parser.add_argument(
+        "--partitioned",
+        action=argparse.BooleanOptionalAction,
+        default=os.getenv("ELASTICSEARCH_PARTITIONED", "false").lower() in ("1", "true", "yes"),
+        help="Write to monthly partitions and the lookup index",
+    )
+    parser.add_argument(
+        "--split-frames",
+        action=argparse.BooleanOptionalAction,
+        default=os.getenv("ELASTICSEARCH_SPLIT_FRAMES", "false").lower() in ("1", "true", "yes"),
+        help="Write frame results to the frames index, as ELASTICSEARCH_SPLIT_FRAMES does",
+    )
+    parser.add_argument("--chunk-size", type=int, default=2000, help="Documents per _bulk request")
+    parser.add_argument("--chunk-bytes", type=int, default=10 * 1024 * 1024, help="Maximum bytes of documents per _bulk request")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent _bulk requests")
+    args = parser.parse_args()
+    if args.partitioned and args.split_frames:
+        parser.error("--split-frames cannot be combined with --partitioned")
+
+    client = Elasticsearch(
+        args.url,
+        request_timeout=300,
+        connections_per_node=args.workers,
+        max_retries=5,
+        retry_on_status=(429, 502, 503, 504),
+        retry_on_timeout=True,
+    )
+    partitions = PartitionScheme(args.alias) if args.partitioned else None
+    frames = FrameScheme(args.alias) if args.split_frames else None
+    indices = args.alias
+    if partitions is not None:
+        partitions.setup(client)
+    else:
+        ensure_index(client, args.alias)
+    if frames is not None:
+        frames.setup(client)
+        indices = f"{args.alias},{frames.index}"
+    loader = Loader(client, args.alias, partitions, frames)
+
+    loaded = failed = 0
+    reported: List[str] = []
+    started = time.perf_counter()
+
+    def collect(done: Set["Future[Tuple[int, List[str]]]"]) -> None:
+        nonlocal loaded, failed
+        for future in done:
+            count, errors = future.result()
+            loaded += count
+            failed += len(errors)
+            reported.extend(errors[: REPORTED_ERRORS - len(reported)])
+
+    with bulk_load(client, indices), ThreadPoolExecutor(args.workers) as pool:
+        pending: Set["Future[Tuple[int, List[str]]]"] = set()
+        for chunk in read_chunks(args.paths, args.chunk_size, args.chunk_bytes):
+            if len(pending) >= args.workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            pending.add(pool.submit(loader.load, chunk))
+        collect(wait(pending).done)
+    elapsed = time.perf_counter() - started
+
+    print(f"Imported {loaded} documents in {elapsed:.1f}s ({loaded / elapsed:.0f} docs/s)")
+    if failed:
+        for error in reported:
+            print(f"  {error}")
+        sys.exit(f"{failed} documents were rejected")
+
+
+if __name__ == "__main__":
+    main()
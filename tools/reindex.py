@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+"""Migrate the video metadata index to the current managed mapping.
+
+Creates a new ``{alias}-v{MAPPING_VERSION}`` index from the index template
+and copies every document into it with ``_reindex`` while refreshes and
+replicas are disabled. Writes keep landing on the old index during that copy,
+so writes to it are then blocked for a catch-up pass: a second ``_reindex``
+with external versions rewrites only the documents changed since the first
+one, and documents deleted in the meantime are removed from the new index.
+Finally the alias is atomically pointed at the new index and the old index is
+unblocked. If the alias name is currently a concrete (unmanaged) index,
+``--delete-old`` is required and the old index is removed in the same atomic
+alias update.
+
+The partitioned and split-frames layouts spread a video over several indices
+and are refused; use ``tools/export_videos.py`` and ``tools/import_videos.py``
+to move them.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(BASE_DIR))
+
+from elasticsearch import Elasticsearch
+
+from libs.storage.elasticsearch_index import (
+    bulk_load,
+    indices_behind,
+    new_index_name,
+    put_template,
+)
+
+PIT_KEEP_ALIVE = "5m"
+
+
+def _enabled(name: str) -> bool:
+    return os.getenv(name, "false").lower() in ("1", "true", "yes")
+
+
+def unsupported_layout(client: Elasticsearch, alias: str) -> Optional[str]:
+    """Why *alias* cannot be reindexed in place, or ``None`` if it can."""
+    if _enabled("ELASTICSEARCH_PARTITIONED") or client.indices.exists(index=f"{alias}-ids"):
+        return "time-partitioned"
+    if _enabled("ELASTICSEARCH_SPLIT_FRAMES") or client.indices.exists(index=f"{alias}-frames"):
+        return "split-frames"
+    return None
+
+
+def copy(client: Elasticsearch, source: str, dest: str) -> Dict[str, Any]:
+    """``_reindex`` *source* into *dest*, skipping documents whose version *dest* already has."""
+    return client.reindex(
+        source={"index": source},
+        dest={"index": dest, "version_type": "external"},
+        conflicts="proceed",
+        slices="auto",
+        wait_for_completion=True,
+        refresh=False,
+    )
+
+
+def remove_deleted(
+    client: Elasticsearch, sources: List[str], dest: str, page_size: int = 1000
+) -> int:
+    """Delete the documents of *dest* that none of *sources* holds any more."""
+    pit_id = client.open_point_in_time(index=dest, keep_alive=PIT_KEEP_ALIVE)["id"]
+    removed = 0
+    search_after: Optional[List[Any]] = None
+    try:
+        while True:
+            res = client.search(
+                pit={"id": pit_id, "keep_alive": PIT_KEEP_ALIVE},
+                size=page_size,
+                sort=["_shard_doc"],
+                source=False,
+                search_after=search_after,
+            )
+            pit_id = res.get("pit_id", pit_id)
+            hits = res["hits"]["hits"]
+            if not hits:
+                return removed
+            ids = [hit["_id"] for hit in hits]
+            found = client.mget(
+                docs=[{"_index": index, "_id": doc_id} for index in sources for doc_id in ids],
+                source=False,
+            )
+            present = {doc["_id"] for doc in found["docs"] if doc.get("found")}
+            missing = [doc_id for doc_id in ids if doc_id not in present]
+            if missing:
+                client.bulk(operations=[{"delete": {"_index": dest, "_id": i}} for i in missing])
+                removed += len(missing)
+            search_after = hits[-1]["sort"]
+    finally:
+        client.close_point_in_time(id=pit_id)
+
+
+def block_writes(client: Elasticsearch, indices: List[str], blocked: bool) -> None:
+    client.indices.put_settings(
+        index=",".join(indices), settings={"index.blocks.write": True if blocked else None}
+    )
+
+
+def reindex(client: Elasticsearch, alias: str, delete_old: bool) -> str:
+    """Move *alias* onto a new index with the current mapping; returns its name."""
+    old_indices = indices_behind(client, alias)
+    legacy = not old_indices and client.indices.exists(index=alias)
+    sources = old_indices or ([alias] if legacy else [])
+
+    put_template(client, alias)
+    new_index = new_index_name(client, alias)
+    client.indices.create(index=new_index)
+    print(f"Created {new_index}")
+
+    blocked = False
+    try:
+        if sources:
+            source = ",".join(sources)
+            with bulk_load(client, new_index):
+                res = copy(client, source, new_index)
+                print(f"Copied {res['total']} documents from {source}")
+                if res["failures"]:
+                    sys.exit(f"Reindex reported failures; alias left on {source}")
+                block_writes(client, sources, True)
+                blocked = True
+                print(f"Blocked writes to {source} for the catch-up pass")
+                res = copy(client, source, new_index)
+                if res["failures"]:
+                    sys.exit(f"Catch-up reported failures; alias left on {source}")
+                print(
+                    f"Caught up {res['total'] - res['version_conflicts']} documents "
+                    f"written during the copy"
+                )
+            removed = remove_deleted(client, sources, new_index)
+            print(f"Removed {removed} documents deleted during the copy")
+
+        actions: List[Dict[str, Any]] = []
+        if legacy:
+            actions.append({"remove_index": {"index": alias}})
+        for index in old_indices:
+            actions.append({"remove": {"index": index, "alias": alias}})
+        actions.append({"add": {"index": new_index, "alias": alias, "is_write_index": True}})
+        client.indices.update_aliases(actions=actions)
+        print(f"Alias {alias} now points to {new_index}")
+        if legacy:
+            blocked = False
+    finally:
+        if blocked:
+            block_writes(client, sources, False)
+
+    if delete_old and old_indices:
+        client.indices.delete(index=",".join(old_indices))
+        print(f"Deleted {', '.join(old_indices)}")
+    return new_index
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Reindex video metadata behind an alias")
+    parser.add_argument("--url", default=os.getenv("ELASTICSEARCH_URL", "http://localhost:9200"))
+    parser.add_argument("--alias", default=os.getenv("ELASTICSEARCH_INDEX", "videos"))
+    parser.add_argument(
+        "--delete-old", action="store_true", help="Delete the previous index after the swap"
+    )
+    args = parser.parse_args()
+
+    client = Elasticsearch(args.url, request_timeout=3600)
+    layout = unsupported_layout(client, args.alias)
+    if layout is not None:
+        parser.error(
+            f"{args.alias} uses the {layout} layout, which reindex.py does not support; "
+            "move it with tools/export_videos.py and tools/import_videos.py"
+        )
+    if not indices_behind(client, args.alias) and client.indices.exists(index=args.alias):
+        if not args.delete_old:
+            parser.error(
+                f"{args.alias} is a concrete index; pass --delete-old to replace it with an alias"
+            )
+    reindex(client, args.alias, args.delete_old)
+
+
+if __name__ == "__main__":
+    main()